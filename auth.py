@@ -1,11 +1,15 @@
 # app/auth.py
-from typing import Optional, List
+import hashlib
+from typing import Optional, List, FrozenSet
 
 from fastapi import Header, HTTPException, status
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
-from config import DEFAULT_DB_SCOPE
-from utils.database import fetchrow, fetch
+from config import DEFAULT_DB_SCOPE, PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL, API_KEYS_CHANNEL
+from utils.cache import TTLCache
+from utils.catalog import add_refresh_hook
+from utils.database import fetchrow, prepare_on_connect
+from utils.notify import register_listener
 from utils.scope_proceed import normalize_scopes
 
 
@@ -15,6 +19,10 @@ class Principal(BaseModel):
     scopes: List[str]      # list of db ids or group ids allowed by THIS token
     token_id: Optional[int] = None    # id from api_keys table if applicable
     token_key: Optional[str] = None   # raw key string (avoid storing/logging in prod)
+    _scope_set: FrozenSet[str] = PrivateAttr(default_factory=frozenset)
+
+    def model_post_init(self, __context) -> None:
+        self._scope_set = frozenset(self.scopes)
 
 # Attempt to decode value as JWT. If success -> return Principal(kind='jwt')
 # def try_decode_jwt(value: str) -> Optional[Principal]:
@@ -30,25 +38,62 @@ class Principal(BaseModel):
 
 # helper permission check (very simple)
 def check_db_scope_permission(principal: Principal, requested_scopes):
+    allowed = principal._scope_set
     for s in requested_scopes:
-        if s not in principal.scopes:
+        if s not in allowed:
             return False, s
     return True, None
 
+# Resolved principals keyed by sha256(api key); the raw key is never used as a cache key
+_principal_cache = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
+# bumped on every invalidation; a lookup that raced with one must not repopulate the cache
+_principal_generation = 0
+
+def _cache_key(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+def invalidate_principals(api_key_id: Optional[int] = None) -> None:
+    """Drop cached principals of one api key (or all of them when api_key_id is None)."""
+    global _principal_generation
+    _principal_generation += 1
+    if api_key_id is None:
+        _principal_cache.clear()
+    else:
+        _principal_cache.drop_where(lambda p: p.token_id == api_key_id)
+
+def principal_cache_stats():
+    return _principal_cache.stats()
+
+def _on_api_key_changed(payload: str) -> None:
+    # payload 为 api_keys.id；无法解析时清空整个缓存
+    try:
+        invalidate_principals(int(payload))
+    except ValueError:
+        invalidate_principals()
+
+register_listener(API_KEYS_CHANNEL, _on_api_key_changed, on_reset=invalidate_principals)
+# cached scopes were expanded against the previous catalog
+add_refresh_hook(lambda _catalog: invalidate_principals())
+
+# api key and its token_db_permissions in one round trip
+_API_KEY_SQL = prepare_on_connect("""
+SELECT k.id, k.owner, k.is_active,
+       COALESCE(array_agg(p.db_id) FILTER (WHERE p.db_id IS NOT NULL), '{}') AS db_ids
+FROM api_keys k
+LEFT JOIN token_db_permissions p ON p.api_key_id = k.id
+WHERE k.key = $1
+GROUP BY k.id
+""", "")
+
 # Lookup API key in Postgres and return Principal(kind='api_key') with token-specific scopes
 async def verify_api_key_from_db(key: str) -> Optional[Principal]:
-    # Query api_keys table
-    row = await fetchrow("SELECT id, owner, is_active FROM api_keys WHERE key = $1", key)
+    row = await fetchrow(_API_KEY_SQL, key)
     if not row:
         return None
     if not row["is_active"]:
         return None
-    api_key_id = row["id"]
-    owner = row["owner"]
-    # fetch permissions (token_db_permissions)
-    rows = await fetch("SELECT db_id FROM token_db_permissions WHERE api_key_id = $1", api_key_id)
-    scopes = await normalize_scopes([r["db_id"] for r in rows] + DEFAULT_DB_SCOPE)
-    return Principal(owner=owner, scopes=scopes, token_id=api_key_id, token_key=key)
+    scopes = normalize_scopes(list(row["db_ids"]) + DEFAULT_DB_SCOPE)
+    return Principal(owner=row["owner"], scopes=scopes, token_id=row["id"], token_key=key)
 
 # Main dependency for routes
 async def get_principal(
@@ -82,8 +127,16 @@ async def get_principal(
 
     # 2) X-API-KEY fallback
     if x_api_key:
+        cache_key = _cache_key(x_api_key)
+        princ = _principal_cache.get(cache_key)
+        if princ:
+            return princ
+        generation = _principal_generation
         princ = await verify_api_key_from_db(x_api_key)
         if princ:
+            # 查询期间收到 api_keys 变更通知时，结果可能已过期，不写入缓存
+            if generation == _principal_generation:
+                _principal_cache.set(cache_key, princ)
             return princ
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication failed")
 
@@ -0,0 +1,207 @@
+"""
+Stand-ins for sbatch / squeue / sacct / scancel / blastp used by the benchmark harness (bench/run.py).
+
+bench/bin/<command> execs `python fake_slurm.py <command> ...`. Jobs run on this host as detached processes;
+their state lives in files under BENCH_SLURM_STATE so that every CLI call sees the same "cluster".
+Latency of each command is configurable through the environment (seconds, +/- BENCH_LATENCY_JITTER):
+
+    BENCH_SBATCH_LATENCY, BENCH_SQUEUE_LATENCY, BENCH_SACCT_LATENCY, BENCH_SCANCEL_LATENCY,
+    BENCH_QUEUE_DELAY (time a job stays PENDING), BENCH_BLASTP_LATENCY (per blastp call)
+
+blastp writes BENCH_BLASTP_HITS hits per query against the accessions bench/seed.py loaded
+(BENCH_SEED_ROWS rows per source table), so results resolve in /api/v1/data.
+"""
+import fcntl
+import hashlib
+import os
+import random
+import re
+import signal
+import subprocess
+import sys
+import time
+
+STATE_DIR = os.getenv("BENCH_SLURM_STATE", "/tmp/venus-bench-slurm")
+JOBS_DIR = os.path.join(STATE_DIR, "jobs")
+ACTIVE_STATES = ("PENDING", "RUNNING")
+
+
+def accession(db_id: str, i: int) -> str:
+    """Accession of row i in a seeded source table (shared with bench/seed.py)."""
+    return f"{db_id.upper()}_{i:07d}"
+
+
+def _sleep(var: str) -> None:
+    base = float(os.getenv(var, "0") or 0)
+    if base <= 0:
+        return
+    jitter = float(os.getenv("BENCH_LATENCY_JITTER", "0") or 0)
+    time.sleep(max(0.0, base * (1 + random.uniform(-jitter, jitter))))
+
+
+def _write_state(jid: str, state: str) -> None:
+    path = os.path.join(JOBS_DIR, jid)
+    os.makedirs(path, exist_ok=True)
+    tmp = os.path.join(path, "state.tmp")
+    with open(tmp, "w") as fh:
+        fh.write(state)
+    os.replace(tmp, os.path.join(path, "state"))
+
+
+def _read_state(jid: str):
+    try:
+        with open(os.path.join(JOBS_DIR, jid, "state")) as fh:
+            return fh.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def _all_jobs():
+    try:
+        names = os.listdir(JOBS_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted(names, key=lambda j: [int(p) for p in j.split("_")])
+
+
+def _next_job_id() -> int:
+    os.makedirs(STATE_DIR, exist_ok=True)
+    with open(os.path.join(STATE_DIR, "next_id"), "a+") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        fh.seek(0)
+        jid = int(fh.read().strip() or "1000")
+        fh.seek(0)
+        fh.truncate()
+        fh.write(str(jid + 1))
+    return jid
+
+
+def _array_spec(script: str):
+    """`#SBATCH --array=0-N%P` -> (N + 1, P); None for a plain job."""
+    with open(script, encoding="utf-8") as fh:
+        for ln in fh:
+            m = re.match(r"#SBATCH\s+--array=0-(\d+)(?:%(\d+))?", ln)
+            if m:
+                n = int(m.group(1)) + 1
+                return n, int(m.group(2) or n)
+    return None
+
+
+def sbatch(argv):
+    script = argv[-1]
+    _sleep("BENCH_SBATCH_LATENCY")
+    jid = str(_next_job_id())
+    spec = _array_spec(script)
+    for elem in ([f"{jid}_{i}" for i in range(spec[0])] if spec else [jid]):
+        _write_state(elem, "PENDING")
+    # detached runner: outlives this sbatch call like a real scheduler would
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "_run", jid, script],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    print(f"Submitted batch job {jid}")
+    return 0
+
+
+def _run(argv):
+    jid, script = argv
+    _sleep("BENCH_QUEUE_DELAY")
+    spec = _array_spec(script)
+    elements = [(f"{jid}_{i}", str(i)) for i in range(spec[0])] if spec else [(jid, None)]
+    parallel = spec[1] if spec else 1
+    workdir = os.path.dirname(os.path.abspath(script))
+    running = []
+    for elem, index in elements:
+        while len(running) >= parallel:
+            running = [r for r in running if not _reap(*r)]
+            time.sleep(0.05)
+        if _read_state(elem) != "PENDING":
+            continue  # cancelled
+        env = dict(os.environ, SLURM_JOB_ID=elem.replace("_", ""))
+        if index is not None:
+            env.update(SLURM_ARRAY_JOB_ID=jid, SLURM_ARRAY_TASK_ID=index)
+        out_path = os.path.join(workdir, f"slurm-{elem}.out")
+        with open(out_path, "w") as out:
+            proc = subprocess.Popen(["bash", script], cwd=workdir, env=env, stdout=out, stderr=subprocess.STDOUT)
+        with open(os.path.join(JOBS_DIR, elem, "pid"), "w") as fh:
+            fh.write(str(proc.pid))
+        _write_state(elem, "RUNNING")
+        running.append((elem, proc))
+    while running:
+        running = [r for r in running if not _reap(*r)]
+        time.sleep(0.05)
+    return 0
+
+
+def _reap(elem, proc) -> bool:
+    rc = proc.poll()
+    if rc is None:
+        return False
+    if _read_state(elem) == "RUNNING":
+        _write_state(elem, "COMPLETED" if rc == 0 else "FAILED")
+    return True
+
+
+def squeue(argv):
+    _sleep("BENCH_SQUEUE_LATENCY")
+    for jid in _all_jobs():
+        state = _read_state(jid)
+        if state in ACTIVE_STATES:
+            print(f"{jid} {state}")
+    return 0
+
+
+def sacct(argv):
+    _sleep("BENCH_SACCT_LATENCY")
+    wanted = argv[argv.index("-j") + 1].split(",") if "-j" in argv else []
+    jobs = _all_jobs()
+    for want in wanted:
+        for jid in jobs:
+            if jid == want or jid.startswith(want + "_"):
+                state = _read_state(jid)
+                if state:
+                    print(f"{jid}|{state}")
+    return 0
+
+
+def scancel(argv):
+    _sleep("BENCH_SCANCEL_LATENCY")
+    want = argv[-1]
+    for jid in _all_jobs():
+        if jid != want and not jid.startswith(want + "_"):
+            continue
+        if _read_state(jid) in ACTIVE_STATES:
+            _write_state(jid, "CANCELLED")
+            try:
+                with open(os.path.join(JOBS_DIR, jid, "pid")) as fh:
+                    os.kill(int(fh.read()), signal.SIGTERM)
+            except (FileNotFoundError, ProcessLookupError, ValueError):
+                pass
+    return 0
+
+
+def blastp(argv):
+    opts = {argv[i]: argv[i + 1] for i in range(len(argv) - 1) if argv[i].startswith("-")}
+    _sleep("BENCH_BLASTP_LATENCY")
+    db = opts["-db"]
+    with_query = "qseqid" in opts.get("-outfmt", "")
+    rows = max(int(os.getenv("BENCH_SEED_ROWS", "10000")), 1)
+    hits = int(os.getenv("BENCH_BLASTP_HITS", "50"))
+    with open(opts["-query"], encoding="utf-8") as fq:
+        query_ids = [ln[1:].split()[0] for ln in fq if ln.startswith(">")]
+    with open(opts["-out"], "w", encoding="utf-8") as out:
+        for qid in query_ids:
+            # deterministic per (query, db): repeated runs produce identical result sets
+            rng = random.Random(hashlib.sha1(f"{qid}:{db}".encode()).digest())
+            for i in rng.sample(range(rows), min(hits, rows)):
+                cols = [accession(db, i), f"bench protein {i}", f"{rng.uniform(30, 900):.1f}",
+                        f"{rng.uniform(25, 100):.2f}", f"{rng.uniform(0, 1e-5):.2e}"]
+                out.write("\t".join(([qid] if with_query else []) + cols) + "\n")
+    return 0
+
+
+COMMANDS = {"sbatch": sbatch, "squeue": squeue, "sacct": sacct, "scancel": scancel, "blastp": blastp, "_run": _run}
+
+if __name__ == "__main__":
+    sys.exit(COMMANDS[sys.argv[1]](sys.argv[2:]))
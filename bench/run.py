@@ -0,0 +1,343 @@
+"""
+Load-test / benchmark driver.
+
+Seeds a local Postgres database (bench/seed.py), starts the API with uvicorn against it with the fake Slurm
+and blastp commands from bench/bin on PATH, then runs each workload for --duration seconds at --concurrency
+and reports throughput and latency percentiles.
+
+    python -m bench.run --workloads meta,data,status,results,submit --concurrency 16 --duration 30
+    python -m bench.run --save bench/baseline.json                 # record a baseline
+    python -m bench.run --compare bench/baseline.json              # exit 1 on a regression beyond --threshold
+    python -m bench.run --url http://127.0.0.1:8000 --no-seed       # drive an already running server
+
+Needs Postgres (DB_HOST / DB_PORT / DB_USER / DB_PASSWORD) and a Redis database of its own (--redis-url,
+flushed before the run). Run from the repository root.
+
+Workloads:
+    meta        GET  /api/v1/meta/config
+    data        GET  /api/v1/data/{db_id}/{accession}
+    data_batch  POST /api/v1/data/batch (20 entries)
+    status      GET  /api/v1/search/job/{id}/status of seeded finished tasks
+    results     GET  /api/v1/search/job/{id}/results (random page, gzip)
+    submit      POST /api/v1/search/job/submit with a random sequence
+    e2e         submit, then poll status until DONE / FAILED; latency = submit-to-finish turnaround
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import secrets
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+from bench import seed as seeding
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_WORKLOADS = "meta,data,data_batch,status,results,submit"
+E2E_POLL_INTERVAL = 0.5
+E2E_TIMEOUT = 600.0
+
+
+class Context:
+    def __init__(self, args):
+        self.db_ids = seeding.source_db_ids(args.databases)
+        self.rows = args.rows
+        self.done_tasks = seeding.done_task_ids(args.done_tasks)
+        self.hits = args.hits
+
+    def random_accession(self, rng: random.Random):
+        db = rng.choice(self.db_ids)
+        return db, seeding.accession(db, rng.randrange(self.rows))
+
+
+def _ok(r: httpx.Response) -> bool:
+    return r.status_code < 400
+
+
+async def w_meta(client, ctx, rng):
+    return _ok(await client.get("/api/v1/meta/config"))
+
+
+async def w_data(client, ctx, rng):
+    db, acc = ctx.random_accession(rng)
+    return _ok(await client.get(f"/api/v1/data/{db}/{acc}"))
+
+
+async def w_data_batch(client, ctx, rng):
+    items = [dict(zip(("db_id", "accession"), ctx.random_accession(rng))) for _ in range(20)]
+    return _ok(await client.post("/api/v1/data/batch", json={"items": items}))
+
+
+async def w_status(client, ctx, rng):
+    return _ok(await client.get(f"/api/v1/search/job/{rng.choice(ctx.done_tasks)}/status"))
+
+
+async def w_results(client, ctx, rng):
+    pages = max(1, ctx.hits // 20)
+    r = await client.get(f"/api/v1/search/job/{rng.choice(ctx.done_tasks)}/results",
+                         params={"page": rng.randint(1, pages), "page_size": 20},
+                         headers={"Accept-Encoding": "gzip"})
+    return _ok(r)
+
+
+async def _submit(client, rng):
+    body = {"content": seeding.random_sequence(rng), "input_mode": "SEQUENCE",
+            "db_scope": ["group:public"], "exact_match": "OFF"}
+    return await client.post("/api/v1/search/job/submit", json=body)
+
+
+async def w_submit(client, ctx, rng):
+    return _ok(await _submit(client, rng))
+
+
+async def w_e2e(client, ctx, rng):
+    r = await _submit(client, rng)
+    if not _ok(r):
+        return False
+    task_id = r.json()["task_id"]
+    deadline = time.monotonic() + E2E_TIMEOUT
+    while time.monotonic() < deadline:
+        s = await client.get(f"/api/v1/search/job/{task_id}/status")
+        state = s.json().get("status") if _ok(s) else None
+        if state in ("DONE", "FAILED"):
+            return state == "DONE"
+        await asyncio.sleep(E2E_POLL_INTERVAL)
+    return False
+
+
+WORKLOADS: Dict[str, Callable[..., Awaitable[bool]]] = {
+    "meta": w_meta,
+    "data": w_data,
+    "data_batch": w_data_batch,
+    "status": w_status,
+    "results": w_results,
+    "submit": w_submit,
+    "e2e": w_e2e,
+}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    lat = sorted(latencies)
+    ms = lambda v: round(v * 1000, 2)
+    return {
+        "requests": len(lat),
+        "errors": errors,
+        "throughput": round(len(lat) / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": ms(percentile(lat, 50)),
+        "p90_ms": ms(percentile(lat, 90)),
+        "p99_ms": ms(percentile(lat, 99)),
+        "max_ms": ms(lat[-1]) if lat else 0.0,
+        "mean_ms": ms(sum(lat) / len(lat)) if lat else 0.0,
+    }
+
+
+async def drive(url: str, api_key: str, name: str, ctx: Context, concurrency: int, duration: float,
+                warmup: float, seed: int) -> dict:
+    fn = WORKLOADS[name]
+    latencies: List[float] = []
+    errors = 0
+    start = time.monotonic()
+    measure_from = start + warmup
+    end = measure_from + duration
+
+    async def worker(n: int):
+        nonlocal errors
+        rng = random.Random(seed * 1000 + n)
+        while True:
+            t0 = time.monotonic()
+            if t0 >= end:
+                return
+            try:
+                ok = await fn(client, ctx, rng)
+            except httpx.HTTPError:
+                ok = False
+            if t0 >= measure_from:
+                latencies.append(time.monotonic() - t0)
+                errors += not ok
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, headers={"X-API-Key": api_key}, limits=limits,
+                                 timeout=E2E_TIMEOUT) as client:
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    # long requests started before `end` finish after it; count the time actually measured
+    return summarize(latencies, errors, max(time.monotonic(), end) - measure_from)
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> bool:
+    """Print relative changes; True when some workload regressed by more than `threshold`."""
+    regressed = False
+    print(f"\n{'workload':<12} {'rps':>18} {'p50 ms':>18} {'p99 ms':>18}")
+    for name, cur in current["workloads"].items():
+        base = baseline.get("workloads", {}).get(name)
+        if base is None:
+            continue
+
+        def cell(key):
+            b, c = base[key], cur[key]
+            change = (c - b) / b if b else 0.0
+            return f"{b:>7} -> {c:<7} {change:+.0%}", change
+
+        rps, d_rps = cell("throughput")
+        p50, _ = cell("p50_ms")
+        p99, d_p99 = cell("p99_ms")
+        bad = d_rps < -threshold or d_p99 > threshold or cur["errors"] > base["errors"]
+        regressed |= bad
+        print(f"{name:<12} {rps:>18} {p50:>18} {p99:>18}{'  REGRESSION' if bad else ''}")
+    return regressed
+
+
+def print_report(report: dict) -> None:
+    cols = ("requests", "errors", "throughput", "p50_ms", "p90_ms", "p99_ms", "max_ms")
+    print(f"\n{'workload':<12}" + "".join(f"{c:>12}" for c in cols))
+    for name, stats in report["workloads"].items():
+        print(f"{name:<12}" + "".join(f"{stats[c]:>12}" for c in cols))
+
+
+def app_environment(args, workdir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "DB_NAME": args.db_name,
+        "REDIS_URL": args.redis_url,
+        "PATH": f"{ROOT / 'bench' / 'bin'}{os.pathsep}{env.get('PATH', '')}",
+        "BENCH_PYTHON": sys.executable,
+        "BENCH_SLURM_STATE": os.path.join(workdir, "slurm"),
+        "BENCH_SEED_ROWS": str(args.rows),
+        "BENCH_SBATCH_LATENCY": str(args.sbatch_latency),
+        "BENCH_SQUEUE_LATENCY": str(args.squeue_latency),
+        "BENCH_SACCT_LATENCY": str(args.sacct_latency),
+        "BENCH_QUEUE_DELAY": str(args.queue_delay),
+        "BENCH_BLASTP_LATENCY": str(args.blastp_latency),
+        "BENCH_BLASTP_HITS": str(args.blastp_hits),
+        "BENCH_LATENCY_JITTER": str(args.jitter),
+        "TASK_WORKDIR_BASE": os.path.join(workdir, "tasks"),
+        "INGEST_NOTIFY_URL": f"http://127.0.0.1:{args.port}/internal/ingest/wake",
+        "INGEST_NOTIFY_TOKEN": secrets.token_hex(16),
+        "EXECUTION_BACKEND": "slurm",
+    })
+    return env
+
+
+async def flush_redis(url: str) -> None:
+    import redis.asyncio as aioredis
+    r = aioredis.from_url(url)
+    try:
+        await r.flushdb()
+    finally:
+        await r.aclose()
+
+
+def start_app(args, workdir: str) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.port),
+           "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"]
+    return subprocess.Popen(cmd, cwd=ROOT, env=app_environment(args, workdir))
+
+
+async def wait_ready(url: str, proc: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url) as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise SystemExit(f"API exited during startup (code {proc.returncode})")
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    raise SystemExit("API did not become ready")
+
+
+async def run(args) -> dict:
+    names = [w.strip() for w in args.workloads.split(",") if w.strip()]
+    unknown = [w for w in names if w not in WORKLOADS]
+    if unknown:
+        raise SystemExit(f"unknown workloads: {', '.join(unknown)} (choose from {', '.join(WORKLOADS)})")
+
+    ctx = Context(args)
+    proc = None
+    workdir = tempfile.mkdtemp(prefix="venus-bench-")
+    try:
+        if not args.no_seed:
+            await seeding.seed(args.db_name, args.databases, args.rows, args.done_tasks, args.hits)
+        url = args.url
+        if url is None:
+            await flush_redis(args.redis_url)
+            url = f"http://127.0.0.1:{args.port}"
+            proc = start_app(args, workdir)
+            await wait_ready(url, proc)
+
+        report = {
+            "params": {k: v for k, v in vars(args).items() if k not in ("save", "compare")},
+            "workloads": {},
+        }
+        for name in names:
+            stats = await drive(url, seeding.BENCH_API_KEY, name, ctx, args.concurrency, args.duration,
+                                args.warmup, args.seed)
+            report["workloads"][name] = stats
+            print(f"{name}: {stats['throughput']} req/s, p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms, "
+                  f"{stats['errors']} errors", flush=True)
+        return report
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--workloads", default=DEFAULT_WORKLOADS, help=f"comma separated, from: {', '.join(WORKLOADS)}")
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--duration", type=float, default=30.0, help="measured seconds per workload")
+    p.add_argument("--warmup", type=float, default=5.0, help="unmeasured seconds before each workload")
+    p.add_argument("--seed", type=int, default=1, help="random seed of the request mix")
+    p.add_argument("--url", help="benchmark an already running API instead of starting one")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    p.add_argument("--redis-url", default="redis://localhost:6379/15")
+    p.add_argument("--no-seed", action="store_true", help="reuse the existing benchmark database")
+    seeding.add_seed_arguments(p)
+    p.add_argument("--sbatch-latency", type=float, default=0.2)
+    p.add_argument("--squeue-latency", type=float, default=0.1)
+    p.add_argument("--sacct-latency", type=float, default=0.1)
+    p.add_argument("--queue-delay", type=float, default=1.0, help="seconds a fake job stays PENDING")
+    p.add_argument("--blastp-latency", type=float, default=2.0)
+    p.add_argument("--blastp-hits", type=int, default=50, help="hits per query written by the fake blastp")
+    p.add_argument("--jitter", type=float, default=0.2, help="relative +/- jitter on every fake latency")
+    p.add_argument("--save", help="write the report as JSON (e.g. a new baseline)")
+    p.add_argument("--compare", help="baseline JSON to compare against")
+    p.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression")
+    args = p.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+-- Base tables the API expects before the numbered migrations in sql/ are applied.
+-- Only used by the benchmark harness (bench/seed.py) to build a throwaway database;
+-- column sets follow what the application reads and writes.
+
+CREATE TABLE IF NOT EXISTS api_keys (
+    id         bigserial   PRIMARY KEY,
+    key        text        NOT NULL UNIQUE,
+    owner      text        NOT NULL,
+    is_active  boolean     NOT NULL DEFAULT TRUE,
+    created_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS token_db_permissions (
+    api_key_id bigint NOT NULL REFERENCES api_keys(id) ON DELETE CASCADE,
+    db_id      text   NOT NULL,
+    PRIMARY KEY (api_key_id, db_id)
+);
+
+CREATE TABLE IF NOT EXISTS database_groups (
+    id    text PRIMARY KEY,
+    label text,
+    type  text
+);
+
+CREATE TABLE IF NOT EXISTS databases (
+    id          text    PRIMARY KEY,
+    group_id    text    REFERENCES database_groups(id),
+    source_type text,
+    disabled    boolean NOT NULL DEFAULT FALSE,
+    label_en_us text,
+    label_zh_cn text,
+    extra       jsonb
+);
+
+CREATE TABLE IF NOT EXISTS db_filter_fields (
+    db_id       text NOT NULL REFERENCES databases(id) ON DELETE CASCADE,
+    key         text NOT NULL,
+    label_en_us text,
+    label_zh_cn text,
+    unit        text,
+    type        text,
+    PRIMARY KEY (db_id, key)
+);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id                 text        PRIMARY KEY,
+    created_at         timestamptz NOT NULL DEFAULT now(),
+    owner              text,
+    token_key          text,
+    content            text,
+    input_mode         text,
+    detected_mode      text,
+    requested_db_scope text[],
+    filters            jsonb,
+    status             text        NOT NULL,
+    slurm_job_id       text,
+    error              text
+);
+CREATE INDEX IF NOT EXISTS tasks_status_idx ON tasks (status);
+
+CREATE TABLE IF NOT EXISTS results (
+    task_id text    PRIMARY KEY,
+    total   integer NOT NULL DEFAULT 0,
+    results jsonb
+);
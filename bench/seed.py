@@ -0,0 +1,144 @@
+"""
+Build a throwaway benchmark database: bench/schema.sql, every migration in sql/ (in order), then seed data:
+an API key, N source databases (tables + catalog rows) and finished tasks with result hits.
+
+    python -m bench.seed --db-name venus_bench --databases 3 --rows 20000 --done-tasks 200
+
+Connection settings come from DB_HOST / DB_PORT / DB_USER / DB_PASSWORD (config.DB_CONFIG).
+The target database is dropped and recreated, so its name must contain "bench".
+"""
+import argparse
+import asyncio
+import random
+from pathlib import Path
+
+import asyncpg
+
+from bench.fake_slurm import accession
+from config import DB_CONFIG
+
+ROOT = Path(__file__).resolve().parent.parent
+AMINO = "ACDEFGHIKLMNPQRSTVWY"
+BENCH_API_KEY = "bench-key"
+BENCH_OWNER = "bench"
+
+
+def source_db_ids(n: int):
+    return [f"bench_db_{i}" for i in range(n)]
+
+
+def done_task_ids(n: int):
+    return [f"bench-done-{i:05d}" for i in range(n)]
+
+
+def random_sequence(rng: random.Random, lo: int = 80, hi: int = 400) -> str:
+    return "".join(rng.choice(AMINO) for _ in range(rng.randint(lo, hi)))
+
+
+async def _connect(dbname: str) -> asyncpg.Connection:
+    return await asyncpg.connect(user=DB_CONFIG["user"], password=DB_CONFIG["password"],
+                                 host=DB_CONFIG["host"], port=DB_CONFIG["port"], database=dbname)
+
+
+async def recreate_database(name: str) -> None:
+    if "bench" not in name:
+        raise SystemExit(f"refusing to drop database {name!r}: benchmark database names must contain 'bench'")
+    conn = await _connect("postgres")
+    try:
+        await conn.execute(f'DROP DATABASE IF EXISTS "{name}"')
+        await conn.execute(f'CREATE DATABASE "{name}"')
+    finally:
+        await conn.close()
+
+
+async def apply_schema(conn: asyncpg.Connection) -> None:
+    await conn.execute((ROOT / "bench" / "schema.sql").read_text(encoding="utf-8"))
+    for path in sorted((ROOT / "sql").glob("*.sql")):
+        await conn.execute(path.read_text(encoding="utf-8"))
+
+
+async def seed_catalog(conn: asyncpg.Connection, n_databases: int, rows: int) -> None:
+    await conn.execute("INSERT INTO database_groups (id, label, type) VALUES ('group:public', 'Public', 'public')")
+    key_id = await conn.fetchval(
+        "INSERT INTO api_keys (key, owner) VALUES ($1, $2) RETURNING id", BENCH_API_KEY, BENCH_OWNER)
+    for n, db in enumerate(source_db_ids(n_databases)):
+        # the last database is private: reachable only through token_db_permissions
+        public = n < n_databases - 1 or n_databases == 1
+        await conn.execute(
+            f"CREATE TABLE {db} (accession text PRIMARY KEY, name text, sequence text NOT NULL, "
+            f"external_url text, organism text, length integer)"
+        )
+        rng = random.Random(n)
+        records = []
+        for i in range(rows):
+            seq = random_sequence(rng)
+            records.append((accession(db, i), f"bench protein {i}", seq,
+                            f"https://example.org/{db}/{i}", rng.choice(("E. coli", "H. sapiens", "M. musculus")),
+                            len(seq)))
+        await conn.copy_records_to_table(
+            db, records=records, columns=["accession", "name", "sequence", "external_url", "organism", "length"])
+        await conn.execute("SELECT add_sequence_hash($1)", db)
+        await conn.execute(
+            "INSERT INTO databases (id, group_id, source_type, label_en_us, label_zh_cn, blast_db_bytes) "
+            "VALUES ($1, $2, 'protein', $3, $3, $4)",
+            db, "group:public" if public else None, db, rows * 250)
+        await conn.execute(
+            "INSERT INTO db_filter_fields (db_id, key, label_en_us, label_zh_cn, unit, type) "
+            "VALUES ($1, 'length', 'Length', '长度', 'aa', 'number')", db)
+        if not public:
+            await conn.execute("INSERT INTO token_db_permissions (api_key_id, db_id) VALUES ($1, $2)", key_id, db)
+
+
+async def seed_done_tasks(conn: asyncpg.Connection, n_tasks: int, hits: int, n_databases: int, rows: int) -> None:
+    rng = random.Random(4242)
+    dbs = source_db_ids(n_databases)
+    tasks, results, hit_rows = [], [], []
+    for tid in done_task_ids(n_tasks):
+        tasks.append((tid, BENCH_OWNER, BENCH_API_KEY, random_sequence(rng), "SEQUENCE", "SEQUENCE", dbs, "{}", "DONE"))
+        results.append((tid, hits, "[]"))
+        scores = sorted((rng.uniform(30, 900) for _ in range(hits)), reverse=True)
+        for hit_no, score in enumerate(scores):
+            db = rng.choice(dbs)
+            i = rng.randrange(rows)
+            hit_rows.append((tid, hit_no, accession(db, i), f"bench protein {i}", db, "protein",
+                             score, rng.uniform(25, 100), rng.uniform(0, 1e-5)))
+    await conn.copy_records_to_table(
+        "tasks", records=tasks,
+        columns=["id", "owner", "token_key", "content", "input_mode", "detected_mode",
+                 "requested_db_scope", "filters", "status"])
+    await conn.copy_records_to_table("results", records=results, columns=["task_id", "total", "results"])
+    await conn.copy_records_to_table(
+        "result_hits", records=hit_rows,
+        columns=["task_id", "hit_no", "accession", "name", "source_db", "source_type", "score", "identity", "e_value"])
+
+
+async def seed(db_name: str, n_databases: int, rows: int, n_tasks: int, hits: int) -> None:
+    await recreate_database(db_name)
+    conn = await _connect(db_name)
+    try:
+        await apply_schema(conn)
+        await seed_catalog(conn, n_databases, rows)
+        await seed_done_tasks(conn, n_tasks, hits, n_databases, rows)
+        await conn.execute("ANALYZE")
+    finally:
+        await conn.close()
+
+
+def add_seed_arguments(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--db-name", default="venus_bench")
+    p.add_argument("--databases", type=int, default=3, help="source databases (the last one is private)")
+    p.add_argument("--rows", type=int, default=20000, help="entries per source table")
+    p.add_argument("--done-tasks", type=int, default=200, help="finished tasks for status/results workloads")
+    p.add_argument("--hits", type=int, default=200, help="result hits per finished task")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_seed_arguments(p)
+    args = p.parse_args()
+    asyncio.run(seed(args.db_name, args.databases, args.rows, args.done_tasks, args.hits))
+    print(f"seeded {args.db_name}: {args.databases} databases x {args.rows} rows, {args.done_tasks} finished tasks")
+
+
+if __name__ == "__main__":
+    main()
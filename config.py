@@ -1,14 +1,24 @@
 # app/config.py
+import getpass
+import json
 import os
 from typing import Dict
 
 DB_CONFIG: Dict[str, object] = {
-    "host": "localhost",
-    "port": 5432,
-    "dbname": "venusDB_API",
-    "user": "postgres",
-    "password": "0909",
+    "host": os.getenv("DB_HOST", "localhost"),
+    "port": int(os.getenv("DB_PORT", "5432")),
+    "dbname": os.getenv("DB_NAME", "venusDB_API"),
+    "user": os.getenv("DB_USER", "postgres"),
+    "password": os.getenv("DB_PASSWORD", "0909"),
 }
+# asyncpg pool (utils/database.py); timeouts in seconds, 0 = none
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))  # prepared statements per connection
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "0"))
+DB_ACQUIRE_TIMEOUT = float(os.getenv("DB_ACQUIRE_TIMEOUT", "0"))
+DB_CONNECT_TIMEOUT = float(os.getenv("DB_CONNECT_TIMEOUT", "60"))
+DB_MAX_INACTIVE_LIFETIME = float(os.getenv("DB_MAX_INACTIVE_LIFETIME", "300"))  # idle connections are closed after
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
@@ -31,6 +41,132 @@ LANGUAGE_CODES = ["en_us", "zh_cn"]
 QUEUE_KEY = "search_queue"             # Redis list storing task IDs (RPUSH)
 TASK_HASH_PREFIX = "task:"             # full key: task:{task_id}
 
-SLURM_PARTITION = "CPU"
-TASK_WORKDIR_BASE = "/tmp/slurm-workspace"
-SLURM_USER= "`whoami`"
\ No newline at end of file
+SLURM_PARTITION = os.getenv("SLURM_PARTITION", "CPU")
+TASK_WORKDIR_BASE = os.getenv("TASK_WORKDIR_BASE", "/tmp/slurm-workspace")
+
+# result ingestion (utils/ingest.py): jobs leave a completion marker in INGEST_INBOX (shared with the cluster)
+# and the API loads their TSV; INGEST_NOTIFY_URL (optional) is POSTed by jobs to wake the ingester early
+INGEST_INBOX = os.getenv("INGEST_INBOX", os.path.join(TASK_WORKDIR_BASE, ".ingest"))
+INGEST_NOTIFY_URL = os.getenv("INGEST_NOTIFY_URL", "")       # e.g. http://api-host:8000/internal/ingest/wake
+# shared secret sent by jobs in X-Ingest-Token; the wake endpoint is disabled (404) while it is empty
+INGEST_NOTIFY_TOKEN = os.getenv("INGEST_NOTIFY_TOKEN", "")
+INGEST_POLL_INTERVAL = float(os.getenv("INGEST_POLL_INTERVAL", "2"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "100"))            # markers per transaction
+INGEST_MISSING_GRACE = float(os.getenv("INGEST_MISSING_GRACE", "120"))    # completed job without marker -> FAILED
+INGEST_LOCK_KEY = "ingest:leader"
+SLURM_USER = os.getenv("SLURM_USER") or getpass.getuser()
+
+# Principal cache (auth): resolved API keys are cached in-process, keyed by sha256(key)
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "4096"))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+
+# Postgres LISTEN/NOTIFY channels (see sql/)
+API_KEYS_CHANNEL = "api_keys_changed"
+NOTIFY_RECONNECT_DELAY = float(os.getenv("NOTIFY_RECONNECT_DELAY", "5"))
+CATALOG_CHANNEL = "catalog_changed"
+# fallback polling of catalog_version in case a NOTIFY is missed (0 disables)
+CATALOG_POLL_INTERVAL = float(os.getenv("CATALOG_POLL_INTERVAL", "30"))
+
+# Background Slurm poller (utils/slurm_poller.py)
+SLURM_POLL_INTERVAL = float(os.getenv("SLURM_POLL_INTERVAL", "5"))
+# share the snapshot across API replicas through Redis; only the lock holder runs squeue/sacct
+SLURM_SNAPSHOT_SHARED = os.getenv("SLURM_SNAPSHOT_SHARED", "0") == "1"
+SLURM_SNAPSHOT_KEY = "slurm:snapshot"
+SLURM_POLLER_LOCK_KEY = "slurm:poller:leader"
+
+# Async submission dispatcher (utils/dispatcher.py)
+SUBMIT_CONCURRENCY = int(os.getenv("SUBMIT_CONCURRENCY", "4"))        # concurrent workdir prep + sbatch
+SBATCH_MAX_RETRIES = int(os.getenv("SBATCH_MAX_RETRIES", "4"))
+SBATCH_RETRY_BASE_DELAY = float(os.getenv("SBATCH_RETRY_BASE_DELAY", "1.0"))  # seconds, doubled per attempt
+# re-dispatch CREATING tasks missing from the admission queue (lost or stale claims) at startup
+SUBMIT_RECOVER_ON_STARTUP = os.getenv("SUBMIT_RECOVER_ON_STARTUP", "1") == "1"
+# admission queue (Redis list QUEUE_KEY): Slurm jobs allowed in PENDING/RUNNING before dispatch pauses
+MAX_INFLIGHT_JOBS = int(os.getenv("MAX_INFLIGHT_JOBS", "200"))
+DISPATCH_CAPACITY_POLL = float(os.getenv("DISPATCH_CAPACITY_POLL", "2"))   # seconds between cap checks when full
+DISPATCH_BLOCK_TIMEOUT = int(os.getenv("DISPATCH_BLOCK_TIMEOUT", "5"))     # BLPOP timeout, seconds
+DISPATCH_CLAIM_TIMEOUT = float(os.getenv("DISPATCH_CLAIM_TIMEOUT", "600"))  # claimed but unfinished -> re-queued
+DISPATCH_RECOVER_LOCK_KEY = "search_queue:recover"
+# coalescing: queued single-sequence Slurm tasks with the same db scope share one multi-query blastp run
+COALESCE_ENABLED = os.getenv("COALESCE_ENABLED", "0") == "1"
+COALESCE_MAX_BATCH = int(os.getenv("COALESCE_MAX_BATCH", "50"))        # queries per shared run
+COALESCE_MAX_WAIT = float(os.getenv("COALESCE_MAX_WAIT", "5"))         # seconds a task may wait for others
+
+# Batch submission (router/job_batch.py)
+BATCH_MAX_SEQUENCES = int(os.getenv("BATCH_MAX_SEQUENCES", "10000"))
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "100"))              # queries per array element
+BATCH_ARRAY_PARALLELISM = int(os.getenv("BATCH_ARRAY_PARALLELISM", "8"))  # --array=...%N
+
+# BLAST result cache (utils/blast_cache.py)
+BLAST_CACHE_ENABLED = os.getenv("BLAST_CACHE_ENABLED", "1") == "1"
+RESULT_MAX_HITS = 1000   # hits kept per task (and per cached database)
+
+# streamed FASTA upload (router/job_upload.py); limits are enforced while the body is read
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(256 * 1024 ** 2)))
+UPLOAD_MAX_RECORDS = int(os.getenv("UPLOAD_MAX_RECORDS", "100000"))
+UPLOAD_MAX_SEQUENCE_LENGTH = int(os.getenv("UPLOAD_MAX_SEQUENCE_LENGTH", "100000"))
+
+# exact-match short-circuit (utils/exact_match.py, sql/008_sequence_hash.sql)
+EXACT_MATCH_ENABLED = os.getenv("EXACT_MATCH_ENABLED", "1") == "1"
+# default of SearchRequest.exact_match: OFF / PREVIEW (partial results while blastp runs) / ONLY (finish with them)
+EXACT_MATCH_DEFAULT = os.getenv("EXACT_MATCH_DEFAULT", "PREVIEW")
+
+# multi-accession lookups (POST /api/v1/data/batch, ID-mode search)
+DATA_BATCH_MAX_ITEMS = int(os.getenv("DATA_BATCH_MAX_ITEMS", "1000"))
+# serialized entries of GET /api/v1/data/{db_id}/{accession}, keyed by (db_id, accession, build_version)
+ENTRY_CACHE_MAX_BYTES = int(os.getenv("ENTRY_CACHE_MAX_BYTES", str(64 * 1024 ** 2)))
+
+# blastp resources (utils/task_workdir.py)
+BLAST_PARALLEL = os.getenv("BLAST_PARALLEL", "1") == "1"          # run per-database blastp concurrently
+BLAST_MAX_CPUS = int(os.getenv("BLAST_MAX_CPUS", "16"))            # --cpus-per-task upper bound
+BLAST_BYTES_PER_THREAD = int(os.getenv("BLAST_BYTES_PER_THREAD", str(2 * 1024 ** 3)))
+BLAST_MAX_THREADS_PER_DB = int(os.getenv("BLAST_MAX_THREADS_PER_DB", "8"))
+BLAST_MEM_BASE_MB = int(os.getenv("BLAST_MEM_BASE_MB", "1024"))
+BLAST_MEM_DB_FACTOR = float(os.getenv("BLAST_MEM_DB_FACTOR", "1.0"))  # MB of memory per MB of database
+BLAST_MEM_MAX_MB = int(os.getenv("BLAST_MEM_MAX_MB", "65536"))      # --mem upper bound, 0 = unlimited
+
+# execution backends (utils/backends.py): "auto" routes small single-sequence searches to the local
+# fast lane and everything else to Slurm; "slurm" / "local" force one backend (local: no Slurm needed)
+EXECUTION_BACKEND = os.getenv("EXECUTION_BACKEND", "auto")
+# local fast lane threshold on query residues x total blast database bytes of the scope
+LOCAL_MAX_COST = float(os.getenv("LOCAL_MAX_COST", str(64 * 1024 ** 3)))
+LOCAL_MAX_JOBS = int(os.getenv("LOCAL_MAX_JOBS", "2"))                    # concurrent local jobs per API process
+LOCAL_HEARTBEAT_TTL = int(os.getenv("LOCAL_HEARTBEAT_TTL", "30"))          # seconds
+LOCAL_HEARTBEAT_KEY_PREFIX = "local_backend:alive:"
+
+# serialized result pages of DONE tasks (router/job_results.py), with gzip / zstd variants
+RESULT_PAGE_CACHE_MAX_BYTES = int(os.getenv("RESULT_PAGE_CACHE_MAX_BYTES", str(128 * 1024 ** 2)))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_ZSTD_LEVEL = int(os.getenv("RESPONSE_ZSTD_LEVEL", "3"))
+
+# retention (utils/retention.py): finished tasks older than RETENTION_DAYS are deleted with their work
+# directories; RETENTION_OWNER_DAYS overrides per owner as JSON, e.g. {"anonymous": 7, "lab": 0} (0 = keep)
+RETENTION_ENABLED = os.getenv("RETENTION_ENABLED", "1") == "1"
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "30"))
+RETENTION_OWNER_DAYS = json.loads(os.getenv("RETENTION_OWNER_DAYS", "{}"))
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "300"))              # seconds between passes
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "200"))             # tasks per delete statement
+RETENTION_BATCH_PAUSE = float(os.getenv("RETENTION_BATCH_PAUSE", "0.5"))         # seconds between batches
+RETENTION_MAX_BATCHES = int(os.getenv("RETENTION_MAX_BATCHES", "50"))            # per pass
+RETENTION_ORPHAN_MIN_AGE = float(os.getenv("RETENTION_ORPHAN_MIN_AGE", "86400"))  # seconds since last change
+RETENTION_ORPHAN_BATCH = int(os.getenv("RETENTION_ORPHAN_BATCH", "500"))         # directories checked per pass
+RETENTION_LOCK_KEY = "retention:leader"
+
+# result export (router/job_export.py): rows fetched per server-side cursor round trip
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "2000"))
+
+# task completion push (utils/task_events.py, utils/webhooks.py)
+TASK_EVENTS_CHANNEL = "task_finished"
+SSE_KEEPALIVE_INTERVAL = float(os.getenv("SSE_KEEPALIVE_INTERVAL", "15"))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "256"))
+WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "10"))
+WEBHOOK_MAX_RETRIES = int(os.getenv("WEBHOOK_MAX_RETRIES", "5"))
+WEBHOOK_RETRY_BASE_DELAY = float(os.getenv("WEBHOOK_RETRY_BASE_DELAY", "2"))
+WEBHOOK_CONCURRENCY = int(os.getenv("WEBHOOK_CONCURRENCY", "8"))
+# SENDING deliveries older than this (seconds) are re-sent at startup: their replica died mid-delivery
+WEBHOOK_STALE_AFTER = float(os.getenv("WEBHOOK_STALE_AFTER", "900"))
+# loopback / private / link-local targets are rejected unless explicitly allowed (internal deployments)
+WEBHOOK_ALLOW_PRIVATE = os.getenv("WEBHOOK_ALLOW_PRIVATE", "0") == "1"
+
+# Prometheus metrics (utils/metrics.py, GET /metrics)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_TASK_COUNT_TTL = float(os.getenv("METRICS_TASK_COUNT_TTL", "15"))  # seconds between tasks-by-status queries
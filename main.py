@@ -1,14 +1,43 @@
 # app/__init__.py
 from fastapi import FastAPI
 from router import router as api_router
+from utils.catalog import init_catalog, stop_catalog
 from utils.database import init_db_pool
+from utils.dispatcher import start_dispatcher, stop_dispatcher
+from utils.ingest import start_ingester, stop_ingester
+from utils.metrics import MetricsMiddleware
+from utils.notify import start_listener, stop_listener
+from utils.redis_client import close_redis
+from utils.responses import FastJSONResponse
+from utils.retention import start_retention, stop_retention
+from utils.slurm_poller import start_slurm_poller, stop_slurm_poller
+from utils.webhooks import start_webhooks
 
-app = FastAPI(title="VenusDB API Demo", version="0.2.0")
+app = FastAPI(title="VenusDB API Demo", version="0.2.0", default_response_class=FastJSONResponse)
 app.include_router(api_router)
+app.add_middleware(MetricsMiddleware)
 
 @app.on_event("startup")
 async def startup():
     await init_db_pool()
+    await init_catalog()
+    await start_listener()
+    start_webhooks()
+    start_ingester()
+    start_slurm_poller()
+    await start_dispatcher()
+    start_retention()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await stop_retention()
+    await stop_catalog()
+    await stop_dispatcher()
+    await stop_slurm_poller()
+    await stop_ingester()
+    await stop_listener()
+    await close_redis()
+
 @app.get("/")
 async def root():
     return {"message": "VenusDB API - ok"}
@@ -1,15 +1,25 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 import sys
 
-router = APIRouter()
+from utils.database import request_connection
+
+# handlers share one lazily acquired DB connection per request (utils/database.py)
+router = APIRouter(dependencies=[Depends(request_connection, scope="function")])
 
 _submodules = [
     "job_submit",
+    "job_upload",
+    "job_batch",
     "job_status",
     "job_results",
+    "job_export",
     "job_delete",
+    "job_events",
+    "webhooks",
     "meta",
-    "protein"
+    "protein",
+    "metrics",
+    "ingest"
 ]
 
 # 以包相对方式导入 app.router.<mod>
@@ -0,0 +1,20 @@
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException, status
+from fastapi.responses import Response
+
+from config import INGEST_NOTIFY_TOKEN
+from router import router
+from utils.ingest import wake_ingester
+
+
+@router.post("/internal/ingest/wake", include_in_schema=False, status_code=status.HTTP_202_ACCEPTED)
+async def ingest_wake(x_ingest_token: Optional[str] = Header(default=None)):
+    # 作业完成时由 run_blastp.sh 调用（INGEST_NOTIFY_URL）；只是提前唤醒，丢失也会在下一次轮询被处理
+    if not INGEST_NOTIFY_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_ingest_token or not hmac.compare_digest(x_ingest_token.encode(), INGEST_NOTIFY_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    wake_ingester()
+    return Response(status_code=status.HTTP_202_ACCEPTED)
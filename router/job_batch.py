@@ -0,0 +1,202 @@
+import json
+import math
+import time
+import uuid
+from typing import Dict
+
+from fastapi import Depends, HTTPException, status, Query
+
+from auth import get_principal, Principal, check_db_scope_permission
+from config import DEFAULT_DB_SCOPE, BATCH_MAX_SEQUENCES
+from router import router
+from router.job_results import principal_can_view_task
+from schemas import BatchSearchRequest, BatchJobResponse
+from utils.backends import get_job_state
+from utils.content_proceed import is_amino_acid_sequence, parse_multi_fasta
+from utils.database import fetch, fetchrow, transaction
+from utils.dispatcher import Submission, enqueue_submission, queue_position as queue_position_in_admission
+from utils.scope_proceed import normalize_scopes
+
+
+def _group_status(counts: Dict[str, int], total: int) -> str:
+    """汇总组内各任务状态：仍有活动任务时为 PENDING/RUNNING；全部失败为 FAILED；否则 DONE"""
+    if counts.get("RUNNING"):
+        return "RUNNING"
+    if counts.get("CREATING") or counts.get("PENDING"):
+        return "PENDING"
+    if counts.get("FAILED", 0) >= total:
+        return "FAILED"
+    return "DONE"
+
+
+async def _load_group(group_id: str, principal: Principal):
+    # job_groups.status 只记录 dispatch 状态；组状态由组内任务汇总（_group_status）
+    grow = await fetchrow(
+        "SELECT id, owner, token_key, requested_db_scope, total, slurm_job_id, error "
+        "FROM job_groups WHERE id = $1",
+        group_id,
+    )
+    if not grow:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not principal_can_view_task(principal, {"token_key": grow["token_key"]}):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    return grow
+
+
+@router.post("/api/v1/search/batch/submit", response_model=BatchJobResponse)
+async def submit_batch_job(req: BatchSearchRequest, principal: Principal = Depends(get_principal)):
+    # 解析 db_scope
+    db_scope = normalize_scopes(req.db_scope or DEFAULT_DB_SCOPE)
+    if not db_scope:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No valid db scope")
+    ok, bad_scope = check_db_scope_permission(principal, db_scope)
+    if not ok:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Access denied: {bad_scope}")
+
+    if req.content and req.sequences:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Provide either content or sequences")
+    if req.content:
+        records = parse_multi_fasta(req.content)
+    else:
+        records = [(f"query_{i + 1}", s.strip().upper()) for i, s in enumerate(req.sequences or [])]
+    if not records:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No sequences")
+    if len(records) > BATCH_MAX_SEQUENCES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Too many sequences (max {BATCH_MAX_SEQUENCES})")
+    seen = set()
+    for query_id, seq in records:
+        if query_id in seen:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Duplicate query id: {query_id}")
+        seen.add(query_id)
+        if not seq or not is_amino_acid_sequence(seq):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid sequence format: {query_id}")
+
+    group_id = f"grp_{uuid.uuid4().hex}"
+    created = int(time.time())
+    owner = principal.owner
+    token_key = principal.token_key or ""
+    filters = json.dumps(req.filters or {})
+    tasks = [(f"job_{uuid.uuid4().hex}", query_id, seq) for query_id, seq in records]
+
+    # 组与组内任务在同一事务中写入，初始状态为 CREATING
+    async with transaction() as conn:
+        await conn.execute(
+            "INSERT INTO job_groups (id, created_at, owner, token_key, requested_db_scope, filters, total, status) "
+            "VALUES ($1, to_timestamp($2), $3, $4, $5, $6, $7, $8)",
+            group_id, created, owner, token_key, db_scope, filters, len(tasks), "CREATING",
+        )
+        await conn.executemany(
+            """
+            INSERT INTO tasks (id, created_at, owner, token_key, content, input_mode,
+                               detected_mode, requested_db_scope, filters, status, slurm_job_id, group_id, query_id,
+                               query_no)
+            VALUES ($1, to_timestamp($2), $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
+            """,
+            [
+                (task_id, created, owner, token_key, seq, "SEQUENCE", "SEQUENCE", db_scope, filters,
+                 "CREATING", None, group_id, query_id, i)
+                for i, (task_id, query_id, seq) in enumerate(tasks)
+            ],
+        )
+
+    await enqueue_submission(Submission(group_id, "", "SEQUENCE", db_scope, [(t[0], t[2]) for t in tasks]))
+
+    return BatchJobResponse(
+        group_id=group_id,
+        status="CREATING",
+        total=len(tasks),
+        tasks=[{"query_id": query_id, "task_id": task_id} for task_id, query_id, _ in tasks],
+    )
+
+
+@router.get("/api/v1/search/batch/{group_id}/status")
+async def get_batch_status(group_id: str, principal: Principal = Depends(get_principal)):
+    grow = await _load_group(group_id, principal)
+    rows = await fetch("SELECT status, count(*) AS n FROM tasks WHERE group_id = $1 GROUP BY status", group_id)
+    counts = {(r["status"] or "PENDING").upper(): r["n"] for r in rows}
+    total = grow["total"]
+    group_status = _group_status(counts, total)
+
+    queue_position = 0
+    if group_status == "PENDING" and grow["slurm_job_id"]:
+        job_state = get_job_state(str(grow["slurm_job_id"]))
+        if job_state is not None:
+            queue_position = max(job_state.queue_position, 0)
+    elif group_status == "PENDING":
+        # 尚未提交到 Slurm：返回在 admission queue 中的位置
+        queue_position = await queue_position_in_admission(group_id) or 0
+
+    return {
+        "group_id": group_id,
+        "status": group_status,
+        "total": total,
+        "counts": counts,
+        "queue_position": queue_position,
+        "error": grow["error"],
+    }
+
+
+@router.get("/api/v1/search/batch/{group_id}/results")
+async def get_batch_results(
+    group_id: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    hits_per_query: int = Query(10, ge=0, le=100),
+    principal: Principal = Depends(get_principal)
+):
+    """
+    分页返回组内各 query 的状态与 top hits（按 score）；完整结果通过各 task 的 results 接口获取。
+    """
+    grow = await _load_group(group_id, principal)
+    total = grow["total"]
+    total_pages = math.ceil(total / page_size) if page_size else 1
+    if page > total_pages != 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Pagination Error")
+
+    trows = await fetch(
+        "SELECT t.id, t.query_id, t.status, t.error, r.total FROM tasks t "
+        "LEFT JOIN results r ON r.task_id = t.id "
+        "WHERE t.group_id = $1 ORDER BY t.query_no, t.query_id LIMIT $2 OFFSET $3",
+        group_id, page_size, (page - 1) * page_size,
+    )
+    task_ids = [r["id"] for r in trows]
+    hits: Dict[str, list] = {tid: [] for tid in task_ids}
+    if hits_per_query and task_ids:
+        hrows = await fetch(
+            """
+            SELECT task_id, accession, name, source_db, source_type, score, identity, e_value FROM (
+                SELECT h.*, row_number() OVER (PARTITION BY task_id ORDER BY score DESC, hit_no DESC) AS rn
+                FROM result_hits h WHERE task_id = ANY($1::text[])
+            ) ranked WHERE rn <= $2 ORDER BY task_id, rn
+            """,
+            task_ids, hits_per_query,
+        )
+        for h in hrows:
+            hits[h["task_id"]].append({
+                "accession": h["accession"],
+                "name": h["name"],
+                "source_db": h["source_db"],
+                "source_type": h["source_type"],
+                "score": h["score"],
+                "identity": h["identity"],
+                "e_value": h["e_value"],
+            })
+
+    return {
+        "group_id": group_id,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "queries": [
+            {
+                "query_id": r["query_id"],
+                "task_id": r["id"],
+                "status": (r["status"] or "PENDING").upper(),
+                "total": r["total"] or 0,
+                "error": r["error"],
+                "results": hits[r["id"]],
+            }
+            for r in trows
+        ],
+    }
@@ -1,35 +1,38 @@
+import asyncio
+
 from fastapi import HTTPException
 from fastapi.params import Depends
 from starlette import status
 
 from auth import Principal, get_principal
 from router import router
-from utils.database import fetchrow, execute
+from router.job_results import invalidate_result_pages
+from utils.backends import cancel_job
+from utils.database import fetchrow
+from utils.dispatcher import cancel_submission
+from utils.retention import DELETE_OWNED_TASK_SQL
+from utils.task_workdir import remove_task_workdir
+
+_ACTIVE_STATUSES = ("CREATING", "PENDING", "RUNNING")
 
 
 @router.delete("/api/v1/search/job/{job_id}")
 async def delete_job(job_id: str, principal: Principal = Depends(get_principal)):
-    trow = await fetchrow(
-        "SELECT id, owner, token_key, requested_db_scope, detected_mode, content, status, error, slurm_job_id "
-        "FROM tasks WHERE id = $1",
-        job_id,
-    )
+    trow = await fetchrow(DELETE_OWNED_TASK_SQL, job_id, principal.token_key, principal.owner)
     if not trow:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
 
-    # 权限校验：principal.token_key 或 owner 匹配
-    token_key = trow.get("token_key") or ""
-    owner = trow.get("owner")
-    if not (principal.token_key == token_key or principal.owner == owner):
+    # 权限校验：principal.token_key 或 owner 匹配（在同一语句中完成，无权限时不删除）
+    if not trow["allowed"]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    invalidate_result_pages(job_id)
 
-    await execute(
-        "DELETE FROM results WHERE task_id = $1",
-        job_id,
-    )
-    await execute(
-        "DELETE FROM tasks WHERE id = $1",
-        job_id,
-    )
+    # batch 与合并检索的任务共享作业与工作目录，由最后一个任务随 retention 清理
+    if trow["group_id"] is None and trow["coalesce_id"] is None:
+        if (trow["status"] or "").upper() in _ACTIVE_STATUSES:
+            await cancel_submission(job_id)
+            if trow["slurm_job_id"]:
+                await cancel_job(trow["slurm_job_id"])
+        await asyncio.to_thread(remove_task_workdir, job_id)
 
-    return
\ No newline at end of file
+    return
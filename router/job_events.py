@@ -0,0 +1,77 @@
+import asyncio
+import json
+from typing import List, Optional
+
+from fastapi import Depends, HTTPException, Request, status, Query
+from fastapi.responses import StreamingResponse
+
+from auth import get_principal, Principal
+from config import SSE_KEEPALIVE_INTERVAL
+from router import router
+from router.job_results import principal_can_view_task
+from utils.database import fetch
+from utils.task_events import subscribe, unsubscribe, token_hash
+
+_FINISHED = ("DONE", "FAILED")
+
+
+def _sse(event: dict) -> bytes:
+    data = json.dumps({"task_id": event["task_id"], "status": event["status"]})
+    return f"event: task\ndata: {data}\n\n".encode("utf-8")
+
+
+@router.get("/api/v1/search/events")
+async def task_events(
+    request: Request,
+    task_id: Optional[List[str]] = Query(None),
+    principal: Principal = Depends(get_principal)
+):
+    """
+    Server-Sent Events: one `task` event whenever a task of this API key becomes DONE/FAILED.
+    With task_id given, only those tasks are reported and the stream ends once all of them finished.
+    """
+    wanted = set(task_id) if task_id else None
+    if wanted:
+        rows = await fetch("SELECT id, token_key FROM tasks WHERE id = ANY($1::text[])", list(wanted))
+        if len(rows) != len(wanted):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+        for r in rows:
+            if not principal_can_view_task(principal, {"token_key": r["token_key"]}):
+                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    token = token_hash(principal.token_key)
+
+    async def stream():
+        # subscribe only once the body is iterated: a client gone before that never leaves a subscription behind
+        sub = subscribe(token, wanted)
+        try:
+            pending = set(wanted) if wanted else None
+            if wanted:
+                # read current state after subscribing so that no transition is missed in between
+                rows = await fetch("SELECT id, status FROM tasks WHERE id = ANY($1::text[])", list(wanted))
+                pending.intersection_update(r["id"] for r in rows)   # deleted meanwhile
+                for r in rows:
+                    st = (r["status"] or "").upper()
+                    if st in _FINISHED and r["id"] in pending:
+                        pending.discard(r["id"])
+                        yield _sse({"task_id": r["id"], "status": st})
+            while pending is None or pending:
+                if await request.is_disconnected():
+                    break
+                try:
+                    ev = await asyncio.wait_for(sub.queue.get(), SSE_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if pending is not None:
+                    if ev["task_id"] not in pending:
+                        continue
+                    pending.discard(ev["task_id"])
+                yield _sse(ev)
+        finally:
+            unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
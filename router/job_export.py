@@ -0,0 +1,133 @@
+import io
+from typing import List, Optional
+
+from fastapi import Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+
+from auth import get_principal, Principal
+from config import EXPORT_FETCH_SIZE
+from router import router
+from router.job_results import principal_can_view_task, build_hit_filters, HIT_COLUMNS
+from utils.database import acquire, fetchrow
+from utils.responses import dumps
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # Arrow export is optional
+    pa = None
+
+EXPORT_FIELDS = ["accession", "name", "source_db", "source_type", "score", "identity", "e_value", "query_id"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "tsv": "text/tab-separated-values; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+async def _iter_hit_chunks(sql: str, args: list):
+    """
+    Server-side cursor over result_hits; yields lists of at most EXPORT_FETCH_SIZE records.
+    The pool connection is held only while the response is being streamed.
+    """
+    async with acquire() as conn:
+        async with conn.transaction(readonly=True):
+            cur = await conn.cursor(sql, *args)
+            while True:
+                rows = await cur.fetch(EXPORT_FETCH_SIZE)
+                if not rows:
+                    break
+                yield rows
+
+
+def _tsv_field(v) -> str:
+    if v is None:
+        return ""
+    return str(v).replace("\t", " ").replace("\n", " ")
+
+
+async def _ndjson_stream(chunks):
+    async for rows in chunks:
+        yield b"".join(dumps({k: r[k] for k in EXPORT_FIELDS}) + b"\n" for r in rows)
+
+
+async def _tsv_stream(chunks):
+    yield ("\t".join(EXPORT_FIELDS) + "\n").encode("utf-8")
+    async for rows in chunks:
+        yield "".join("\t".join(_tsv_field(r[k]) for k in EXPORT_FIELDS) + "\n" for r in rows).encode("utf-8")
+
+
+async def _arrow_stream(chunks):
+    schema = pa.schema([
+        ("accession", pa.string()),
+        ("name", pa.string()),
+        ("source_db", pa.string()),
+        ("source_type", pa.string()),
+        ("score", pa.float64()),
+        ("identity", pa.float64()),
+        ("e_value", pa.float64()),
+        ("query_id", pa.string()),
+    ])
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    yield drain()  # schema message
+    async for rows in chunks:
+        batch = pa.record_batch([[r[k] for r in rows] for k in EXPORT_FIELDS], schema=schema)
+        writer.write_batch(batch)
+        yield drain()
+    writer.close()
+    yield drain()
+
+
+@router.get("/api/v1/search/job/{job_id}/export")
+async def export_results(
+    job_id: str,
+    format: str = Query("ndjson", pattern="^(ndjson|tsv|arrow)$"),
+    min_identity: Optional[float] = Query(None),
+    max_evalue: Optional[float] = Query(None),
+    source_db: Optional[List[str]] = Query(None),
+    principal: Principal = Depends(get_principal)
+):
+    """
+    Stream all hits of a finished task (score descending) as NDJSON, TSV or Arrow IPC stream.
+    """
+    trow = await fetchrow(
+        "SELECT t.token_key, EXISTS (SELECT 1 FROM results r WHERE r.task_id = t.id) AS finished "
+        "FROM tasks t WHERE t.id = $1",
+        job_id,
+    )
+    if not trow:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job Not Found")
+    if not principal_can_view_task(principal, {"token_key": trow["token_key"]}):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    if not trow["finished"]:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job Not Found")
+    if format == "arrow" and pa is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Arrow export requires pyarrow")
+
+    args: list = [job_id]
+    conds = build_hit_filters(args, min_identity, max_evalue, source_db)
+    sql = f"SELECT {HIT_COLUMNS} FROM result_hits WHERE {' AND '.join(conds)} ORDER BY score DESC, hit_no DESC"
+    chunks = _iter_hit_chunks(sql, args)
+
+    if format == "ndjson":
+        body = _ndjson_stream(chunks)
+    elif format == "tsv":
+        body = _tsv_stream(chunks)
+    else:
+        body = _arrow_stream(chunks)
+
+    ext = "arrows" if format == "arrow" else format
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{job_id}.{ext}"'},
+    )
@@ -1,11 +1,53 @@
+import base64
+import binascii
+import hashlib
 import json
 import math
+from typing import List, Optional, Tuple
 
 from . import router
-from fastapi import Depends, HTTPException, status, Query
+from fastapi import Depends, Header, HTTPException, status, Query
+from fastapi.responses import Response
 
 from auth import get_principal, Principal
-from utils.database import fetchrow
+from config import RESULT_PAGE_CACHE_MAX_BYTES
+from router.meta import etag_matches
+from utils.cache import ByteLRUCache
+from utils.database import fetch, fetchrow, prepare_on_connect
+from utils.responses import EncodedBody, dumps, encoded_response, precompress, variant_etags
+
+# sort_by -> (sort expression, direction); expressions must match the indexes in sql/003_result_hits.sql
+SORT_KEYS = {
+    "score": ("score", "DESC"),
+    "identity": ("COALESCE(identity, -1)", "DESC"),
+    "e_value": ("COALESCE(e_value, 'Infinity'::float8)", "ASC"),
+}
+
+HIT_COLUMNS = "accession, name, source_db, source_type, score, identity, e_value, query_id"
+
+# task (for the permission check) and its results summary in one round trip; total is NULL while running
+_TASK_RESULTS_SQL = prepare_on_connect(
+    "SELECT t.owner, t.requested_db_scope, t.detected_mode, t.content, t.token_key, r.task_id IS NOT NULL AS finished, "
+    "r.total FROM tasks t LEFT JOIN results r ON r.task_id = t.id WHERE t.id = $1",
+    "",
+)
+
+# (job_id, page, page_size, cursor, sort_by, filters...) -> EncodedBody; only pages of DONE tasks, which never change
+_result_pages = ByteLRUCache(RESULT_PAGE_CACHE_MAX_BYTES)
+
+_PAGE_HEADERS = {
+    "Cache-Control": "private, no-cache",
+    # 200 与 304 都按 Accept-Encoding 区分（gzip / zstd 预压缩变体的 ETag 不同）
+    "Vary": "X-API-Key, Accept-Encoding",
+}
+
+
+def invalidate_result_pages(job_id: str) -> None:
+    _result_pages.drop_keys_where(lambda k: k[0] == job_id)
+
+
+def result_page_cache_stats():
+    return _result_pages.stats()
 
 def principal_can_view_task(principal: Principal, task_meta: dict) -> bool:
     token_key = task_meta.get("token_key") or ""
@@ -13,30 +55,55 @@ def principal_can_view_task(principal: Principal, task_meta: dict) -> bool:
         return True
     return False
 
+def encode_cursor(sort_by: str, value: float, hit_no: int) -> str:
+    raw = json.dumps([sort_by, value, hit_no], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort_by: str) -> Tuple[float, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cur_sort, value, hit_no = json.loads(raw)
+        if cur_sort != sort_by:
+            raise ValueError("cursor was issued for another sort_by")
+        return float(value), int(hit_no)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def build_hit_filters(
+    args: list,
+    min_identity: Optional[float],
+    max_evalue: Optional[float],
+    source_db: Optional[List[str]],
+) -> List[str]:
+    """Return SQL conditions for the optional filters, appending their values to `args` ($1 is task_id)."""
+    conds = ["task_id = $1"]
+    if min_identity is not None:
+        args.append(min_identity)
+        conds.append(f"identity >= ${len(args)}")
+    if max_evalue is not None:
+        args.append(max_evalue)
+        conds.append(f"e_value <= ${len(args)}")
+    if source_db:
+        args.append(source_db)
+        conds.append(f"source_db = ANY(${len(args)}::text[])")
+    return conds
+
 @router.get("/api/v1/search/job/{job_id}/results")
 async def get_results(
     job_id: str,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    sort_by: str = Query("score", pattern="^(score|identity|e_value)$"),
+    min_identity: Optional[float] = Query(None),
+    max_evalue: Optional[float] = Query(None),
+    source_db: Optional[List[str]] = Query(None),
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     principal: Principal = Depends(get_principal)
 ):
-    row = await fetchrow("SELECT total, results FROM results WHERE task_id = $1", job_id)
-    if not row:
-        # maybe task never existed or expired
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job Not Found")
-
-    total = row.get("total", 0)
-    results_list = json.loads(row["results"])
-    total_pages = math.ceil(total / page_size) if page_size else 1
-    if page > total_pages != 0:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Pagination Error")
-
-    start = (page - 1) * page_size
-    end = start + page_size
-    page_results = results_list[start:end]
-
-    # fetch task metadata from tasks table for permission check
-    trow = await fetchrow("SELECT owner, requested_db_scope, detected_mode, content, token_key FROM tasks WHERE id = $1", job_id)
+    # permission check first: nothing from results is read for unauthorized callers
+    trow = await fetchrow(_TASK_RESULTS_SQL, job_id)
     if not trow:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job Not Found")
 
@@ -56,11 +123,112 @@ async def get_results(
         "scope": task_meta.get("requested_db_scope")
     }
 
-    return {
+    page_key = (job_id, page, page_size, cursor, sort_by, min_identity, max_evalue, tuple(source_db or ()))
+    encoded = _result_pages.get(page_key)
+    if encoded is not None:
+        return _page_response(encoded, accept_encoding, if_none_match)
+
+    if not trow["finished"]:
+        # full search still running: identity-100 hits found at submit time, if any (see utils/exact_match.py)
+        partial = await fetch(
+            "SELECT e.accession, e.name, e.source_db, d.source_type, e.score FROM exact_hits e "
+            "LEFT JOIN databases d ON d.id = e.source_db WHERE e.task_id = $1 ORDER BY e.source_db, e.accession",
+            job_id,
+        )
+        if not partial:
+            # maybe task not finished yet or expired
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job Not Found")
+        return {
+            "job_id": job_id,
+            "total": len(partial),
+            "partial": True,
+            "search_meta": search_meta,
+            "results": [
+                {
+                    "accession": r["accession"],
+                    "name": r["name"],
+                    "source_db": r["source_db"],
+                    "source_type": r["source_type"],
+                    "score": r["score"],
+                    "identity": 100.0,
+                    "e_value": None,
+                    "query_id": None,
+                }
+                for r in partial
+            ],
+        }
+
+    args: list = [job_id]
+    conds = build_hit_filters(args, min_identity, max_evalue, source_db)
+    if len(conds) == 1:
+        total = trow["total"] or 0
+    else:
+        crow = await fetchrow(f"SELECT count(*) AS n FROM result_hits WHERE {' AND '.join(conds)}", *args)
+        total = crow["n"]
+
+    sort_expr, direction = SORT_KEYS[sort_by]
+    cmp = "<" if direction == "DESC" else ">"
+    offset = 0
+    if cursor:
+        # keyset: continue strictly after the last row of the previous page
+        value, hit_no = decode_cursor(cursor, sort_by)
+        args.extend([value, hit_no])
+        conds.append(f"({sort_expr}, hit_no) {cmp} (${len(args) - 1}, ${len(args)})")
+    else:
+        total_pages = math.ceil(total / page_size) if page_size else 1
+        if page > total_pages != 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Pagination Error")
+        offset = (page - 1) * page_size
+
+    args.append(page_size)
+    sql = (
+        f"SELECT {HIT_COLUMNS}, hit_no, {sort_expr} AS sort_value FROM result_hits "
+        f"WHERE {' AND '.join(conds)} "
+        f"ORDER BY {sort_expr} {direction}, hit_no {direction} "
+        f"LIMIT ${len(args)}"
+    )
+    if offset:
+        args.append(offset)
+        sql += f" OFFSET ${len(args)}"
+    rows = await fetch(sql, *args)
+
+    page_results = [
+        {
+            "accession": r["accession"],
+            "name": r["name"],
+            "source_db": r["source_db"],
+            "source_type": r["source_type"],
+            "score": r["score"],
+            "identity": r["identity"],
+            "e_value": r["e_value"],
+            "query_id": r["query_id"],
+        }
+        for r in rows
+    ]
+    next_cursor = None
+    if len(rows) == page_size:
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_by, last["sort_value"], last["hit_no"])
+
+    # the results row only exists once the task is DONE: serialize and compress this page once
+    body = dumps({
         "job_id": job_id,
         "total": total,
+        "partial": False,
         "page": page,
         "page_size": page_size,
+        "sort_by": sort_by,
+        "next_cursor": next_cursor,
         "search_meta": search_meta,
         "results": page_results
-    }
\ No newline at end of file
+    })
+    encoded = precompress(body, '"' + hashlib.sha1(body).hexdigest() + '"')
+    _result_pages.set(page_key, encoded)
+    return _page_response(encoded, accept_encoding, if_none_match)
+
+
+def _page_response(encoded: EncodedBody, accept_encoding: Optional[str], if_none_match: Optional[str]) -> Response:
+    for etag in variant_etags(encoded):
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={**_PAGE_HEADERS, "ETag": etag})
+    return encoded_response(encoded, accept_encoding, _PAGE_HEADERS)
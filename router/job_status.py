@@ -1,19 +1,21 @@
 from fastapi import Depends, HTTPException, status
 
 from auth import get_principal, Principal
-from config import SLURM_USER
 from router import router
-from utils.database import fetchrow
-from utils.slurm import get_slurm_queue_position, query_slurm_job_state
+from utils.backends import get_job_state
+from utils.database import fetchrow, prepare_on_connect
+from utils.dispatcher import queue_position as queue_position_in_admission
+
+_TASK_SQL = prepare_on_connect(
+    "SELECT id, owner, token_key, requested_db_scope, detected_mode, content, status, error, slurm_job_id "
+    "FROM tasks WHERE id = $1",
+    "",
+)
 
 
 @router.get("/api/v1/search/job/{task_id}/status")
 async def get_job_status(task_id: str, principal: Principal = Depends(get_principal)):
-    trow = await fetchrow(
-        "SELECT id, owner, token_key, requested_db_scope, detected_mode, content, status, error, slurm_job_id "
-        "FROM tasks WHERE id = $1",
-        task_id
-    )
+    trow = await fetchrow(_TASK_SQL, task_id)
     if not trow:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
 
@@ -33,16 +35,17 @@ async def get_job_status(task_id: str, principal: Principal = Depends(get_princi
 
     slurm_job_id = trow.get("slurm_job_id")
 
-    # 如果存在 slurm_job_id 且状态为 PENDING 或 RUNNING，查询 Slurm 获取最新状态并映射到接口枚举
-    if slurm_job_id and db_status in ("PENDING", "RUNNING", "CREATING"):
-        slurm_state = query_slurm_job_state(str(slurm_job_id))
+    # 如果存在 slurm_job_id 且状态为 PENDING 或 RUNNING，从后台 poller 的快照中读取最新状态并映射到接口枚举
+    job_state = get_job_state(str(slurm_job_id)) if slurm_job_id else None
+    if job_state is not None and db_status in ("PENDING", "RUNNING", "CREATING"):
+        slurm_state = job_state.state
         if slurm_state == "PENDING":
             mapped = "PENDING"
         elif slurm_state == "RUNNING":
             mapped = "RUNNING"
         elif slurm_state == "COMPLETED":
-            mapped = "DONE"
-            # 若 DB 还没改，我们可以尝试把它改成 DONE（可选），但这里不写 DB 更新，仅返回 DONE
+            # 作业已结束但结果尚未由 ingester 写入（utils/ingest.py）；DONE 只以 DB 中的 tasks.status 为准
+            mapped = "RUNNING"
         elif slurm_state == "FAILED":
             mapped = "FAILED"
         else:
@@ -53,14 +56,12 @@ async def get_job_status(task_id: str, principal: Principal = Depends(get_princi
 
         # queue position 仅在 PENDING 时有效（其他状态返回 0）
         if status_to_return == "PENDING":
-            queue_position = get_slurm_queue_position(str(slurm_job_id), SLURM_USER)
-            if queue_position is None or queue_position < 0:
-                queue_position = 0
+            queue_position = max(job_state.queue_position, 0)
         else:
             queue_position = 0
 
     else:
-        # 如果无 slurm_job_id 或者在 DB 中已标记为 DONE/FAILED，直接用 DB 状态映射
+        # 如果无 slurm_job_id、快照中尚无该作业，或者在 DB 中已标记为 DONE/FAILED，直接用 DB 状态映射
         if db_status == "DONE":
             status_to_return = "DONE"
         elif db_status == "FAILED":
@@ -70,6 +71,9 @@ async def get_job_status(task_id: str, principal: Principal = Depends(get_princi
         else:
             status_to_return = "PENDING"
         queue_position = 0
+        if db_status == "CREATING" and not slurm_job_id:
+            # 仍在 admission queue 中等待派发
+            queue_position = await queue_position_in_admission(job_id) or 0
 
     # 构造 search_meta（当 detected_mode 可用时返回，否则 null）
     search_meta = None
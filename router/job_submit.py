@@ -1,51 +1,58 @@
 # file: job_submit.py
 import json
-import os
-import shlex
 import time
 import uuid
-from typing import List
+from typing import Any, Dict, List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import Depends, HTTPException, status
 
 from auth import get_principal, Principal, check_db_scope_permission
-from config import DEFAULT_DB_SCOPE, SLURM_PARTITION, TASK_WORKDIR_BASE, SLURM_USER
+from config import DEFAULT_DB_SCOPE, BLAST_CACHE_ENABLED, EXACT_MATCH_ENABLED, EXACT_MATCH_DEFAULT, DATA_BATCH_MAX_ITEMS
 from router import router
 from schemas import SearchRequest, JobResponse
-from utils.content_proceed import detect_input_mode, is_amino_acid_sequence
-from utils.database import execute
+from utils import blast_cache
+from utils.catalog import get_catalog
+from utils.content_proceed import detect_input_mode, is_amino_acid_sequence, is_uniprot_like_id, parse_accessions
+from utils.database import execute, transaction
+from utils.dispatcher import Submission, enqueue_submission
+from utils.entries import fetch_entries
+from utils.exact_match import lookup_exact
+from utils.result_store import write_task_results
 from utils.scope_proceed import normalize_scopes
-from utils.slurm import submit_slurm_job, get_slurm_queue_position
-
-def _safe_path_for_task(task_id: str) -> str:
-    base = TASK_WORKDIR_BASE or "/tmp/tasks"
-    task_dir = os.path.join(base, task_id)
-    os.makedirs(task_dir, exist_ok=True)
-    return task_dir
-
-def _build_blastp_command(db_scope: List[str], task_dir: str) -> List[str]:
-    # 为每个 db 生成一段命令：运行 blastp 输出 tabular，然后在每行前面加上 source_db，并追加到 combined_out
-    # 使用 shell 的 awk/printf 来为每行添加 source_db 前缀，避免 CSV 复杂转义问题（outfmt 6 用 tab 分隔）
-    blastp_cmds = []
-    query_path = os.path.join(task_dir, "query.fasta")
-    combined_out = os.path.join(task_dir, "combined_out.fasta")
+
+INSERT_TASK_SQL = """
+INSERT INTO tasks (id, created_at, owner, token_key, content, input_mode,
+                   detected_mode, requested_db_scope, filters, status, slurm_job_id)
+VALUES ($1, to_timestamp($2), $3, $4, $5, $6, $7, $8, $9, $10, $11)
+"""
+
+
+def id_search_hits(found: Dict[str, Dict[str, Any]], db_scope: List[str], accessions: List[str]) -> List[dict]:
+    """按 db_scope 与输入顺序排列的 ID 检索结果（无比对，score 为 0）"""
+    catalog = get_catalog()
+    hits = []
     for db in db_scope:
-        # outfmt 6 columns: sacc stitle bitscore pident evalue
-        # We will add the source_db as the first column using awk
-        cmd = (
-            f"blastp -query {shlex.quote(query_path)} "
-            f"-db {shlex.quote(db)} "
-            f"-outfmt \"6 sacc stitle bitscore pident evalue\""
-            # write to stdout and pipe into awk to prefix db then append to combined_out
-            f" | awk -v DB={shlex.quote(db)} '{{print DB\"\\t\"$0}}' >> {shlex.quote(combined_out)}"
-        )
-        blastp_cmds.append(cmd)
-    return blastp_cmds
+        rows = found.get(db, {})
+        for acc in accessions:
+            row = rows.get(acc)
+            if row is None:
+                continue
+            hits.append({
+                "accession": acc,
+                "name": row.get("name"),
+                "source_db": db,
+                "source_type": catalog.databases[db].source_type,
+                "score": 0.0,
+                "identity": None,
+                "e_value": None,
+            })
+    return hits
+
 
 @router.post("/api/v1/search/job/submit", response_model=JobResponse)
 async def submit_search_job(req: SearchRequest, principal: Principal = Depends(get_principal)):
     # 解析 db_scope
-    db_scope = await normalize_scopes(req.db_scope or DEFAULT_DB_SCOPE)
+    db_scope = normalize_scopes(req.db_scope or DEFAULT_DB_SCOPE)
     if not db_scope:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No valid db scope")
     ok, bad_scope = check_db_scope_permission(principal, db_scope)
@@ -57,7 +64,14 @@ async def submit_search_job(req: SearchRequest, principal: Principal = Depends(g
     if input_mode == "AUTO":
         resolved_mode = detect_input_mode(req.content)
 
-    if resolved_mode != "SEQUENCE" or not is_amino_acid_sequence(req.content): # TODO 支持其他检索类型
+    if resolved_mode == "ID":
+        accessions = parse_accessions(req.content)
+        if not accessions or not all(is_uniprot_like_id(a) for a in accessions):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid accession format")
+        if len(accessions) > DATA_BATCH_MAX_ITEMS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"Too many accessions (max {DATA_BATCH_MAX_ITEMS})")
+    elif resolved_mode != "SEQUENCE" or not is_amino_acid_sequence(req.content): # TODO 支持其他检索类型
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sequence format")
 
     # 生成 task_id
@@ -66,70 +80,63 @@ async def submit_search_job(req: SearchRequest, principal: Principal = Depends(g
     owner = principal.owner
     token_key = principal.token_key or ""
 
+    if resolved_mode == "ID":
+        # ID 检索同步完成：每个库一次 accession = ANY($1) 查询，各库并发
+        found = await fetch_entries({db: accessions for db in db_scope})
+        hits = id_search_hits(found, db_scope, accessions)
+        async with transaction() as conn:
+            await conn.execute(INSERT_TASK_SQL, task_id, created, owner, token_key, req.content, input_mode,
+                               resolved_mode, db_scope, json.dumps(req.filters or {}), "CREATING", None)
+            await write_task_results(conn, task_id, hits)
+        return JobResponse(task_id=task_id, status="DONE", queue_position=0)
+
+    # 精确匹配：序列与源表条目完全一致时，无需 blastp 即可得到 identity 100 的命中
+    exact_mode = (req.exact_match or EXACT_MATCH_DEFAULT).upper()
+    exact = []
+    if EXACT_MATCH_ENABLED and exact_mode != "OFF":
+        exact = await lookup_exact(req.content, db_scope)
+
+    # 查询结果缓存：按 (序列 hash, db, db build_version) 命中的库无需重新运行 blastp
+    cached, missing = {}, db_scope
+    if BLAST_CACHE_ENABLED:
+        cached, missing = await blast_cache.lookup(blast_cache.sequence_hash(req.content), db_scope)
+
     # 插入 tasks 表：初始状态为 CREATING
-    insert_sql = """
-    INSERT INTO tasks (id, created_at, owner, token_key, content, input_mode,
-                       detected_mode, requested_db_scope, filters, status, slurm_job_id)
-    VALUES ($1, to_timestamp($2), $3, $4, $5, $6, $7, $8, $9, $10, $11)
-    """
-    await execute(insert_sql, task_id, created, owner, token_key, req.content, input_mode,
-                  resolved_mode, db_scope, json.dumps(req.filters or {}), "CREATING", None)
-
-    # 准备工作目录与 query 文件 (query.fasta / 等)
-    task_dir = _safe_path_for_task(task_id)
-    query_path = os.path.join(task_dir, "query.fasta")
-    if resolved_mode == "SEQUENCE":
-        header = f">{task_id}"
-        with open(query_path, "w", encoding="utf-8") as fq:
-            fq.write(f"{header}\n")
-            fq.write(req.content.strip() + "\n")
+    insert_sql = INSERT_TASK_SQL
+    insert_args = (task_id, created, owner, token_key, req.content, input_mode,
+                   resolved_mode, db_scope, json.dumps(req.filters or {}), "CREATING", None)
+
+    if exact and exact_mode == "ONLY":
+        async with transaction() as conn:
+            await conn.execute(insert_sql, *insert_args)
+            await write_task_results(conn, task_id, exact)
+        return JobResponse(task_id=task_id, status="DONE", queue_position=0, exact_hits=len(exact))
+
+    if not missing:
+        # 全部命中缓存：直接完成任务
+        async with transaction() as conn:
+            await conn.execute(insert_sql, *insert_args)
+            await write_task_results(conn, task_id, blast_cache.merge_hits(cached))
+        # exact 命中未写入该任务（结果完全来自缓存），不计入 exact_hits
+        return JobResponse(task_id=task_id, status="DONE", queue_position=0, exact_hits=0)
+
+    if exact:
+        # PREVIEW：完整检索运行期间，results 接口先返回这些命中（partial=true）
+        async with transaction() as conn:
+            await conn.execute(insert_sql, *insert_args)
+            await conn.executemany(
+                "INSERT INTO exact_hits (task_id, source_db, accession, name, score) VALUES ($1, $2, $3, $4, $5) "
+                "ON CONFLICT DO NOTHING",
+                [(task_id, h["source_db"], h["accession"], h["name"], h["score"]) for h in exact],
+            )
     else:
-        with open(query_path, "w", encoding="utf-8") as fq:
-            fq.write(req.content)
-
-    # 在工作目录写入 process_fasta.py（见 job_submit 附带的脚本内容）
-    process_py_path = os.path.join(task_dir, "process_fasta.py")
-    from pathlib import Path
-    template_process_src = Path.cwd() / "templates" / "process_fasta.py"
-    if template_process_src.exists():
-        import shutil
-        shutil.copyfile(template_process_src, process_py_path)
-    os.chmod(process_py_path, 0o750)
-
-    blastp_cmds = _build_blastp_command(db_scope, task_dir)
-    combined_out = os.path.join(task_dir, "combined_out.fasta")
-    # 写 slurm 脚本并提交
-    script_path = os.path.join(task_dir, "run_blastp.sh")
-    with open(script_path, "w", encoding="utf-8") as fh:
-        fh.write("#!/bin/bash\n")
-        fh.write(f"#SBATCH --job-name=job_{task_id}\n")
-        if SLURM_PARTITION:
-            fh.write(f"#SBATCH --partition={SLURM_PARTITION}\n")
-        fh.write(f"#SBATCH --output={os.path.join(task_dir, 'slurm-%j.out')}\n")
-        fh.write(f"#SBATCH --error={os.path.join(task_dir, 'slurm-%j.err')}\n")
-        fh.write("set -euo pipefail\n")
-        fh.write("export BLASTDB=/mnt/vdb/blast-workspace\n")
-        fh.write(f"cd {shlex.quote(task_dir)}\n")
-        fh.write("echo \"[task] start at $(date)\"\n")
-        fh.write(
-            f"printf \"source_db\\tsacc\\tstitle\\tbitscore\\tpident\\tevalue\\n\" > {shlex.quote(combined_out)}\n")
-        for cmd in blastp_cmds:
-            fh.write(f"echo 'RUN: {cmd}'\n")
-            fh.write(cmd + "\n")
-        fh.write("source /home/tanyang/miniconda3/etc/profile.d/conda.sh\n")
-        fh.write("conda activate dbApi\n")
-        fh.write(
-            f"python3 {shlex.quote(process_py_path)} --input {shlex.quote(combined_out)} --task {shlex.quote(task_id)}\n")
-    os.chmod(script_path, 0o750)
-    slurm_job_id = submit_slurm_job(script_path)
-    if slurm_job_id is None:
-        await execute("UPDATE tasks SET status=$1, error=$2 WHERE id=$3", "FAILED", "Failed to submit job to Slurm", task_id)
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to submit job to Slurm")
-
-    # 更新任务表 slurm_job_id & 标记为 PENDING
-    await execute("UPDATE tasks SET status=$1, slurm_job_id=$2 WHERE id=$3", "PENDING", slurm_job_id, task_id)
-
-    # 计算队列位置（若失败返回 -1）
-    queue_position = get_slurm_queue_position(slurm_job_id, SLURM_USER)
-
-    return JobResponse(task_id=task_id, status="PENDING", queue_position=queue_position)
+        await execute(insert_sql, *insert_args)
+
+    # 工作目录准备与 sbatch 由 dispatcher 在后台完成，任务随后异步变为 PENDING 或 FAILED
+    # 部分命中时只调度缺失的库，缓存结果在作业中合并
+    ahead = await enqueue_submission(Submission(
+        task_id, req.content, resolved_mode, missing,
+        cached_tsv=blast_cache.cached_hits_tsv(cached) if cached else None,
+    ))
+
+    return JobResponse(task_id=task_id, status="CREATING", queue_position=ahead, exact_hits=len(exact))
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import time
+import uuid
+from typing import List, Optional
+
+from fastapi import Depends, HTTPException, Request, status, Query
+
+from auth import get_principal, Principal, check_db_scope_permission
+from config import DEFAULT_DB_SCOPE, UPLOAD_MAX_BYTES, UPLOAD_MAX_RECORDS, UPLOAD_MAX_SEQUENCE_LENGTH
+from router import router
+from schemas import JobResponse
+from utils.database import execute, release_request_connection
+from utils.dispatcher import Submission, enqueue_submission
+from utils.fasta_stream import FastaFormatError, FastaLimitError, FastaStreamWriter
+from utils.scope_proceed import normalize_scopes
+from utils.task_workdir import remove_task_workdir, upload_query_path
+
+
+@router.post("/api/v1/search/job/upload", response_model=JobResponse)
+async def upload_search_job(
+    request: Request,
+    db_scope: Optional[List[str]] = Query(None),
+    principal: Principal = Depends(get_principal)
+):
+    """
+    Submit a multi-FASTA file as the raw request body (e.g. `curl --data-binary @query.fasta`).
+    The body is validated and written to the task work directory chunk by chunk; tasks stores only
+    its sha256 and record count. All records are searched in one job; each hit carries the FASTA id
+    of its record as `query_id`.
+    """
+    scope = normalize_scopes(db_scope or DEFAULT_DB_SCOPE)
+    if not scope:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No valid db scope")
+    ok, bad_scope = check_db_scope_permission(principal, scope)
+    if not ok:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Access denied: {bad_scope}")
+
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Upload exceeds {UPLOAD_MAX_BYTES} bytes")
+
+    # get_principal 可能已占用连接；读取上传内容期间不持有连接
+    await release_request_connection()
+
+    task_id = f"job_{uuid.uuid4().hex}"
+    created = int(time.time())
+    query_path = await asyncio.to_thread(upload_query_path, task_id)
+    try:
+        # 校验与文件写入在线程中执行，不阻塞事件循环
+        out = await asyncio.to_thread(open, query_path, "wb")
+        try:
+            writer = FastaStreamWriter(out, UPLOAD_MAX_BYTES, UPLOAD_MAX_RECORDS, UPLOAD_MAX_SEQUENCE_LENGTH)
+            async for chunk in request.stream():
+                await asyncio.to_thread(writer.feed, chunk)
+            digest = await asyncio.to_thread(writer.close)
+        finally:
+            await asyncio.to_thread(out.close)
+    except FastaLimitError as e:
+        await asyncio.to_thread(remove_task_workdir, task_id)
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except FastaFormatError as e:
+        await asyncio.to_thread(remove_task_workdir, task_id)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except BaseException:
+        # client disconnect etc.
+        await asyncio.to_thread(remove_task_workdir, task_id)
+        raise
+
+    await execute(
+        """
+        INSERT INTO tasks (id, created_at, owner, token_key, content, input_mode, detected_mode,
+                           requested_db_scope, filters, status, slurm_job_id, content_sha256, record_count)
+        VALUES ($1, to_timestamp($2), $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13)
+        """,
+        task_id, created, principal.owner, principal.token_key or "", "", "FILE", "FASTA",
+        scope, json.dumps({}), "CREATING", None, digest, writer.records,
+    )
+    ahead = await enqueue_submission(Submission(task_id, "", "FASTA", scope))
+    return JobResponse(task_id=task_id, status="CREATING", queue_position=ahead)
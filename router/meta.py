@@ -1,60 +1,128 @@
+import asyncio
+import hashlib
 import json
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, NamedTuple
 
 from fastapi import Depends, Header
+from fastapi.responses import Response
 
 from auth import get_principal, Principal
 from config import DEFAULT_DB_SCOPE, LANGUAGE_CODES
-from utils.database import fetch
+from utils.catalog import get_catalog
+from utils.database import fetchrow
+from utils.responses import FastJSONResponse
 from utils.scope_proceed import normalize_scopes
 from . import router
 
 
-# Helper: load database groups and databases from Postgres
-async def load_database_groups() -> List[Dict[str, Any]]:
-    rows = await fetch("SELECT id, label, type FROM database_groups ORDER BY id")
-    return [{"id": r["id"], "label": r["label"], "type": r["type"]} for r in rows]
+# databases, groups and filter fields in a single round trip
+_CONFIG_SQL = """
+WITH ff AS (
+    SELECT db_id, jsonb_agg(to_jsonb(f) ORDER BY f.key) AS filter_fields
+    FROM db_filter_fields f
+    GROUP BY db_id
+)
+SELECT
+    (SELECT version FROM catalog_version) AS version,
+    (SELECT COALESCE(jsonb_agg(jsonb_build_object('id', g.id, 'label', g.label, 'type', g.type) ORDER BY g.id),
+                     '[]'::jsonb)
+     FROM database_groups g) AS database_groups,
+    (SELECT COALESCE(jsonb_agg(to_jsonb(d) || jsonb_build_object('filter_fields', COALESCE(ff.filter_fields, '[]'::jsonb))
+                               ORDER BY d.id),
+                     '[]'::jsonb)
+     FROM databases d LEFT JOIN ff ON ff.db_id = d.id) AS databases
+"""
 
-async def load_databases(accept_language: str) -> List[Dict[str, Any]]:
-    rows = await fetch("SELECT * FROM databases ORDER BY id")
+
+class _ConfigPayload(NamedTuple):
+    version: int
+    database_groups: List[Dict[str, Any]]
+    databases: List[Dict[str, Any]]
+    etag: str
+
+
+# language -> precomputed payload (before per-principal masking)
+_payloads: Dict[str, _ConfigPayload] = {}
+_build_lock = asyncio.Lock()
+
+
+def _localized(row: Dict[str, Any], lang: str) -> Optional[str]:
+    return row.get(f"label_{lang}") or row.get("label_en_us")
+
+
+def _build_databases(db_rows: List[Dict[str, Any]], lang: str) -> List[Dict[str, Any]]:
     res = []
-    label = f"label_{accept_language}"
-    sql = f"""
-        SELECT key, label_en_us, {label}, unit, type FROM db_filter_fields WHERE db_id = $1
-        """
-    for r in rows:
-        # load filter_fields for each db
-        frows = await fetch(sql, r["id"])
-        filter_fields = []
-        for f in frows:
-            filter_fields.append({
+    for r in db_rows:
+        filter_fields = [
+            {
                 "key": f["key"],
-                "label": f[f"{label}"] or f["label_en_us"],
-                "unit": f["unit"],
-                "type": f["type"]
-            })
+                "label": _localized(f, lang),
+                "unit": f.get("unit"),
+                "type": f.get("type"),
+            }
+            for f in r["filter_fields"]
+        ]
         item = {
             "id": r["id"],
-            "label": r[f"{label}"] or r["label_en_us"],
+            "label": _localized(r, lang),
             "group_id": r["group_id"],
             "source_type": r["source_type"],
             "disabled": r["disabled"] or False,
         }
         if filter_fields:
             item["filter_fields"] = filter_fields
-        if r["extra"] is not None:
-            item["extra"] = json.loads(r["extra"])
+        extra = r.get("extra")
+        if extra is not None:
+            item["extra"] = json.loads(extra) if isinstance(extra, str) else extra
         res.append(item)
     return res
 
+
+async def _load_payloads() -> Dict[str, _ConfigPayload]:
+    row = await fetchrow(_CONFIG_SQL)
+    version = int(row["version"] or 0)
+    groups = json.loads(row["database_groups"])
+    db_rows = json.loads(row["databases"])
+    payloads = {}
+    for lang in LANGUAGE_CODES:
+        dbs = _build_databases(db_rows, lang)
+        body = json.dumps([DEFAULT_DB_SCOPE, groups, dbs], sort_keys=True, ensure_ascii=False)
+        etag = hashlib.sha1(body.encode("utf-8")).hexdigest()
+        payloads[lang] = _ConfigPayload(version, groups, dbs, etag)
+    return payloads
+
+
+async def get_config_payload(lang: str) -> _ConfigPayload:
+    """Return the cached payload for `lang`, rebuilding it when the catalog version moved on."""
+    global _payloads
+    catalog_version = get_catalog().version
+    cached = _payloads.get(lang)
+    if cached is not None and cached.version >= catalog_version:
+        return cached
+    async with _build_lock:
+        cached = _payloads.get(lang)
+        if cached is None or cached.version < catalog_version:
+            _payloads = await _load_payloads()
+        return _payloads[lang]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [t.strip() for t in if_none_match.split(",")]
+    return "*" in candidates or any(t.removeprefix("W/") == etag for t in candidates)
+
+
 @router.get("/api/v1/meta/config")
 async def meta_config(
     accept_language: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     principal: Principal = Depends(get_principal)
 ):
     """
     Return default_scope, database_groups and databases filtered by principal scopes.
-    If a database is private and the principal lacks permission, it will be excluded.
+    Databases outside the principal's scopes are returned with disabled=True.
+    The payload is built once per language; only the masking is computed per request.
     """
     # parse language
     if accept_language:
@@ -64,35 +132,34 @@ async def meta_config(
     if not accept_language in LANGUAGE_CODES:
         accept_language = "en_us"
 
-    # load all groups and dbs
-    groups = await load_database_groups()
-    dbs = await load_databases(accept_language)
-
-    allowed_scopes = await normalize_scopes(principal.scopes + DEFAULT_DB_SCOPE)
-
-    # Build filtered db list: keep db if its group_id is public OR principal has explicit db_id
-    filtered = []
-    for db in dbs:
-        group_id = db.get("group_id")
-        if group_id == "group:public":
-            filtered.append(db)
-            continue
-        # private group: check if principal has permission to this db id or group
-        if db["id"] in allowed_scopes:
-            filtered.append(db)
-            continue
-        # Otherwise, hide the db (do not include)
-        # Alternative: include but mark as disabled. Here we choose to exclude for clarity.
-        # If you prefer to include but mark disabled, set 'disabled': True and push minimal info.
-        # Example:
-        db_copy = db.copy()
-        db_copy["disabled"] = True
-        filtered.append(db_copy)
-    # Determine default_scope from config (DEFAULT_DB_SCOPE)
-    default_scope = DEFAULT_DB_SCOPE
-
-    return {
-        "default_scope": default_scope,
-        "database_groups": groups,
-        "databases": filtered
+    payload = await get_config_payload(accept_language)
+    allowed_scopes = set(normalize_scopes(principal.scopes + DEFAULT_DB_SCOPE))
+
+    # keep db if its group_id is public OR principal has explicit db_id; otherwise mark disabled
+    masked_ids = [
+        db["id"] for db in payload.databases
+        if db.get("group_id") != "group:public" and db["id"] not in allowed_scopes
+    ]
+    etag = '"' + hashlib.sha1(f"{payload.etag}:{','.join(masked_ids)}".encode("utf-8")).hexdigest() + '"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Vary": "Accept-Language, X-API-Key",
     }
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    if masked_ids:
+        masked = set(masked_ids)
+        databases = [{**db, "disabled": True} if db["id"] in masked else db for db in payload.databases]
+    else:
+        databases = payload.databases
+
+    return FastJSONResponse(
+        content={
+            "default_scope": DEFAULT_DB_SCOPE,
+            "database_groups": payload.database_groups,
+            "databases": databases
+        },
+        headers=headers,
+    )
@@ -0,0 +1,67 @@
+import time
+
+from fastapi import HTTPException, status
+from fastapi.responses import Response
+
+from auth import principal_cache_stats
+from config import METRICS_ENABLED, METRICS_TASK_COUNT_TTL
+from router import router
+from router.job_results import result_page_cache_stats
+from router.protein import entry_cache_stats
+from utils import metrics
+from utils.database import fetch, pool_stats
+from utils.dispatcher import pending_submissions
+from utils.ingest import is_ingest_leader
+from utils.task_events import add_event_handler
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_task_counts_at = 0.0
+
+
+async def _collect_pool() -> None:
+    for state, value in pool_stats().items():
+        metrics.DB_POOL_CONNECTIONS.set(value, state)
+
+
+async def _collect_tasks() -> None:
+    # GROUP BY over the whole table: rate-limited so frequent scrapes from several Prometheus servers stay cheap
+    global _task_counts_at
+    now = time.monotonic()
+    if now - _task_counts_at < METRICS_TASK_COUNT_TTL:
+        return
+    _task_counts_at = now
+    rows = await fetch("SELECT status, count(*) AS n FROM tasks GROUP BY status")
+    metrics.TASKS.replace({(r["status"] or "UNKNOWN",): r["n"] for r in rows})
+
+
+async def _collect_queue() -> None:
+    metrics.ADMISSION_QUEUE_DEPTH.set(await pending_submissions())
+
+
+async def _collect_caches() -> None:
+    metrics.set_cache_stats("principal", principal_cache_stats())
+    metrics.set_cache_stats("entry", entry_cache_stats())
+    metrics.set_cache_stats("result_pages", result_page_cache_stats())
+
+
+def _observe_turnaround(event: dict) -> None:
+    # every replica receives every task_finished notification: only the ingest leader observes them, so the
+    # histogram summed across replicas counts each task once
+    if not is_ingest_leader():
+        return
+    elapsed = event.get("elapsed")
+    if elapsed is not None:
+        metrics.TASK_TURNAROUND_SECONDS.observe(float(elapsed), event.get("status") or "UNKNOWN")
+
+
+for _hook in (_collect_pool, _collect_tasks, _collect_queue, _collect_caches):
+    metrics.add_scrape_hook(_hook)
+add_event_handler(_observe_turnaround)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return Response(content=await metrics.render_metrics(), media_type=CONTENT_TYPE)
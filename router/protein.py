@@ -1,40 +1,133 @@
-from fastapi import HTTPException, Depends
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, Depends, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
 from starlette import status
 
 from auth import Principal, get_principal, check_db_scope_permission
+from config import DATA_BATCH_MAX_ITEMS, ENTRY_CACHE_MAX_BYTES
 from router import router
+from router.meta import etag_matches
+from schemas import DataBatchRequest
+from utils.cache import ByteLRUCache
+from utils.catalog import Catalog, add_refresh_hook, get_catalog
 from utils.database import fetchrow
+from utils.entries import entry_payload, fetch_entries, group_by_table
+from utils.responses import dumps
 from utils.scope_proceed import normalize_scopes
 
+# (db_id, accession, build_version) -> (serialized entry, etag); rows only change when a database is rebuilt
+_entry_cache = ByteLRUCache(ENTRY_CACHE_MAX_BYTES)
+# db_id -> lookup SQL; a stable text per table lets asyncpg reuse one prepared statement per connection
+_entry_sql: Dict[str, str] = {}
+
+
+def entry_cache_stats():
+    return _entry_cache.stats()
+
+
+def _evict_rebuilt(catalog: Catalog) -> None:
+    def stale(key) -> bool:
+        info = catalog.databases.get(key[0])
+        return info is None or info.build_version != key[2]
+    _entry_cache.drop_keys_where(stale)
+
+
+add_refresh_hook(_evict_rebuilt)
+
+
+def _lookup_sql(db_id: str) -> str:
+    sql = _entry_sql.get(db_id)
+    if sql is None:
+        sql = _entry_sql[db_id] = f"SELECT * FROM {db_id} WHERE accession = $1"
+    return sql
+
+
+def _not_modified_since(if_modified_since: Optional[str], built_at: Optional[datetime]) -> bool:
+    if not if_modified_since or built_at is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP dates have second resolution
+    return built_at.replace(microsecond=0) <= since
+
 
 @router.get("/api/v1/data/{db_id}/{accession}")
 async def get_entry(
     db_id: str,
     accession: str,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
     principal: Principal = Depends(get_principal)
 ):
-    db_scope = await normalize_scopes([db_id])
+    db_scope = normalize_scopes([db_id])
     if not db_scope:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Not found: {db_id}")
     ok, bad_scope = check_db_scope_permission(principal, [db_id])
     if not ok:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Access denied: {bad_scope}")
 
-    result = await fetchrow(f"SELECT * FROM {db_id} WHERE accession = $1", accession)
+    info = get_catalog().databases[db_id]
+    headers = {
+        "Cache-Control": "private, no-cache",
+        "Vary": "X-API-Key",
+    }
+    if info.built_at is not None:
+        headers["Last-Modified"] = format_datetime(info.built_at.astimezone(timezone.utc), usegmt=True)
+    key = (db_id, accession, info.build_version)
+    cached = _entry_cache.get(key)
+    if cached is None:
+        result = await fetchrow(_lookup_sql(db_id), accession)
+        if result is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Not found: {accession}")
+        body = dumps(jsonable_encoder(entry_payload(result)))
+        cached = (body, '"' + hashlib.sha1(body).hexdigest() + '"')
+        _entry_cache.set(key, cached)
 
-    if result is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Not found: {accession}")
+    body, etag = cached
+    headers["ETag"] = etag
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110); evaluated once the entry is known to exist
+    if if_none_match is None and _not_modified_since(if_modified_since, info.built_at):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
-    row_dict = dict(result)
 
-    attributes = {
-        k: v for k, v in row_dict.items()
-        if k not in ("accession", "sequence", "external_url") and v is not None
-    }
+@router.post("/api/v1/data/batch")
+async def get_entries_batch(req: DataBatchRequest, principal: Principal = Depends(get_principal)):
+    """
+    Resolve many (db_id, accession) pairs at once: one query per source table, tables in parallel.
+    Results keep the request order; unknown databases or accessions come back with found=false.
+    """
+    if len(req.items) > DATA_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Too many items (max {DATA_BATCH_MAX_ITEMS})")
 
-    return {
-        "accession": row_dict.get("accession"),
-        "sequence": row_dict.get("sequence"),
-        "external_url": row_dict.get("external_url"),
-        "attributes": attributes,
-    }
+    catalog = get_catalog()
+    known = sorted({it.db_id for it in req.items if it.db_id in catalog.database_ids})
+    ok, bad_scope = check_db_scope_permission(principal, known)
+    if not ok:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Access denied: {bad_scope}")
+
+    pairs = [(it.db_id, it.accession) for it in req.items if it.db_id in catalog.database_ids]
+    found = await fetch_entries(group_by_table(pairs))
+
+    results: List[dict] = []
+    for it in req.items:
+        row = found.get(it.db_id, {}).get(it.accession)
+        results.append({
+            "db_id": it.db_id,
+            "accession": it.accession,
+            "found": row is not None,
+            "entry": entry_payload(row) if row is not None else None,
+        })
+    return {"results": results}
@@ -0,0 +1,46 @@
+import asyncio
+
+from fastapi import Depends, HTTPException, status
+
+from auth import get_principal, Principal
+from router import router
+from schemas import WebhookRequest
+from utils.database import fetch, fetchrow, execute
+from utils.webhooks import check_webhook_url  # importing registers the task_finished delivery handler
+
+
+def _require_token_id(principal: Principal) -> int:
+    if principal.token_id is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Webhooks require an API key")
+    return principal.token_id
+
+
+@router.post("/api/v1/webhooks")
+async def register_webhook(req: WebhookRequest, principal: Principal = Depends(get_principal)):
+    """Register a URL that receives a POST for every task of this API key that becomes DONE/FAILED."""
+    api_key_id = _require_token_id(principal)
+    try:
+        await asyncio.to_thread(check_webhook_url, req.url)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    row = await fetchrow(
+        "INSERT INTO webhooks (api_key_id, url, secret) VALUES ($1, $2, $3) RETURNING id, url, created_at",
+        api_key_id, req.url, req.secret,
+    )
+    return {"id": row["id"], "url": row["url"], "created_at": row["created_at"].isoformat()}
+
+
+@router.get("/api/v1/webhooks")
+async def list_webhooks(principal: Principal = Depends(get_principal)):
+    api_key_id = _require_token_id(principal)
+    rows = await fetch("SELECT id, url, created_at FROM webhooks WHERE api_key_id = $1 ORDER BY id", api_key_id)
+    return {"webhooks": [{"id": r["id"], "url": r["url"], "created_at": r["created_at"].isoformat()} for r in rows]}
+
+
+@router.delete("/api/v1/webhooks/{webhook_id}")
+async def delete_webhook(webhook_id: int, principal: Principal = Depends(get_principal)):
+    api_key_id = _require_token_id(principal)
+    res = await execute("DELETE FROM webhooks WHERE id = $1 AND api_key_id = $2", webhook_id, api_key_id)
+    if res == "DELETE 0":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return
@@ -6,11 +6,15 @@ class SearchRequest(BaseModel):
     input_mode: Optional[str] = Field("AUTO", pattern="^(AUTO|TEXT|ID|SEQUENCE)$")
     db_scope: Optional[List[str]] = None
     filters: Optional[Dict[str, Any]] = None
+    # identity-100 hits from the source tables: PREVIEW = partial results while blastp runs,
+    # ONLY = finish immediately with them when there are any; None = server default
+    exact_match: Optional[str] = Field(None, pattern="^(OFF|PREVIEW|ONLY)$")
 
 class JobResponse(BaseModel):
     task_id: str
     status: str
     queue_position: int
+    exact_hits: int = 0
 
 class StatusResponse(BaseModel):
     task_id: str
@@ -19,3 +23,27 @@ class StatusResponse(BaseModel):
     queue_position: int
     search_meta: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+
+class BatchSearchRequest(BaseModel):
+    # multi-FASTA text, or a plain list of sequences (query ids become query_1, query_2, ...)
+    content: Optional[str] = None
+    sequences: Optional[List[str]] = None
+    db_scope: Optional[List[str]] = None
+    filters: Optional[Dict[str, Any]] = None
+
+class BatchJobResponse(BaseModel):
+    group_id: str
+    status: str
+    total: int
+    tasks: List[Dict[str, str]]
+
+class WebhookRequest(BaseModel):
+    url: str = Field(..., pattern="^https?://", max_length=2048)
+    secret: Optional[str] = Field(None, max_length=256)   # HMAC-SHA256 key for X-Venus-Signature
+
+class EntryRef(BaseModel):
+    db_id: str
+    accession: str
+
+class DataBatchRequest(BaseModel):
+    items: List[EntryRef] = Field(..., min_length=1)
@@ -0,0 +1,27 @@
+-- Notify API processes when an API key or its permissions change,
+-- so that cached principals (auth.py) are dropped immediately.
+-- payload: api_keys.id
+
+CREATE OR REPLACE FUNCTION notify_api_key_changed() RETURNS trigger AS $$
+DECLARE
+    key_id bigint;
+BEGIN
+    IF TG_TABLE_NAME = 'api_keys' THEN
+        key_id := COALESCE(NEW.id, OLD.id);
+    ELSE
+        key_id := COALESCE(NEW.api_key_id, OLD.api_key_id);
+    END IF;
+    PERFORM pg_notify('api_keys_changed', key_id::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS api_keys_changed ON api_keys;
+CREATE TRIGGER api_keys_changed
+    AFTER UPDATE OR DELETE ON api_keys
+    FOR EACH ROW EXECUTE FUNCTION notify_api_key_changed();
+
+DROP TRIGGER IF EXISTS token_db_permissions_changed ON token_db_permissions;
+CREATE TRIGGER token_db_permissions_changed
+    AFTER INSERT OR UPDATE OR DELETE ON token_db_permissions
+    FOR EACH ROW EXECUTE FUNCTION notify_api_key_changed();
@@ -0,0 +1,34 @@
+-- Version counter for the in-process database catalog (utils/catalog.py).
+-- Any change to databases / database_groups / db_filter_fields bumps the version
+-- and notifies API processes on 'catalog_changed' (payload: new version).
+
+CREATE TABLE IF NOT EXISTS catalog_version (
+    singleton boolean PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+    version   bigint NOT NULL DEFAULT 0
+);
+INSERT INTO catalog_version (singleton, version) VALUES (TRUE, 0) ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_catalog_version() RETURNS trigger AS $$
+DECLARE
+    new_version bigint;
+BEGIN
+    UPDATE catalog_version SET version = version + 1 RETURNING version INTO new_version;
+    PERFORM pg_notify('catalog_changed', new_version::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS databases_catalog_changed ON databases;
+CREATE TRIGGER databases_catalog_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON databases
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+DROP TRIGGER IF EXISTS database_groups_catalog_changed ON database_groups;
+CREATE TRIGGER database_groups_catalog_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON database_groups
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+DROP TRIGGER IF EXISTS db_filter_fields_catalog_changed ON db_filter_fields;
+CREATE TRIGGER db_filter_fields_catalog_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON db_filter_fields
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
@@ -0,0 +1,39 @@
+-- Row-per-hit storage for search results (replaces reading the results.results JSON blob).
+-- results keeps one summary row per task (total); new tasks no longer fill results.results.
+-- hit_no is the 0-based ordinal written by process_fasta and is the keyset tie-breaker.
+
+CREATE TABLE IF NOT EXISTS result_hits (
+    task_id     text             NOT NULL,
+    hit_no      integer          NOT NULL,
+    accession   text             NOT NULL,
+    name        text,
+    source_db   text             NOT NULL,
+    source_type text,
+    score       double precision NOT NULL DEFAULT 0,
+    identity    double precision,
+    e_value     double precision,
+    PRIMARY KEY (task_id, hit_no)
+);
+
+-- one index per sort_by (see router/job_results.py); expressions must match the ORDER BY there
+CREATE INDEX IF NOT EXISTS result_hits_score_idx
+    ON result_hits (task_id, score DESC, hit_no DESC);
+CREATE INDEX IF NOT EXISTS result_hits_identity_idx
+    ON result_hits (task_id, (COALESCE(identity, -1)) DESC, hit_no DESC);
+CREATE INDEX IF NOT EXISTS result_hits_evalue_idx
+    ON result_hits (task_id, (COALESCE(e_value, 'Infinity'::float8)), hit_no);
+
+-- backfill existing results
+INSERT INTO result_hits (task_id, hit_no, accession, name, source_db, source_type, score, identity, e_value)
+SELECT r.task_id,
+       (h.ord - 1)::int,
+       h.hit ->> 'accession',
+       h.hit ->> 'name',
+       h.hit ->> 'source_db',
+       h.hit ->> 'source_type',
+       COALESCE((h.hit ->> 'score')::float8, 0),
+       (h.hit ->> 'identity')::float8,
+       (h.hit ->> 'e_value')::float8
+FROM results r
+CROSS JOIN LATERAL jsonb_array_elements(r.results::jsonb) WITH ORDINALITY AS h(hit, ord)
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,19 @@
+-- Batch submissions: one job_groups row per batch, one tasks row per query sequence.
+-- All tasks of a group share the group's Slurm array job id.
+
+CREATE TABLE IF NOT EXISTS job_groups (
+    id                 text        PRIMARY KEY,
+    created_at         timestamptz NOT NULL DEFAULT now(),
+    owner              text        NOT NULL,
+    token_key          text,
+    requested_db_scope text[],
+    filters            jsonb,
+    total              integer     NOT NULL,
+    status             text        NOT NULL,
+    slurm_job_id       text,
+    error              text
+);
+
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS group_id text;
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS query_id text;
+CREATE INDEX IF NOT EXISTS tasks_group_id_idx ON tasks (group_id) WHERE group_id IS NOT NULL;
@@ -0,0 +1,32 @@
+-- Content-addressed BLAST result cache (utils/blast_cache.py).
+-- One entry per (sha256 of normalized query sequence, database, database build version).
+-- Bump databases.build_version whenever a BLAST database is rebuilt; stale entries are evicted by trigger.
+
+ALTER TABLE databases ADD COLUMN IF NOT EXISTS build_version integer NOT NULL DEFAULT 1;
+
+CREATE TABLE IF NOT EXISTS blast_cache (
+    seq_hash   text        NOT NULL,
+    db_id      text        NOT NULL,
+    db_version integer     NOT NULL,
+    -- [[accession, name, score, identity, e_value], ...] sorted by score desc
+    hits       jsonb       NOT NULL,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (seq_hash, db_id, db_version)
+);
+CREATE INDEX IF NOT EXISTS blast_cache_db_idx ON blast_cache (db_id, db_version);
+
+CREATE OR REPLACE FUNCTION evict_blast_cache() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM blast_cache WHERE db_id = OLD.id;
+    ELSIF NEW.build_version IS DISTINCT FROM OLD.build_version THEN
+        DELETE FROM blast_cache WHERE db_id = NEW.id AND db_version <> NEW.build_version;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS databases_evict_blast_cache ON databases;
+CREATE TRIGGER databases_evict_blast_cache
+    AFTER UPDATE OF build_version OR DELETE ON databases
+    FOR EACH ROW EXECUTE FUNCTION evict_blast_cache();
@@ -0,0 +1,4 @@
+-- On-disk size of each BLAST database, used to size -num_threads / --cpus-per-task / --mem
+-- (utils/task_workdir.py). NULL means unknown (treated as a small database).
+
+ALTER TABLE databases ADD COLUMN IF NOT EXISTS blast_db_bytes bigint;
@@ -0,0 +1,43 @@
+-- Push notifications for finished tasks (utils/task_events.py, utils/webhooks.py).
+-- Every transition into DONE/FAILED is announced on 'task_finished'.
+-- payload: {"task_id", "status", "token"} where token = sha256(tasks.token_key); the raw key is never sent.
+
+CREATE OR REPLACE FUNCTION notify_task_finished() RETURNS trigger AS $$
+BEGIN
+    IF NEW.status IN ('DONE', 'FAILED') AND NEW.status IS DISTINCT FROM OLD.status THEN
+        PERFORM pg_notify('task_finished', json_build_object(
+            'task_id', NEW.id,
+            'status', NEW.status,
+            'token', encode(sha256(convert_to(COALESCE(NEW.token_key, ''), 'UTF8')), 'hex')
+        )::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tasks_finished ON tasks;
+CREATE TRIGGER tasks_finished
+    AFTER UPDATE OF status ON tasks
+    FOR EACH ROW EXECUTE FUNCTION notify_task_finished();
+
+-- per-token webhook registrations
+CREATE TABLE IF NOT EXISTS webhooks (
+    id         bigserial   PRIMARY KEY,
+    api_key_id bigint      NOT NULL,
+    url        text        NOT NULL,
+    secret     text,
+    created_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS webhooks_api_key_idx ON webhooks (api_key_id);
+
+-- one row per (webhook, task): claimed by exactly one API replica, records the delivery outcome
+CREATE TABLE IF NOT EXISTS webhook_deliveries (
+    webhook_id   bigint      NOT NULL REFERENCES webhooks(id) ON DELETE CASCADE,
+    task_id      text        NOT NULL,
+    status       text        NOT NULL,           -- SENDING / DELIVERED / FAILED
+    attempts     integer     NOT NULL DEFAULT 0,
+    last_error   text,
+    created_at   timestamptz NOT NULL DEFAULT now(),
+    delivered_at timestamptz,
+    PRIMARY KEY (webhook_id, task_id)
+);
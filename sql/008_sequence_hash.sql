@@ -0,0 +1,39 @@
+-- Exact-match short-circuit (utils/exact_match.py).
+-- Every source table (databases.id) gets a generated seq_md5 column: md5 of the sequence with whitespace
+-- removed and upper-cased, i.e. the same normalization as utils/exact_match.sequence_md5. Postgres keeps it
+-- up to date on INSERT/UPDATE; run `SELECT add_sequence_hash('<table>')` for source tables added later.
+
+CREATE OR REPLACE FUNCTION add_sequence_hash(tbl text) RETURNS void AS $$
+BEGIN
+    EXECUTE format(
+        'ALTER TABLE %I ADD COLUMN IF NOT EXISTS seq_md5 text '
+        'GENERATED ALWAYS AS (md5(upper(regexp_replace(sequence, ''\s'', '''', ''g'')))) STORED',
+        tbl);
+    EXECUTE format('CREATE INDEX IF NOT EXISTS %I ON %I (seq_md5)', tbl || '_seq_md5_idx', tbl);
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    r record;
+BEGIN
+    FOR r IN
+        SELECT d.id
+        FROM databases d
+        JOIN information_schema.columns c
+          ON c.table_schema = current_schema() AND c.table_name = d.id AND c.column_name = 'sequence'
+    LOOP
+        PERFORM add_sequence_hash(r.id);
+    END LOOP;
+END
+$$;
+
+-- identity-100 hits shown while the full search of a task is still running (exact_match = PREVIEW)
+CREATE TABLE IF NOT EXISTS exact_hits (
+    task_id   text NOT NULL,
+    source_db text NOT NULL,
+    accession text NOT NULL,
+    name      text,
+    score     double precision NOT NULL DEFAULT 0,
+    PRIMARY KEY (task_id, source_db, accession)
+);
@@ -0,0 +1,18 @@
+-- Last-Modified of source-table entries (GET /api/v1/data/{db_id}/{accession}).
+-- built_at follows build_version: reloading a database bumps build_version, which stamps built_at.
+
+ALTER TABLE databases ADD COLUMN IF NOT EXISTS built_at timestamptz NOT NULL DEFAULT now();
+
+CREATE OR REPLACE FUNCTION stamp_database_built_at() RETURNS trigger AS $$
+BEGIN
+    IF NEW.build_version IS DISTINCT FROM OLD.build_version THEN
+        NEW.built_at := now();
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS databases_stamp_built_at ON databases;
+CREATE TRIGGER databases_stamp_built_at
+    BEFORE UPDATE OF build_version ON databases
+    FOR EACH ROW EXECUTE FUNCTION stamp_database_built_at();
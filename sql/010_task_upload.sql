@@ -0,0 +1,5 @@
+-- Streamed FASTA uploads (POST /api/v1/search/job/upload): the query file lives in the task work directory;
+-- tasks keeps only its digest and record count (tasks.content is left empty).
+
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS content_sha256 text;
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS record_count integer;
@@ -0,0 +1,4 @@
+-- Retention worker (utils/retention.py): oldest finished tasks first.
+
+CREATE INDEX IF NOT EXISTS tasks_finished_created_idx
+    ON tasks (created_at) WHERE status IN ('DONE', 'FAILED');
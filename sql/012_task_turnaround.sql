@@ -0,0 +1,16 @@
+-- task_finished payload gains "elapsed": seconds from tasks.created_at to the DONE/FAILED transition,
+-- observed by the API as venus_task_turnaround_seconds (utils/metrics.py).
+
+CREATE OR REPLACE FUNCTION notify_task_finished() RETURNS trigger AS $$
+BEGIN
+    IF NEW.status IN ('DONE', 'FAILED') AND NEW.status IS DISTINCT FROM OLD.status THEN
+        PERFORM pg_notify('task_finished', json_build_object(
+            'task_id', NEW.id,
+            'status', NEW.status,
+            'token', encode(sha256(convert_to(COALESCE(NEW.token_key, ''), 'UTF8')), 'hex'),
+            'elapsed', EXTRACT(EPOCH FROM clock_timestamp() - NEW.created_at)
+        )::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
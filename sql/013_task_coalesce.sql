@@ -0,0 +1,5 @@
+-- Coalesced searches (utils/dispatcher.py): single-sequence tasks with the same db scope that arrive within
+-- COALESCE_MAX_WAIT share one multi-query blastp run; coalesce_id names the run and its work directory.
+
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS coalesce_id text;
+CREATE INDEX IF NOT EXISTS tasks_coalesce_id_idx ON tasks (coalesce_id) WHERE coalesce_id IS NOT NULL;
@@ -0,0 +1,6 @@
+-- Webhook delivery claims (utils/webhooks.py): SENDING rows whose claim is older than WEBHOOK_STALE_AFTER
+-- belong to a replica that died mid-delivery and are re-claimed at startup.
+
+ALTER TABLE webhook_deliveries ADD COLUMN IF NOT EXISTS claimed_at timestamptz NOT NULL DEFAULT now();
+CREATE INDEX IF NOT EXISTS webhook_deliveries_sending_idx
+    ON webhook_deliveries (claimed_at) WHERE status = 'SENDING';
@@ -0,0 +1,4 @@
+-- Multi-record FASTA uploads (router/job_upload.py) run as one task: query_id is the FASTA id of the record
+-- a hit belongs to. NULL for single-sequence, ID and batch tasks (a batch task is one query).
+
+ALTER TABLE result_hits ADD COLUMN IF NOT EXISTS query_id text;
@@ -0,0 +1,7 @@
+-- Batch submissions (router/job_batch.py): query_no is the record's position in the submitted batch, so results
+-- come back in submission order (query ids such as q2 / q10 do not sort that way).
+-- job_groups.status only tracks dispatch (CREATING / PENDING / FAILED); the API derives a group's status from
+-- its tasks.
+
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS query_no integer;
+CREATE INDEX IF NOT EXISTS tasks_group_query_no_idx ON tasks (group_id, query_no) WHERE group_id IS NOT NULL;
@@ -0,0 +1,31 @@
+import asyncio
+
+import auth
+from auth import Principal
+
+
+def test_lookup_racing_with_revocation_is_not_cached(monkeypatch):
+    auth.invalidate_principals()
+
+    async def lookup(key):
+        # api_keys 变更通知在查询进行中到达
+        auth._on_api_key_changed("7")
+        return Principal(owner="o", scopes=[], token_id=7, token_key=key)
+
+    monkeypatch.setattr(auth, "verify_api_key_from_db", lookup)
+    princ = asyncio.run(auth.get_principal(x_api_key="k"))
+    assert princ.token_id == 7
+    assert len(auth._principal_cache) == 0
+
+
+def test_lookup_is_cached_without_invalidation(monkeypatch):
+    auth.invalidate_principals()
+
+    async def lookup(key):
+        return Principal(owner="o", scopes=[], token_id=7, token_key=key)
+
+    monkeypatch.setattr(auth, "verify_api_key_from_db", lookup)
+    asyncio.run(auth.get_principal(x_api_key="k"))
+    assert auth._principal_cache.get(auth._cache_key("k")).token_id == 7
+    auth.invalidate_principals(7)
+    assert len(auth._principal_cache) == 0
@@ -0,0 +1,87 @@
+from utils import cache
+from utils.cache import ByteLRUCache, TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    c = TTLCache(maxsize=2, ttl=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1          # "b" is now the LRU entry
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+    assert c.stats()["evictions"] == 1
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    c = TTLCache(maxsize=4, ttl=10)
+    c.set("a", 1)
+    now[0] += 9.9
+    assert c.get("a") == 1
+    now[0] += 0.1
+    assert c.get("a") is None
+    assert len(c) == 0
+    assert c.stats()["misses"] == 1
+
+
+def test_ttl_cache_disabled_with_zero_size():
+    c = TTLCache(maxsize=0, ttl=60)
+    c.set("a", 1)
+    assert c.get("a") is None
+
+
+def test_ttl_cache_drop_where():
+    c = TTLCache(maxsize=4, ttl=60)
+    for i in range(4):
+        c.set(i, {"db": "a" if i % 2 else "b"})
+    assert c.drop_where(lambda v: v["db"] == "a") == 2
+    assert sorted(c._data) == [0, 2]
+
+
+def test_ttl_cache_clear():
+    c = TTLCache(maxsize=2, ttl=60)
+    c.set("a", 1)
+    c.clear()
+    assert len(c) == 0
+
+
+def test_byte_lru_cache_bounded_by_total_size():
+    c = ByteLRUCache(max_bytes=80)
+    for key in "abc":
+        c.set(key, b"x" * 10)
+    assert c.bytes == 30
+    c.get("a")
+    for key in "defgh":
+        c.set(key, b"x" * 10)
+    # 80 bytes 容纳 8 个条目；第 9 个写入淘汰最久未使用的 "b"
+    c.set("i", b"x" * 10)
+    assert c.bytes == 80
+    assert c.get("b") is None
+    assert c.get("a") == b"x" * 10
+    assert c.stats()["evictions"] == 1
+
+
+def test_byte_lru_cache_skips_oversized_values():
+    c = ByteLRUCache(max_bytes=80)
+    c.set("big", b"x" * 11)          # > max_bytes / 8
+    assert c.get("big") is None
+    assert c.bytes == 0
+
+
+def test_byte_lru_cache_replace_and_tuple_size():
+    c = ByteLRUCache(max_bytes=800)
+    c.set("k", (b"x" * 10, "etag", 3))
+    assert c.bytes == 14                 # bytes and str members only
+    c.set("k", b"y" * 5)
+    assert c.bytes == 5 and len(c) == 1
+    assert c.drop_keys_where(lambda k: k == "k") == 1
+    assert c.bytes == 0
+
+
+def test_byte_lru_cache_clear():
+    c = ByteLRUCache(max_bytes=800)
+    c.set("a", b"1")
+    c.clear()
+    assert len(c) == 0 and c.bytes == 0
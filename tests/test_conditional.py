@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from router.meta import etag_matches
+from router.protein import _not_modified_since
+
+ETAG = '"abc123"'
+BUILT_AT = datetime(2024, 5, 1, 12, 30, 15, 250000, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("header,expected", [
+    (None, False),
+    ("", False),
+    ('"abc123"', True),
+    ('W/"abc123"', True),
+    ('"other", "abc123"', True),
+    ('"other"', False),
+    ("*", True),
+    ("abc123", False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, ETAG) is expected
+
+
+@pytest.mark.parametrize("header,expected", [
+    (None, False),
+    ("Wed, 01 May 2024 12:30:15 GMT", True),      # 秒级精度：微秒部分被忽略
+    ("Wed, 01 May 2024 12:30:14 GMT", False),
+    ("Thu, 02 May 2024 00:00:00 GMT", True),
+    ("Wed, 01 May 2024 14:30:15 +0200", True),
+    ("not a date", False),
+])
+def test_not_modified_since(header, expected):
+    assert _not_modified_since(header, BUILT_AT) is expected
+
+
+def test_not_modified_since_without_build_time():
+    assert _not_modified_since("Wed, 01 May 2024 12:30:15 GMT", None) is False
@@ -0,0 +1,24 @@
+import pytest
+
+from utils.content_proceed import detect_input_mode, parse_accessions, parse_multi_fasta
+
+
+@pytest.mark.parametrize("content,expected", [
+    ("P12345", "ID"),
+    ("P12345, Q9Y263\nA0A023GPI8", "ID"),
+    ("MKTAYIAKQR", "SEQUENCE"),
+    ("P12345 kinase", "TEXT"),
+    ("hello", "TEXT"),
+])
+def test_detect_input_mode(content, expected):
+    assert detect_input_mode(content) == expected
+
+
+def test_parse_accessions_dedups_in_order():
+    assert parse_accessions(" Q9Y263,P12345  Q9Y263,,\n") == ["Q9Y263", "P12345"]
+
+
+def test_parse_multi_fasta():
+    text = ">q1 desc\nmk\nta\n\n>q2\nACD\n"
+    assert parse_multi_fasta(text) == [("q1", "MKTA"), ("q2", "ACD")]
+    assert parse_multi_fasta("MKTA") == [("query_1", "MKTA")]
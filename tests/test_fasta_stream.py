@@ -0,0 +1,72 @@
+import hashlib
+import io
+
+import pytest
+
+from utils.fasta_stream import FastaFormatError, FastaLimitError, FastaStreamWriter
+
+
+def _writer(max_bytes=1 << 20, max_records=10, max_sequence_length=1000):
+    out = io.BytesIO()
+    return out, FastaStreamWriter(out, max_bytes, max_records, max_sequence_length)
+
+
+def test_normalizes_across_chunk_boundaries():
+    out, w = _writer()
+    for chunk in [b">q1 some descr", b"iption\nmk ta\r\n", b"yi\n>q2\n", b"ACDE"]:
+        w.feed(chunk)
+    digest = w.close()
+    assert out.getvalue() == b">q1\nMKTA\nYI\n>q2\nACDE\n"
+    assert digest == hashlib.sha256(out.getvalue()).hexdigest()
+    assert w.records == 2
+
+
+def test_empty_header_gets_generated_id():
+    out, w = _writer()
+    w.feed(b">\nMK\n")
+    w.close()
+    assert out.getvalue() == b">query_1\nMK\n"
+
+
+@pytest.mark.parametrize("data", [
+    b"MKTA\n",                    # 第一个 header 之前的序列
+    b">q1\nMKXB1\n",              # 非法残基
+    b">q1\n>q2\nMK\n",            # 空记录
+    b">q1\n",                     # 最后一条记录无序列
+    b"\n \n",                     # 没有记录
+])
+def test_format_errors(data):
+    _, w = _writer()
+    with pytest.raises(FastaFormatError):
+        w.feed(data)
+        w.close()
+
+
+def test_byte_limit():
+    _, w = _writer(max_bytes=10)
+    w.feed(b">q1\nMKTA\n")
+    with pytest.raises(FastaLimitError):
+        w.feed(b"MK")
+
+
+def test_record_limit():
+    _, w = _writer(max_records=2)
+    with pytest.raises(FastaLimitError):
+        w.feed(b">a\nM\n>b\nM\n>c\nM\n")
+
+
+def test_sequence_length_limit_spans_lines():
+    _, w = _writer(max_sequence_length=6)
+    w.feed(b">q1\nMKT\nAYI\n")
+    with pytest.raises(FastaLimitError):
+        w.feed(b"K\n")
+
+
+def test_unterminated_line_limit():
+    _, w = _writer(max_sequence_length=10)
+    with pytest.raises(FastaLimitError):
+        w.feed(b">q1\n" + b"M" * 200)
+
+
+def test_limit_error_is_a_format_error():
+    assert issubclass(FastaLimitError, FastaFormatError)
@@ -0,0 +1,85 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from utils import ingest
+from utils.ingest import TopK
+
+
+def _reference(offers, k):
+    """同一 key 取最高分（同分取最先出现），再按 score 降序、出现顺序取前 k 个"""
+    best = {}
+    for seq, (key, score) in enumerate(offers):
+        if key not in best or score > best[key][0]:
+            best[key] = (score, seq)
+    ranked = sorted(best.items(), key=lambda kv: (-kv[1][0], kv[1][1]))
+    return [(key, score) for key, (score, _) in ranked[:k]]
+
+
+def test_keeps_highest_score_per_key():
+    top = TopK(3)
+    top.offer("a", 10, ("a", 10))
+    top.offer("a", 5, ("a", 5))
+    top.offer("b", 7, ("b", 7))
+    top.offer("a", 12, ("a", 12))
+    assert top.sorted_hits() == [("a", 12), ("b", 7)]
+
+
+def test_ties_keep_first_seen_order():
+    top = TopK(2)
+    for key in "xyz":
+        top.offer(key, 1.0, key)
+    assert top.sorted_hits() == ["x", "y"]
+
+
+def test_evicted_key_can_return_with_higher_score():
+    top = TopK(2)
+    top.offer("a", 1, ("a", 1))
+    top.offer("b", 2, ("b", 2))
+    top.offer("c", 3, ("c", 3))       # evicts "a"
+    top.offer("a", 4, ("a", 4))       # evicts "b"
+    assert top.sorted_hits() == [("a", 4), ("c", 3)]
+
+
+def test_matches_reference_on_random_input():
+    rng = random.Random(42)
+    for k in (1, 5, 50):
+        offers = [(rng.randrange(80), rng.randrange(100)) for _ in range(2000)]
+        top = TopK(k)
+        for key, score in offers:
+            top.offer(key, score, (key, score))
+        assert top.sorted_hits() == _reference(offers, k)
+        # 惰性删除的堆被压缩，大小保持 O(k)
+        assert len(top._heap) <= 2 * k + 16
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "TASK_WORKDIR_BASE", str(tmp_path))
+    monkeypatch.setattr(ingest, "get_catalog", lambda: SimpleNamespace(databases={}))
+    return tmp_path
+
+
+def test_unreadable_chunk_fails_by_group_key(workdir):
+    (workdir / "grp_x").mkdir()
+    loaded = ingest._load_marker("grp_x.1.done")
+    assert loaded.error is not None
+    assert loaded.task_ids == []
+    assert loaded.group_key == "grp_x"
+
+
+def test_non_utf8_bytes_do_not_fail_the_chunk(workdir):
+    d = workdir / "grp_x"
+    d.mkdir()
+    (d / "query_0.fasta").write_bytes(b">job_a\nMK\n>job_b\nMK\n")
+    (d / "combined_0.tsv").write_bytes(
+        b"source_db\tqseqid\tsacc\tstitle\tbitscore\tpident\tevalue\n"
+        b"db1\tjob_a\tP1\tkinase \xff\xfe\t50\t90\t1e-10\n"
+        b"db1\tjob_b\tP2\tx\t40\t80\t1e-5\n"
+    )
+    loaded = ingest._load_marker("grp_x.0.done")
+    assert loaded.error is None
+    assert loaded.task_ids == ["job_a", "job_b"]
+    assert loaded.results["job_a"][0]["accession"] == "P1"
+    assert loaded.results["job_b"][0]["score"] == 40
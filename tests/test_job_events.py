@@ -0,0 +1,39 @@
+import asyncio
+from types import SimpleNamespace
+
+from auth import Principal
+from router import job_events
+
+
+class _Request:
+    async def is_disconnected(self):
+        return False
+
+
+def test_subscription_is_created_by_the_stream_and_always_removed(monkeypatch):
+    subs = []
+
+    def subscribe(token, wanted):
+        sub = SimpleNamespace(queue=asyncio.Queue())
+        subs.append(sub)
+        return sub
+
+    async def fetch(sql, ids):
+        if "token_key" in sql:
+            return [{"id": "job_a", "token_key": "k"}]
+        return [{"id": "job_a", "status": "DONE"}]
+
+    monkeypatch.setattr(job_events, "subscribe", subscribe)
+    monkeypatch.setattr(job_events, "unsubscribe", subs.remove)
+    monkeypatch.setattr(job_events, "fetch", fetch)
+    principal = Principal(owner="o", scopes=[], token_id=1, token_key="k")
+
+    async def run():
+        resp = await job_events.task_events(_Request(), ["job_a"], principal)
+        # 响应体开始发送前没有订阅：客户端提前断开不会遗留订阅
+        assert subs == []
+        body = [chunk async for chunk in resp.body_iterator]
+        assert body == [b'event: task\ndata: {"task_id": "job_a", "status": "DONE"}\n\n']
+        assert subs == []
+
+    asyncio.run(run())
@@ -0,0 +1,25 @@
+import pytest
+from fastapi import HTTPException
+
+from router.job_results import decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize("sort_by,value,hit_no", [("score", 123.5, 0), ("e_value", 1e-180, 4711)])
+def test_cursor_round_trip(sort_by, value, hit_no):
+    cursor = encode_cursor(sort_by, value, hit_no)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, sort_by) == (value, hit_no)
+
+
+def test_cursor_for_another_sort_is_rejected():
+    cursor = encode_cursor("score", 1.0, 3)
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, "identity")
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", "WzEsMl0", "bnVsbA"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, "score")
+    assert exc.value.status_code == 400
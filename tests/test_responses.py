@@ -0,0 +1,24 @@
+from router.job_results import _page_response
+from utils.responses import precompress
+
+BODY = b'{"results": []}'
+
+
+def test_page_varies_by_accept_encoding_on_200_and_304():
+    encoded = precompress(BODY, '"abc"')
+    ok = _page_response(encoded, "gzip", None)
+    assert ok.status_code == 200
+    assert ok.headers["content-encoding"] == "gzip"
+    assert ok.headers["vary"] == "X-API-Key, Accept-Encoding"
+
+    not_modified = _page_response(encoded, "gzip", ok.headers["etag"])
+    assert not_modified.status_code == 304
+    assert not_modified.headers["vary"] == "X-API-Key, Accept-Encoding"
+
+
+def test_identity_variant_has_its_own_etag():
+    encoded = precompress(BODY, '"abc"')
+    plain = _page_response(encoded, None, None)
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["etag"] == '"abc"'
+    assert plain.body == BODY
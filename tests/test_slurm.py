@@ -0,0 +1,24 @@
+import pytest
+
+from utils.slurm import map_sacct_state
+
+
+@pytest.mark.parametrize("raw,expected", [
+    ("COMPLETED", "COMPLETED"),
+    ("completed", "COMPLETED"),
+    ("FAILED", "FAILED"),
+    ("CANCELLED by 1000", "FAILED"),
+    ("CANCELLED+", "FAILED"),
+    ("TIMEOUT", "FAILED"),
+    ("OUT_OF_MEMORY", "FAILED"),
+    ("NODE_FAIL", "FAILED"),
+    ("PREEMPTED", "FAILED"),
+    ("BOOT_FAIL", "FAILED"),
+    ("RUNNING", "RUNNING"),
+    ("COMPLETING", "RUNNING"),
+    ("PENDING", "PENDING"),
+    ("CONFIGURING", "PENDING"),
+    ("SUSPENDED", "SUSPENDED"),
+])
+def test_map_sacct_state(raw, expected):
+    assert map_sacct_state(raw) == expected
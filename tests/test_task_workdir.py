@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils import task_workdir
+from utils.task_workdir import plan_blast_resources
+
+GB = 1024 ** 3
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    sizes = {"a": 8 * GB, "b": 4 * GB, "c": 2 * GB, "d": None}
+    cat = SimpleNamespace(databases={db: SimpleNamespace(size_bytes=s) for db, s in sizes.items()})
+    monkeypatch.setattr(task_workdir, "get_catalog", lambda: cat)
+    monkeypatch.setattr(task_workdir, "BLAST_PARALLEL", True)
+    monkeypatch.setattr(task_workdir, "BLAST_MAX_CPUS", 6)
+    monkeypatch.setattr(task_workdir, "BLAST_BYTES_PER_THREAD", 2 * GB)
+    monkeypatch.setattr(task_workdir, "BLAST_MAX_THREADS_PER_DB", 4)
+    monkeypatch.setattr(task_workdir, "BLAST_MEM_BASE_MB", 1000)
+    monkeypatch.setattr(task_workdir, "BLAST_MEM_DB_FACTOR", 1.0)
+    monkeypatch.setattr(task_workdir, "BLAST_MEM_MAX_MB", 0)
+    return cat
+
+
+def test_threads_follow_database_size(catalog):
+    plan = plan_blast_resources(["a", "b", "c", "d"])
+    # a: 8 GB / 2 GB = 4（BLAST_MAX_THREADS_PER_DB 上限）；大小未知的库按 1 线程
+    assert plan.threads == {"a": 4, "b": 2, "c": 1, "d": 1}
+
+
+def test_waves_are_first_fit_within_cpu_cap(catalog):
+    plan = plan_blast_resources(["a", "b", "c", "d"])
+    assert plan.waves == [["a", "b"], ["c", "d"]]
+    assert plan.cpus == 6
+    # --mem 取最大 wave 的库大小之和
+    assert plan.mem_mb == 1000 + 12 * 1024
+
+
+def test_sequential_without_parallel(catalog, monkeypatch):
+    monkeypatch.setattr(task_workdir, "BLAST_PARALLEL", False)
+    plan = plan_blast_resources(["a", "b", "c"])
+    assert plan.waves == [["a"], ["b"], ["c"]]
+    assert plan.cpus == 4
+    assert plan.mem_mb == 1000 + 8 * 1024
+
+
+def test_mem_is_capped(catalog, monkeypatch):
+    monkeypatch.setattr(task_workdir, "BLAST_MEM_MAX_MB", 4096)
+    assert plan_blast_resources(["a", "b"]).mem_mb == 4096
+
+
+def test_threads_never_exceed_cpu_cap(catalog, monkeypatch):
+    monkeypatch.setattr(task_workdir, "BLAST_MAX_CPUS", 2)
+    plan = plan_blast_resources(["a", "b"])
+    assert plan.threads == {"a": 2, "b": 2}
+    assert plan.waves == [["a"], ["b"]]
+    assert plan.cpus == 2
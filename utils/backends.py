@@ -0,0 +1,246 @@
+import asyncio
+import glob
+import os
+import signal
+import sys
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from config import (SBATCH_MAX_RETRIES, SBATCH_RETRY_BASE_DELAY, EXECUTION_BACKEND, LOCAL_MAX_COST,
+                    LOCAL_MAX_JOBS, LOCAL_HEARTBEAT_TTL, LOCAL_HEARTBEAT_KEY_PREFIX)
+from utils.catalog import get_catalog
+from utils.database import execute
+from utils.ingest import has_marker, wake_ingester
+from utils.redis_client import get_redis
+from utils.slurm import sbatch_submit, scancel
+from utils import slurm_poller
+from utils.slurm_poller import JobState
+
+_ACTIVE_STATUSES = ["CREATING", "PENDING", "RUNNING"]
+
+
+class ExecutionBackend(ABC):
+    """
+    Runs the run_blastp.sh script prepared by utils.task_workdir and reports job state.
+    Job ids are stored in tasks.slurm_job_id; ids of non-Slurm backends carry a `<name>:` prefix.
+    """
+    name = ""
+    local = False   # script runs on the API host (wakes the ingester directly instead of over HTTP)
+
+    @abstractmethod
+    async def submit(self, script_path: str, task_id: str, is_group: bool) -> Optional[str]:
+        """Submit the job script; returns the job id, or None if submission failed."""
+
+    @abstractmethod
+    def get_job_state(self, job_id: str) -> Optional[JobState]:
+        """Latest known state of a job, or None if unknown (yet)."""
+
+    @abstractmethod
+    async def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; False if the job is unknown."""
+
+
+class SlurmBackend(ExecutionBackend):
+    name = "slurm"
+
+    async def submit(self, script_path: str, task_id: str, is_group: bool) -> Optional[str]:
+        for attempt in range(max(SBATCH_MAX_RETRIES, 1)):
+            slurm_job_id = await sbatch_submit(script_path)
+            if slurm_job_id is not None:
+                return slurm_job_id
+            if attempt + 1 < SBATCH_MAX_RETRIES:
+                # Slurm controller 繁忙时指数退避
+                await asyncio.sleep(SBATCH_RETRY_BASE_DELAY * (2 ** attempt))
+        return None
+
+    def get_job_state(self, job_id: str) -> Optional[JobState]:
+        return slurm_poller.get_job_state(job_id)
+
+    async def cancel(self, job_id: str) -> bool:
+        return await scancel(job_id)
+
+
+class LocalBackend(ExecutionBackend):
+    """
+    Runs jobs as subprocesses on the API host, at most LOCAL_MAX_JOBS at a time.
+    Job state lives in this process only; a Redis heartbeat lets a restarted replica find
+    local jobs whose owning process is gone (see utils.dispatcher).
+    """
+    name = "local"
+    local = True
+
+    def __init__(self):
+        self.instance_id = uuid.uuid4().hex
+        self._jobs: "OrderedDict[str, str]" = OrderedDict()   # job id -> PENDING / RUNNING, in submit order
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    def job_prefix(self) -> str:
+        return f"{self.name}:{self.instance_id}:"
+
+    async def submit(self, script_path: str, task_id: str, is_group: bool) -> Optional[str]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(LOCAL_MAX_JOBS, 1))
+        job_id = f"{self.job_prefix()}{uuid.uuid4().hex[:12]}"
+        self._jobs[job_id] = "PENDING"
+        self._tasks[job_id] = asyncio.get_running_loop().create_task(
+            self._run(job_id, script_path, task_id, is_group))
+        return job_id
+
+    def get_job_state(self, job_id: str) -> Optional[JobState]:
+        state = self._jobs.get(job_id)
+        if state is None:
+            return None
+        if state != "PENDING":
+            return JobState(state, -1)
+        ahead = 0
+        for jid, st in self._jobs.items():
+            if jid == job_id:
+                break
+            if st == "PENDING":
+                ahead += 1
+        return JobState(state, ahead)
+
+    async def cancel(self, job_id: str) -> bool:
+        task = self._tasks.get(job_id)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    async def _run(self, job_id: str, script_path: str, task_id: str, is_group: bool):
+        error = None
+        try:
+            async with self._semaphore:
+                self._jobs[job_id] = "RUNNING"
+                work_dir = os.path.dirname(script_path)
+                if is_group:
+                    # array 作业：按分片依次运行，与 Slurm 相同地通过 SLURM_ARRAY_TASK_ID 选择分片
+                    chunks = len(glob.glob(os.path.join(work_dir, "query_*.fasta")))
+                else:
+                    chunks = None
+                for chunk in (range(chunks) if chunks is not None else [None]):
+                    rc = await self._run_script(script_path, work_dir, chunk)
+                    if rc != 0:
+                        error = f"Local job failed with exit code {rc}"
+                        break
+                if error is None:
+                    if await asyncio.to_thread(has_marker, task_id):
+                        wake_ingester()
+                    else:
+                        error = "Job finished without results"
+        except asyncio.CancelledError:
+            error = "Local job cancelled"
+            raise
+        except Exception as e:
+            error = f"Local job failed: {e}"
+        finally:
+            self._jobs.pop(job_id, None)
+            self._tasks.pop(job_id, None)
+            if error is not None:
+                try:
+                    await _mark_job_failed(task_id, is_group, error)
+                except Exception as e:
+                    print(f"failed to record local job failure of {task_id}: {e}", file=sys.stderr)
+
+    @staticmethod
+    async def _run_script(script_path: str, work_dir: str, chunk: Optional[int]) -> int:
+        env = dict(os.environ)
+        suffix = ""
+        if chunk is not None:
+            env["SLURM_ARRAY_TASK_ID"] = str(chunk)
+            suffix = f"_{chunk}"
+        with open(os.path.join(work_dir, f"local{suffix}.out"), "wb") as out, \
+                open(os.path.join(work_dir, f"local{suffix}.err"), "wb") as err:
+            # 独立进程组：取消时连同脚本在后台启动的 blastp 一起终止
+            proc = await asyncio.create_subprocess_exec(
+                "bash", script_path, cwd=work_dir, env=env, stdout=out, stderr=err, start_new_session=True,
+            )
+            try:
+                return await proc.wait()
+            except asyncio.CancelledError:
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                # 回收子进程，避免留下僵尸进程
+                await asyncio.shield(proc.wait())
+                raise
+
+    async def _heartbeat_loop(self):
+        key = f"{LOCAL_HEARTBEAT_KEY_PREFIX}{self.instance_id}"
+        while True:
+            try:
+                await get_redis().set(key, "1", ex=LOCAL_HEARTBEAT_TTL)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"local backend heartbeat failed: {e}", file=sys.stderr)
+            await asyncio.sleep(max(LOCAL_HEARTBEAT_TTL / 3, 1))
+
+    def start(self):
+        if self._heartbeat is None:
+            self._heartbeat = asyncio.get_running_loop().create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        for t in list(self._tasks.values()):
+            t.cancel()
+
+
+async def _mark_job_failed(task_id: str, is_group: bool, error: str):
+    if is_group:
+        await execute("UPDATE tasks SET status=$1, error=$2 WHERE group_id=$3 AND status = ANY($4::text[])",
+                      "FAILED", error, task_id, _ACTIVE_STATUSES)
+        await execute("UPDATE job_groups SET status=$1, error=$2 WHERE id=$3", "FAILED", error, task_id)
+        return
+    await execute("UPDATE tasks SET status=$1, error=$2 WHERE id=$3 AND status = ANY($4::text[])",
+                  "FAILED", error, task_id, _ACTIVE_STATUSES)
+
+
+slurm_backend = SlurmBackend()
+local_backend = LocalBackend()
+_BACKENDS: Dict[str, ExecutionBackend] = {b.name: b for b in (slurm_backend, local_backend)}
+
+
+def backend_for_job(job_id: str) -> ExecutionBackend:
+    name, sep, _ = str(job_id).partition(":")
+    return _BACKENDS.get(name, slurm_backend) if sep else slurm_backend
+
+
+def get_job_state(job_id: str) -> Optional[JobState]:
+    """Latest known state of a job of any backend, or None if unknown (yet)."""
+    return backend_for_job(job_id).get_job_state(str(job_id))
+
+
+async def cancel_job(job_id: str) -> bool:
+    return await backend_for_job(job_id).cancel(str(job_id))
+
+
+def search_cost(content: str, db_scope: List[str]) -> Optional[float]:
+    """Query residues x total blast database bytes; None if any database size is unknown."""
+    catalog = get_catalog()
+    total = 0
+    for db in db_scope:
+        info = catalog.databases.get(db)
+        if info is None or info.size_bytes is None:
+            return None
+        total += info.size_bytes
+    residues = sum(len(ln.strip()) for ln in content.splitlines() if not ln.startswith(">"))
+    return float(residues) * total
+
+
+def select_backend(resolved_mode: str, content: str, db_scope: List[str], is_group: bool) -> ExecutionBackend:
+    if EXECUTION_BACKEND == "local":
+        return local_backend
+    if EXECUTION_BACKEND == "slurm" or is_group or resolved_mode != "SEQUENCE":
+        return slurm_backend
+    cost = search_cost(content, db_scope)
+    if cost is not None and cost <= LOCAL_MAX_COST:
+        return local_backend
+    return slurm_backend
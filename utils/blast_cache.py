@@ -0,0 +1,77 @@
+import hashlib
+import json
+from typing import Dict, List, Tuple
+
+from config import RESULT_MAX_HITS
+from utils.catalog import get_catalog
+from utils.database import fetch
+
+# cached hit layout (see sql/005_blast_cache.sql): [accession, name, score, identity, e_value]
+CachedHits = List[list]
+
+
+def sequence_hash(seq: str) -> str:
+    """sha256 of the normalized sequence (whitespace removed, upper-case)."""
+    normalized = "".join(seq.split()).upper()
+    return hashlib.sha256(normalized.encode("ascii", errors="ignore")).hexdigest()
+
+
+def cache_keys(seq_hash: str, db_scope: List[str]) -> Dict:
+    """Keys the ingester (utils/ingest.py) needs to store per-database hits once the search has run."""
+    catalog = get_catalog()
+    return {
+        "seq_hash": seq_hash,
+        "dbs": {db: catalog.databases[db].build_version for db in db_scope if db in catalog.databases},
+    }
+
+
+async def lookup(seq_hash: str, db_scope: List[str]) -> Tuple[Dict[str, CachedHits], List[str]]:
+    """
+    返回 (命中缓存的 db -> hits, 需要重新计算的 db 列表)。
+    只接受与当前 catalog 中 build_version 一致的条目。
+    """
+    catalog = get_catalog()
+    rows = await fetch(
+        "SELECT db_id, db_version, hits FROM blast_cache WHERE seq_hash = $1 AND db_id = ANY($2::text[])",
+        seq_hash, db_scope,
+    )
+    cached: Dict[str, CachedHits] = {}
+    for r in rows:
+        info = catalog.databases.get(r["db_id"])
+        if info is not None and r["db_version"] == info.build_version:
+            cached[r["db_id"]] = json.loads(r["hits"])
+    missing = [db for db in db_scope if db not in cached]
+    return cached, missing
+
+
+def merge_hits(cached: Dict[str, CachedHits]) -> List[dict]:
+    """Merge per-database cached hits into the task result layout, keeping the global top hits by score."""
+    catalog = get_catalog()
+    merged = []
+    for db, hits in cached.items():
+        info = catalog.databases.get(db)
+        source_type = info.source_type if info else None
+        for accession, name, score, identity, e_value in hits:
+            merged.append({
+                "accession": accession,
+                "name": name,
+                "source_db": db,
+                "source_type": source_type,
+                "score": score,
+                "identity": identity,
+                "e_value": e_value,
+            })
+    merged.sort(key=lambda h: h["score"] or 0.0, reverse=True)
+    return merged[:RESULT_MAX_HITS]
+
+
+def cached_hits_tsv(cached: Dict[str, CachedHits]) -> str:
+    """Render cached hits in the combined TSV layout (source_db, sacc, stitle, bitscore, pident, evalue)."""
+    def fmt(v):
+        return "" if v is None else str(v)
+    lines = []
+    for db, hits in cached.items():
+        for accession, name, score, identity, e_value in hits:
+            title = (name or "").replace("\t", " ").replace("\n", " ")
+            lines.append("\t".join([db, accession, title, fmt(score), fmt(identity), fmt(e_value)]))
+    return "".join(ln + "\n" for ln in lines)
@@ -0,0 +1,135 @@
+import asyncio
+import sys
+from datetime import datetime
+from types import MappingProxyType
+from typing import Callable, Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Tuple
+
+from config import CATALOG_CHANNEL, CATALOG_POLL_INTERVAL
+from utils.database import get_db_pool, fetchrow
+from utils.notify import register_listener
+
+
+class DatabaseInfo(NamedTuple):
+    id: str
+    group_id: Optional[str]
+    source_type: Optional[str]
+    disabled: bool
+    build_version: int
+    size_bytes: Optional[int]
+    built_at: Optional[datetime]
+
+
+class GroupInfo(NamedTuple):
+    id: str
+    label: Optional[str]
+    type: Optional[str]
+
+
+class Catalog(NamedTuple):
+    """
+    Immutable snapshot of `databases` / `database_groups`.
+    A refresh builds a new snapshot and swaps the module reference, so readers never see a half-built catalog.
+    """
+    version: int
+    databases: Mapping[str, DatabaseInfo]          # id -> info
+    groups: Mapping[str, GroupInfo]                # group id -> info (ordered by id)
+    group_members: Mapping[str, Tuple[str, ...]]   # group id -> enabled db ids, sorted
+    database_ids: FrozenSet[str]
+
+
+_EMPTY = Catalog(-1, MappingProxyType({}), MappingProxyType({}), MappingProxyType({}), frozenset())
+
+_catalog: Catalog = _EMPTY
+_refresh_hooks: List[Callable[[Catalog], None]] = []
+_refresh_lock = asyncio.Lock()
+_poll_task: Optional[asyncio.Task] = None
+
+
+def get_catalog() -> Catalog:
+    return _catalog
+
+
+def add_refresh_hook(callback: Callable[[Catalog], None]) -> None:
+    """`callback(new_catalog)` runs after every snapshot swap where the version changed."""
+    _refresh_hooks.append(callback)
+
+
+async def _load_catalog() -> Catalog:
+    pool = get_db_pool()
+    async with pool.acquire() as conn:
+        # 同一快照中读取版本号与数据，避免版本号与内容不一致
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            version = await conn.fetchval("SELECT version FROM catalog_version")
+            grows = await conn.fetch("SELECT id, label, type FROM database_groups ORDER BY id")
+            drows = await conn.fetch(
+                "SELECT id, group_id, source_type, disabled, build_version, blast_db_bytes, built_at "
+                "FROM databases ORDER BY id"
+            )
+
+    groups = {r["id"]: GroupInfo(r["id"], r["label"], r["type"]) for r in grows}
+    databases: Dict[str, DatabaseInfo] = {}
+    members: Dict[str, List[str]] = {}
+    for r in drows:
+        info = DatabaseInfo(r["id"], r["group_id"], r["source_type"], bool(r["disabled"]),
+                            int(r["build_version"]), r["blast_db_bytes"], r["built_at"])
+        databases[info.id] = info
+        if info.group_id is not None and not info.disabled:
+            members.setdefault(info.group_id, []).append(info.id)
+
+    return Catalog(
+        version=int(version or 0),
+        databases=MappingProxyType(databases),
+        groups=MappingProxyType(groups),
+        group_members=MappingProxyType({g: tuple(sorted(ids)) for g, ids in members.items()}),
+        database_ids=frozenset(databases),
+    )
+
+
+async def refresh_catalog(force: bool = False) -> Catalog:
+    global _catalog
+    async with _refresh_lock:
+        if not force:
+            version = await fetchrow("SELECT version FROM catalog_version")
+            if version is not None and int(version["version"]) == _catalog.version:
+                return _catalog
+        new = await _load_catalog()
+        changed = new.version != _catalog.version
+        _catalog = new
+    if changed:
+        for cb in _refresh_hooks:
+            try:
+                cb(new)
+            except Exception as e:
+                print(f"catalog refresh hook failed: {e}", file=sys.stderr)
+    return new
+
+
+def _schedule_refresh(*_args) -> None:
+    asyncio.get_running_loop().create_task(refresh_catalog())
+
+
+async def _poll_loop():
+    # NOTIFY 是主通道；定期比对版本号兜底，防止通知丢失
+    while True:
+        await asyncio.sleep(CATALOG_POLL_INTERVAL)
+        try:
+            await refresh_catalog()
+        except Exception as e:
+            print(f"catalog refresh failed: {e}", file=sys.stderr)
+
+
+async def init_catalog():
+    global _poll_task
+    await refresh_catalog(force=True)
+    if _poll_task is None and CATALOG_POLL_INTERVAL > 0:
+        _poll_task = asyncio.get_running_loop().create_task(_poll_loop())
+
+
+async def stop_catalog():
+    global _poll_task
+    if _poll_task is not None:
+        _poll_task.cancel()
+        _poll_task = None
+
+
+register_listener(CATALOG_CHANNEL, _schedule_refresh, on_reset=_schedule_refresh)
@@ -1,12 +1,15 @@
 # app/utils.py
 import re
-from typing import Literal
+from typing import List, Literal, Tuple
 from config import DEFAULT_DB_SCOPE
 
 UNIPROT_REGEX = re.compile(
     r"^(?:[OPQ][0-9][A-Z0-9]{3}[0-9]|[A-NR-Z][0-9](?:[A-Z][A-Z0-9]{2}[0-9]){1,2})$"
 )
+_ACCESSION_SEP = re.compile(r"[\s,]+")
 AMINO_ACID_ALPHABET = set(list("ACDEFGHIKLMNPQRSTVWY"))
+# str.translate deletion table: whatever survives is not an amino acid letter
+_DELETE_AMINO = {ord(c): None for c in AMINO_ACID_ALPHABET}
 
 def is_uniprot_like_id(s: str) -> bool:
     s = s.strip()
@@ -15,13 +18,41 @@ def is_uniprot_like_id(s: str) -> bool:
 
 def is_amino_acid_sequence(s: str) -> bool:
     s = s.strip().upper()
-    return all(ch in AMINO_ACID_ALPHABET for ch in s)
+    return not s.translate(_DELETE_AMINO)
+
+def parse_accessions(content: str) -> List[str]:
+    """ID 模式：以空白或逗号分隔的 accession 列表，去重并保持顺序"""
+    return list(dict.fromkeys(a for a in _ACCESSION_SEP.split(content.strip()) if a))
 
 def detect_input_mode(content: str) -> Literal["ID","SEQUENCE","TEXT"]:
-    if is_uniprot_like_id(content):
+    # 单个 accession 或以空白/逗号分隔的 accession 列表
+    accessions = parse_accessions(content)
+    if accessions and all(is_uniprot_like_id(a) for a in accessions):
         return "ID"
     if is_amino_acid_sequence(content):
         return "SEQUENCE"
     return "TEXT"
 
-
+def parse_multi_fasta(text: str) -> List[Tuple[str, str]]:
+    """
+    解析 multi-FASTA，返回 [(query_id, sequence), ...]；query_id 为 header 的第一个 token。
+    没有 header 的纯序列被视为单条记录（query_id 为 "query_1"）。
+    """
+    records: List[Tuple[str, str]] = []
+    query_id = None
+    chunks: List[str] = []
+    for ln in text.splitlines():
+        ln = ln.strip()
+        if not ln:
+            continue
+        if ln.startswith(">"):
+            if query_id is not None or chunks:
+                records.append((query_id or f"query_{len(records) + 1}", "".join(chunks)))
+            header = ln[1:].split()
+            query_id = header[0] if header else f"query_{len(records) + 1}"
+            chunks = []
+        else:
+            chunks.append(ln.upper())
+    if query_id is not None or chunks:
+        records.append((query_id or f"query_{len(records) + 1}", "".join(chunks)))
+    return records
@@ -1,11 +1,40 @@
-from typing import Optional
+import asyncio
+import re
+import sys
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 
 import asyncpg
 
-from config import DB_CONFIG
+from config import (DB_CONFIG, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_STATEMENT_CACHE_SIZE, DB_COMMAND_TIMEOUT,
+                    DB_ACQUIRE_TIMEOUT, DB_CONNECT_TIMEOUT, DB_MAX_INACTIVE_LIFETIME)
+from utils.metrics import DB_POOL_ACQUIRE_SECONDS, DB_QUERY_SECONDS
 
 _pool: Optional[asyncpg.pool.Pool] = None
 
+# hot read-only statements -> warm-up arguments; see prepare_on_connect()
+_hot_statements: Dict[str, Tuple] = {}
+
+def prepare_on_connect(query: str, *warm_args) -> str:
+    """
+    Register a hot read-only statement: every new pool connection runs it once with `warm_args`
+    (arguments that match nothing), so it sits in asyncpg's statement cache before the first request.
+    Returns `query` for use as a module constant.
+    """
+    _hot_statements[query] = warm_args
+    return query
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    for query, warm_args in _hot_statements.items():
+        try:
+            await conn.fetch(query, *warm_args)
+        except Exception as e:
+            # 预热失败不影响连接可用（例如旧库缺少某张表）
+            print(f"statement warm-up failed ({statement_label(query)}): {e}", file=sys.stderr)
+
 async def init_db_pool():
     global _pool
     if _pool is None:
@@ -15,8 +44,13 @@ async def init_db_pool():
             database=DB_CONFIG["dbname"],
             host=DB_CONFIG["host"],
             port=DB_CONFIG["port"],
-            min_size=1,
-            max_size=10,
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+            command_timeout=DB_COMMAND_TIMEOUT or None,
+            timeout=DB_CONNECT_TIMEOUT,
+            max_inactive_connection_lifetime=DB_MAX_INACTIVE_LIFETIME,
+            init=_init_connection,
         )
     return _pool
 
@@ -25,18 +59,111 @@ def get_db_pool() -> asyncpg.pool.Pool:
         raise RuntimeError("DB pool not initialized. Call init_db_pool() at app startup.")
     return _pool
 
+_TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+([A-Za-z_][A-Za-z0-9_.]*)", re.IGNORECASE)
+
+@lru_cache(maxsize=2048)
+def statement_label(query: str) -> str:
+    """metrics label of a statement: verb + first table, e.g. "SELECT tasks" (bounded cardinality)"""
+    words = query.split(None, 1)
+    verb = words[0].upper() if words else "?"
+    m = _TABLE_RE.search(query)
+    return f"{verb} {m.group(1)}" if m else verb
+
+async def _pool_acquire():
+    """pool.acquire() that records the time spent waiting for a free connection"""
+    start = time.perf_counter()
+    conn = await get_db_pool().acquire(timeout=DB_ACQUIRE_TIMEOUT or None)
+    DB_POOL_ACQUIRE_SECONDS.observe(time.perf_counter() - start)
+    return conn
+
+class _RequestConnection:
+    """The pool connection of one request handler: acquired on first use, released when the handler returns."""
+    __slots__ = ("owner", "conn", "closed", "in_use")
+
+    def __init__(self):
+        self.owner = asyncio.current_task()
+        self.conn = None
+        self.closed = False
+        self.in_use = 0     # open acquire() blocks (statements / transactions) on conn
+
+_request_slot: ContextVar[Optional[_RequestConnection]] = ContextVar("db_request_connection", default=None)
+
+async def request_connection():
+    """
+    FastAPI dependency (scope="function", see router/__init__.py): all helpers called from the handler's own
+    task share one pool connection instead of acquiring one per statement. It is taken lazily, so cache hits
+    never touch the pool, and released when the handler returns, before a streamed body is sent.
+    Tasks spawned by the handler (asyncio.gather, create_task) inherit the context but use their own connections.
+    """
+    slot = _RequestConnection()
+    _request_slot.set(slot)
+    try:
+        yield
+    finally:
+        slot.closed = True
+        if slot.conn is not None:
+            conn, slot.conn = slot.conn, None
+            await get_db_pool().release(conn)
+
+@asynccontextmanager
+async def acquire():
+    """A connection for a few statements: the request's connection when called from a handler, else the pool's."""
+    slot = _request_slot.get()
+    if slot is not None and not slot.closed and slot.owner is asyncio.current_task():
+        if slot.conn is None:
+            slot.conn = await _pool_acquire()
+        slot.in_use += 1
+        try:
+            yield slot.conn
+        finally:
+            slot.in_use -= 1
+        return
+    conn = await _pool_acquire()
+    try:
+        yield conn
+    finally:
+        await get_db_pool().release(conn)
+
+async def release_request_connection():
+    """
+    Give the request's connection back to the pool before a long non-DB await (reading an upload body,
+    fanning out over several pool connections); the handler's next statement acquires one again.
+    No-op outside a handler's own task or while a statement / transaction is using the connection.
+    """
+    slot = _request_slot.get()
+    if slot is None or slot.conn is None or slot.in_use or slot.owner is not asyncio.current_task():
+        return
+    conn, slot.conn = slot.conn, None
+    await get_db_pool().release(conn)
+
 # helper to run simple query
 async def fetch(query: str, *args):
-    pool = get_db_pool()
-    async with pool.acquire() as conn:
-        return await conn.fetch(query, *args)
+    async with acquire() as conn:
+        with DB_QUERY_SECONDS.time("fetch", statement_label(query)):
+            return await conn.fetch(query, *args)
 
 async def fetchrow(query: str, *args):
-    pool = get_db_pool()
-    async with pool.acquire() as conn:
-        return await conn.fetchrow(query, *args)
+    async with acquire() as conn:
+        with DB_QUERY_SECONDS.time("fetchrow", statement_label(query)):
+            return await conn.fetchrow(query, *args)
 
 async def execute(query: str, *args):
-    pool = get_db_pool()
-    async with pool.acquire() as conn:
-        return await conn.execute(query, *args)
+    async with acquire() as conn:
+        with DB_QUERY_SECONDS.time("execute", statement_label(query)):
+            return await conn.execute(query, *args)
+
+async def executemany(query: str, args):
+    async with acquire() as conn:
+        with DB_QUERY_SECONDS.time("executemany", statement_label(query)):
+            return await conn.executemany(query, args)
+
+@asynccontextmanager
+async def transaction():
+    async with acquire() as conn:
+        async with conn.transaction():
+            yield conn
+
+def pool_stats() -> dict:
+    if _pool is None:
+        return {}
+    return {"open": _pool.get_size(), "idle": _pool.get_idle_size(), "max": _pool.get_max_size()}
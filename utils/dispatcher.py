@@ -0,0 +1,439 @@
+import asyncio
+import json
+import sys
+import time
+import uuid
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from config import (SUBMIT_CONCURRENCY, SUBMIT_RECOVER_ON_STARTUP, LOCAL_HEARTBEAT_KEY_PREFIX, BLAST_CACHE_ENABLED, QUEUE_KEY, TASK_HASH_PREFIX,
+                    MAX_INFLIGHT_JOBS, DISPATCH_CAPACITY_POLL, DISPATCH_BLOCK_TIMEOUT,
+                    DISPATCH_CLAIM_TIMEOUT, DISPATCH_RECOVER_LOCK_KEY, COALESCE_ENABLED, COALESCE_MAX_BATCH,
+                    COALESCE_MAX_WAIT)
+from utils.backends import ExecutionBackend, local_backend, select_backend
+from utils.blast_cache import cache_keys, sequence_hash
+from utils.database import execute, fetch, fetchrow
+from utils.redis_client import get_redis
+from utils.task_workdir import prepare_task_workdir, prepare_group_workdir
+
+
+class Submission(NamedTuple):
+    task_id: str              # task id, or group id for batch submissions
+    content: str
+    resolved_mode: str
+    db_scope: List[str]       # databases that still need a blastp run
+    queries: Optional[List[Tuple[str, str]]] = None   # batch: [(task_id, sequence), ...]
+    cached_tsv: Optional[str] = None                  # hits of databases served from blast_cache
+
+
+# Admission queue layout (Redis):
+#   QUEUE_KEY                  list of task/group ids, RPUSH on submit, BLPOP by dispatcher workers
+#                              (LPUSH back to the head when no job slot is free)
+#   QUEUE_KEY:seq              counter, incremented per enqueue
+#   QUEUE_KEY:waiting          sorted set id -> seq of entries not yet claimed or cancelled
+#   QUEUE_KEY:reserved         sorted set token -> time of Slurm job slots reserved by dispatcher workers
+#   TASK_HASH_PREFIX{id}       hash: seq, payload (Submission as JSON), claimed_at
+# queue position = ZRANK in QUEUE_KEY:waiting (O(log n)); cancelled entries leave it immediately.
+_SEQ_KEY = f"{QUEUE_KEY}:seq"
+_WAITING_KEY = f"{QUEUE_KEY}:waiting"
+_RESERVED_KEY = f"{QUEUE_KEY}:reserved"
+
+_ENQUEUE_LUA = """
+local seq = redis.call('INCR', KEYS[2])
+redis.call('DEL', KEYS[4])
+redis.call('HSET', KEYS[4], 'seq', seq, 'payload', ARGV[2])
+redis.call('RPUSH', KEYS[1], ARGV[1])
+redis.call('ZADD', KEYS[3], seq, ARGV[1])
+return redis.call('ZRANK', KEYS[3], ARGV[1])
+"""
+
+# Returns the payload, or nil when the entry is gone (task deleted) or already claimed (duplicate entry).
+_CLAIM_LUA = """
+redis.call('ZREM', KEYS[1], ARGV[2])
+local seq = redis.call('HGET', KEYS[2], 'seq')
+if not seq then return false end
+if redis.call('HSETNX', KEYS[2], 'claimed_at', ARGV[1]) == 0 then return false end
+return redis.call('HGET', KEYS[2], 'payload')
+"""
+
+# Put a claimed entry back at the head of the queue (no job slot free); no-op if it was cancelled meanwhile.
+_UNCLAIM_LUA = """
+local seq = redis.call('HGET', KEYS[3], 'seq')
+if not seq then return 0 end
+redis.call('HDEL', KEYS[3], 'claimed_at')
+redis.call('ZADD', KEYS[2], seq, ARGV[1])
+redis.call('LPUSH', KEYS[1], ARGV[1])
+return 1
+"""
+
+# Reserve a job slot: drop reservations of workers that died (older than ARGV[2] seconds), add ARGV[3],
+# return the number of live reservations including this one.
+_RESERVE_LUA = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', tonumber(ARGV[1]) - tonumber(ARGV[2]))
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[3])
+return redis.call('ZCARD', KEYS[1])
+"""
+
+_workers: List[asyncio.Task] = []
+_fast_lane: Set[asyncio.Task] = set()
+
+# Coalescing (COALESCE_ENABLED): claimed single-sequence submissions wait up to COALESCE_MAX_WAIT for others
+# with the same db scope; each window runs as one multi-query blastp in work directory `run_<hex>`
+# (tasks.coalesce_id) and the ingester splits the hits back per task by qseqid.
+_windows: Dict[Tuple[str, ...], List[Submission]] = {}
+_window_timers: Dict[Tuple[str, ...], asyncio.Task] = {}
+
+
+def _task_key(task_id: str) -> str:
+    return f"{TASK_HASH_PREFIX}{task_id}"
+
+
+def _encode(sub: Submission) -> str:
+    return json.dumps(sub._asdict())
+
+
+def _decode(payload: str) -> Submission:
+    d = json.loads(payload)
+    if d.get("queries") is not None:
+        d["queries"] = [tuple(q) for q in d["queries"]]
+    return Submission(**d)
+
+
+async def pending_submissions() -> int:
+    return await get_redis().zcard(_WAITING_KEY)
+
+
+def _backend_for(sub: Submission) -> ExecutionBackend:
+    return select_backend(sub.resolved_mode, sub.content, sub.db_scope, sub.queries is not None)
+
+
+async def enqueue_submission(sub: Submission) -> int:
+    """Queue a CREATING task for dispatch; returns the number of submissions ahead of it."""
+    backend = _backend_for(sub)
+    if backend.local:
+        # 本地快速通道：不经过 admission queue，也不占用 Slurm 在途上限
+        t = asyncio.get_running_loop().create_task(_dispatch(sub, backend))
+        _fast_lane.add(t)
+        t.add_done_callback(_fast_lane.discard)
+        return 0
+    ahead = await get_redis().eval(
+        _ENQUEUE_LUA, 4, QUEUE_KEY, _SEQ_KEY, _WAITING_KEY, _task_key(sub.task_id), sub.task_id, _encode(sub),
+    )
+    return int(ahead)
+
+
+async def queue_position(task_id: str) -> Optional[int]:
+    """Submissions ahead of a task still waiting in the admission queue; None if it is not queued."""
+    return await get_redis().zrank(_WAITING_KEY, task_id)
+
+
+async def cancel_submission(task_id: str) -> None:
+    """Drop a queued submission; its queue entry is skipped when a worker reaches it."""
+    async with get_redis().pipeline(transaction=True) as pipe:
+        pipe.delete(_task_key(task_id))
+        pipe.zrem(_WAITING_KEY, task_id)
+        await pipe.execute()
+
+
+async def inflight_jobs() -> int:
+    # 以 DB 为准（poller 写入终态），多个 API 实例共享同一上限
+    row = await fetchrow(
+        "SELECT count(DISTINCT slurm_job_id) AS n FROM tasks "
+        "WHERE status IN ('PENDING', 'RUNNING') AND slurm_job_id IS NOT NULL AND slurm_job_id NOT LIKE 'local:%'"
+    )
+    return int(row["n"]) if row else 0
+
+
+async def _mark_failed(sub: Submission, error: str):
+    if sub.queries is None:
+        await execute("UPDATE tasks SET status=$1, error=$2 WHERE id=$3 AND status=$4",
+                      "FAILED", error, sub.task_id, "CREATING")
+        return
+    await execute("UPDATE tasks SET status=$1, error=$2 WHERE group_id=$3 AND status=$4",
+                  "FAILED", error, sub.task_id, "CREATING")
+    await execute("UPDATE job_groups SET status=$1, error=$2 WHERE id=$3",
+                  "FAILED", error, sub.task_id)
+
+
+async def _mark_submitted(sub: Submission, slurm_job_id: str):
+    # 更新任务表 slurm_job_id & 标记为 PENDING
+    if sub.queries is None:
+        await execute("UPDATE tasks SET status=$1, slurm_job_id=$2 WHERE id=$3 AND status=$4",
+                      "PENDING", slurm_job_id, sub.task_id, "CREATING")
+        return
+    await execute("UPDATE tasks SET status=$1, slurm_job_id=$2 WHERE group_id=$3 AND status=$4",
+                  "PENDING", slurm_job_id, sub.task_id, "CREATING")
+    await execute("UPDATE job_groups SET status=$1, slurm_job_id=$2 WHERE id=$3",
+                  "PENDING", slurm_job_id, sub.task_id)
+
+
+async def _dispatch(sub: Submission, backend: Optional[ExecutionBackend] = None):
+    backend = backend or _backend_for(sub)
+    try:
+        if sub.queries is None:
+            cache_meta = None
+            if BLAST_CACHE_ENABLED and sub.resolved_mode == "SEQUENCE":
+                cache_meta = cache_keys(sequence_hash(sub.content), sub.db_scope)
+            script_path = await asyncio.to_thread(
+                prepare_task_workdir, sub.task_id, sub.content, sub.resolved_mode, sub.db_scope,
+                sub.cached_tsv, cache_meta, backend.local,
+            )
+        else:
+            script_path = await asyncio.to_thread(
+                prepare_group_workdir, sub.task_id, sub.queries, sub.db_scope, backend.local)
+    except Exception as e:
+        await _mark_failed(sub, f"Failed to prepare work directory: {e}")
+        return
+
+    job_id = await backend.submit(script_path, sub.task_id, sub.queries is not None)
+    if job_id is None:
+        await _mark_failed(sub, f"Failed to submit job to {backend.name}")
+        return
+    await _mark_submitted(sub, job_id)
+
+
+def _coalescible(sub: Submission, backend: ExecutionBackend) -> bool:
+    # 缓存部分命中的任务需要合并各自的 cached_tsv，仍单独运行
+    return (COALESCE_ENABLED and COALESCE_MAX_BATCH > 1 and sub.queries is None and not backend.local
+            and sub.resolved_mode == "SEQUENCE" and not sub.cached_tsv)
+
+
+async def _coalesce(sub: Submission):
+    key = tuple(sorted(sub.db_scope))
+    window = _windows.setdefault(key, [])
+    window.append(sub)
+    if len(window) >= COALESCE_MAX_BATCH:
+        timer = _window_timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        await _run_window(_windows.pop(key))
+    elif key not in _window_timers:
+        _window_timers[key] = asyncio.get_running_loop().create_task(_close_window(key))
+
+
+async def _close_window(key: Tuple[str, ...]):
+    await asyncio.sleep(COALESCE_MAX_WAIT)
+    _window_timers.pop(key, None)
+    subs = _windows.pop(key, [])
+    if subs:
+        await _run_window(subs)
+
+
+async def _run_window(subs: List[Submission]):
+    r = get_redis()
+    try:
+        # 窗口期间被删除的任务（cancel_submission 已删除其队列项）不再运行
+        async with r.pipeline(transaction=False) as pipe:
+            for sub in subs:
+                pipe.exists(_task_key(sub.task_id))
+            alive = await pipe.execute()
+        subs = [sub for sub, ok in zip(subs, alive) if ok]
+        if subs:
+            token = await _reserve_capacity()
+            try:
+                if len(subs) == 1:
+                    await _dispatch(subs[0])
+                else:
+                    await _dispatch_coalesced(subs)
+            finally:
+                await _release_capacity(token)
+    except Exception as e:
+        print(f"coalesced dispatch of {len(subs)} tasks failed: {e}", file=sys.stderr)
+    finally:
+        if subs:
+            await r.delete(*[_task_key(sub.task_id) for sub in subs])
+
+
+async def _dispatch_coalesced(subs: List[Submission]):
+    run_id = f"run_{uuid.uuid4().hex}"
+    task_ids = [sub.task_id for sub in subs]
+    backend = _backend_for(subs[0])
+    cache_meta = None
+    if BLAST_CACHE_ENABLED:
+        cache_meta = {sub.task_id: cache_keys(sequence_hash(sub.content), sub.db_scope) for sub in subs}
+    try:
+        # 一个分片：所有 query 共用一次 blastp（每个库只加载一次）
+        script_path = await asyncio.to_thread(
+            prepare_group_workdir, run_id, [(sub.task_id, sub.content) for sub in subs], subs[0].db_scope,
+            backend.local, len(subs), cache_meta,
+        )
+    except Exception as e:
+        await _mark_tasks_failed(task_ids, f"Failed to prepare work directory: {e}")
+        return
+
+    job_id = await backend.submit(script_path, run_id, True)
+    if job_id is None:
+        await _mark_tasks_failed(task_ids, f"Failed to submit job to {backend.name}")
+        return
+    await execute("UPDATE tasks SET status=$1, slurm_job_id=$2, coalesce_id=$3 WHERE id = ANY($4::text[]) AND status=$5",
+                  "PENDING", job_id, run_id, task_ids, "CREATING")
+
+
+async def _mark_tasks_failed(task_ids: List[str], error: str):
+    await execute("UPDATE tasks SET status=$1, error=$2 WHERE id = ANY($3::text[]) AND status=$4",
+                  "FAILED", error, task_ids, "CREATING")
+
+
+_NO_CAP = ""   # reservation token when MAX_INFLIGHT_JOBS is disabled
+
+
+async def _try_reserve_capacity() -> Optional[str]:
+    """Reserve one job slot under MAX_INFLIGHT_JOBS; returns the reservation token, None if all slots are taken."""
+    if MAX_INFLIGHT_JOBS <= 0:
+        return _NO_CAP
+    r = get_redis()
+    token = uuid.uuid4().hex
+    # 先登记预留再读取 DB 在途数：并发 worker（含其他实例）之间只会重复计数，不会超出上限
+    reserved = await r.eval(_RESERVE_LUA, 1, _RESERVED_KEY, str(time.time()), str(DISPATCH_CLAIM_TIMEOUT), token)
+    if await inflight_jobs() + int(reserved) <= MAX_INFLIGHT_JOBS:
+        return token
+    await r.zrem(_RESERVED_KEY, token)
+    return None
+
+
+async def _reserve_capacity() -> str:
+    """Wait until a job slot can be reserved; returns the reservation token."""
+    while True:
+        token = await _try_reserve_capacity()
+        if token is not None:
+            return token
+        await asyncio.sleep(DISPATCH_CAPACITY_POLL)
+
+
+async def _release_capacity(token: Optional[str]):
+    # 作业已写入 tasks（计入 inflight_jobs）或未提交时释放预留
+    if token:
+        await get_redis().zrem(_RESERVED_KEY, token)
+
+
+async def _claim_next() -> Optional[Submission]:
+    r = get_redis()
+    item = await r.blpop([QUEUE_KEY], timeout=DISPATCH_BLOCK_TIMEOUT)
+    if item is None:
+        return None
+    _, task_id = item
+    payload = await r.eval(_CLAIM_LUA, 2, _WAITING_KEY, _task_key(task_id), str(time.time()), task_id)
+    return _decode(payload) if payload else None
+
+
+async def _unclaim(task_id: str):
+    await get_redis().eval(_UNCLAIM_LUA, 3, QUEUE_KEY, _WAITING_KEY, _task_key(task_id), task_id)
+
+
+async def _worker():
+    while True:
+        sub = None
+        token = None
+        try:
+            # 先出队再预留容量：空闲 worker 阻塞在 BLPOP 时不占用在途作业名额
+            sub = await _claim_next()
+            if sub is None:
+                continue
+            backend = _backend_for(sub)
+            if _coalescible(sub, backend):
+                # 合并窗口负责 dispatch（另行预留容量）与删除队列项
+                await _coalesce(sub)
+                continue
+            token = await _try_reserve_capacity()
+            if token is None:
+                # 在途作业已满：放回队首（恢复 queue_position），稍后重新出队
+                await _unclaim(sub.task_id)
+                sub = None
+                await asyncio.sleep(DISPATCH_CAPACITY_POLL)
+                continue
+            await _dispatch(sub, backend)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"dispatch of {sub.task_id if sub else '<queue>'} failed: {e}", file=sys.stderr)
+            if sub is None:
+                await asyncio.sleep(DISPATCH_CAPACITY_POLL)
+                continue
+        finally:
+            try:
+                await _release_capacity(token)
+            except Exception as e:
+                print(f"failed to release dispatch reservation: {e}", file=sys.stderr)
+        if sub is not None:
+            await get_redis().delete(_task_key(sub.task_id))
+
+
+async def _needs_requeue(task_id: str) -> bool:
+    """True if a CREATING task is neither waiting in the queue nor claimed by a live worker."""
+    seq, claimed_at = await get_redis().hmget(_task_key(task_id), "seq", "claimed_at")
+    if seq is None:
+        return True
+    return claimed_at is not None and time.time() - float(claimed_at) > DISPATCH_CLAIM_TIMEOUT
+
+
+async def _reset_orphaned_local_jobs():
+    """Local jobs whose owning API process no longer sends heartbeats go back to CREATING."""
+    rows = await fetch(
+        "SELECT DISTINCT slurm_job_id FROM tasks "
+        "WHERE status IN ('PENDING', 'RUNNING') AND slurm_job_id LIKE 'local:%'"
+    )
+    r = get_redis()
+    orphaned = []
+    for row in rows:
+        instance_id = row["slurm_job_id"].split(":")[1]
+        if instance_id != local_backend.instance_id and not await r.exists(f"{LOCAL_HEARTBEAT_KEY_PREFIX}{instance_id}"):
+            orphaned.append(row["slurm_job_id"])
+    if orphaned:
+        await execute("UPDATE tasks SET status='CREATING', slurm_job_id=NULL WHERE slurm_job_id = ANY($1::text[])",
+                      orphaned)
+        await execute("UPDATE job_groups SET status='CREATING', slurm_job_id=NULL WHERE slurm_job_id = ANY($1::text[])",
+                      orphaned)
+
+
+async def _recover_creating_tasks():
+    # 多实例同时启动时只由一个实例执行恢复
+    if not await get_redis().set(DISPATCH_RECOVER_LOCK_KEY, "1", nx=True, ex=60):
+        return
+    await _reset_orphaned_local_jobs()
+    rows = await fetch(
+        "SELECT id, content, detected_mode, requested_db_scope FROM tasks "
+        "WHERE status = 'CREATING' AND slurm_job_id IS NULL AND group_id IS NULL ORDER BY created_at"
+    )
+    for r in rows:
+        if await _needs_requeue(r["id"]):
+            await enqueue_submission(
+                Submission(r["id"], r["content"], r["detected_mode"], list(r["requested_db_scope"] or [])))
+
+    groups = await fetch("SELECT id, requested_db_scope FROM job_groups WHERE status = 'CREATING' ORDER BY created_at")
+    for g in groups:
+        if not await _needs_requeue(g["id"]):
+            continue
+        trows = await fetch("SELECT id, content FROM tasks WHERE group_id = $1 ORDER BY query_no, query_id", g["id"])
+        queries = [(t["id"], t["content"]) for t in trows]
+        await enqueue_submission(Submission(g["id"], "", "SEQUENCE", list(g["requested_db_scope"] or []), queries))
+
+
+async def start_dispatcher():
+    local_backend.start()
+    if SUBMIT_RECOVER_ON_STARTUP:
+        try:
+            await _recover_creating_tasks()
+        except Exception as e:
+            print(f"dispatcher recovery failed: {e}", file=sys.stderr)
+    loop = asyncio.get_running_loop()
+    while len(_workers) < max(SUBMIT_CONCURRENCY, 1):
+        _workers.append(loop.create_task(_worker()))
+
+
+async def stop_dispatcher():
+    for w in _workers:
+        w.cancel()
+    _workers.clear()
+    for t in list(_fast_lane):
+        t.cancel()
+    for t in _window_timers.values():
+        t.cancel()
+    _window_timers.clear()
+    waiting = [sub for subs in _windows.values() for sub in subs]
+    _windows.clear()
+    for sub in waiting:
+        # 尚未运行的合并窗口放回 admission queue，由其他实例（或重启后）处理
+        try:
+            await enqueue_submission(sub)
+        except Exception as e:
+            print(f"failed to re-queue {sub.task_id}: {e}", file=sys.stderr)
+    await local_backend.stop()
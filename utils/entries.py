@@ -0,0 +1,56 @@
+import asyncio
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+import asyncpg
+
+from utils.catalog import get_catalog
+from utils.database import fetch, release_request_connection
+
+# columns returned as top-level fields; seq_md5 is internal (sql/008_sequence_hash.sql)
+_ENTRY_FIELDS = ("accession", "sequence", "external_url")
+_HIDDEN_FIELDS = _ENTRY_FIELDS + ("seq_md5",)
+
+
+def entry_payload(row: Mapping) -> dict:
+    """Response layout of one source-table row (GET /api/v1/data/{db_id}/{accession})."""
+    row_dict = dict(row)
+    attributes = {
+        k: v for k, v in row_dict.items()
+        if k not in _HIDDEN_FIELDS and v is not None
+    }
+    return {
+        "accession": row_dict.get("accession"),
+        "sequence": row_dict.get("sequence"),
+        "external_url": row_dict.get("external_url"),
+        "attributes": attributes,
+    }
+
+
+def group_by_table(pairs: Iterable[Tuple[str, str]]) -> Dict[str, List[str]]:
+    """[(db_id, accession), ...] -> {db_id: [distinct accessions in input order]}"""
+    groups: Dict[str, List[str]] = {}
+    seen = set()
+    for db_id, accession in pairs:
+        if (db_id, accession) in seen:
+            continue
+        seen.add((db_id, accession))
+        groups.setdefault(db_id, []).append(accession)
+    return groups
+
+
+async def _fetch_table(db_id: str, accessions: List[str]) -> List[asyncpg.Record]:
+    # db_id 必须来自 catalog（调用方已校验），不能直接使用请求中的字符串
+    return await fetch(f"SELECT * FROM {db_id} WHERE accession = ANY($1::text[])", accessions)
+
+
+async def fetch_entries(groups: Dict[str, List[str]]) -> Dict[str, Dict[str, asyncpg.Record]]:
+    """
+    One `accession = ANY($1)` query per source table, all tables concurrently (one pool connection each).
+    Returns {db_id: {accession: row}}; tables not in the catalog are skipped.
+    """
+    catalog = get_catalog()
+    tables = [db for db in groups if db in catalog.database_ids and groups[db]]
+    # 各表查询使用各自的连接，请求连接在此期间归还连接池
+    await release_request_connection()
+    results = await asyncio.gather(*(_fetch_table(db, groups[db]) for db in tables))
+    return {db: {r["accession"]: r for r in rows} for db, rows in zip(tables, results)}
@@ -0,0 +1,72 @@
+import hashlib
+import math
+import sys
+from typing import List
+
+import asyncpg
+
+from utils.catalog import get_catalog
+from utils.database import fetch
+
+# BLOSUM62 self-substitution scores; other letters score as X
+_BLOSUM62_DIAG = {
+    "A": 4, "R": 5, "N": 6, "D": 6, "C": 9, "Q": 5, "E": 5, "G": 6, "H": 8, "I": 4,
+    "L": 4, "K": 5, "M": 5, "F": 6, "P": 7, "S": 4, "T": 5, "W": 11, "Y": 7, "V": 4,
+    "B": 4, "Z": 4, "U": 9, "*": 1,
+}
+# Karlin-Altschul parameters of blastp defaults (BLOSUM62, gap open 11, extend 1)
+_LAMBDA = 0.267
+_K = 0.041
+
+
+def normalize_sequence(seq: str) -> str:
+    return "".join(seq.split()).upper()
+
+
+def sequence_md5(seq: str) -> str:
+    """Matches the seq_md5 column generated in sql/008_sequence_hash.sql."""
+    return hashlib.md5(normalize_sequence(seq).encode("utf-8")).hexdigest()
+
+
+def self_bitscore(seq: str) -> float:
+    """Bit score of the full-length identical alignment, as blastp would report it (no composition adjustment)."""
+    raw = sum(_BLOSUM62_DIAG.get(c, -1) for c in normalize_sequence(seq))
+    return round((_LAMBDA * raw - math.log(_K)) / math.log(2), 1)
+
+
+async def lookup_exact(seq: str, db_scope: List[str]) -> List[dict]:
+    """
+    Entries of the scoped source tables whose sequence equals the query, in the task result layout
+    (identity 100, e_value unknown since no alignment ran). One UNION ALL query over all tables.
+    """
+    catalog = get_catalog()
+    dbs = [db for db in db_scope if db in catalog.database_ids]
+    if not dbs:
+        return []
+    normalized = normalize_sequence(seq)
+    # db ids come from the catalog (normalize_scopes), never from the request verbatim
+    parts = [
+        f"SELECT '{db}' AS source_db, accession, to_jsonb(t) ->> 'name' AS name FROM {db} t "
+        f"WHERE seq_md5 = $1 AND upper(regexp_replace(sequence, '\\s', '', 'g')) = $2"
+        for db in dbs
+    ]
+    try:
+        rows = await fetch(" UNION ALL ".join(parts), sequence_md5(normalized), normalized)
+    except asyncpg.UndefinedColumnError as e:
+        # a source table without seq_md5 (see sql/008_sequence_hash.sql): skip the short-circuit
+        print(f"exact match lookup skipped: {e}", file=sys.stderr)
+        return []
+
+    score = self_bitscore(normalized)
+    return [
+        {
+            "accession": r["accession"],
+            "name": r["name"],
+            "source_db": r["source_db"],
+            "source_type": catalog.databases[r["source_db"]].source_type,
+            "score": score,
+            "identity": 100.0,
+            "e_value": None,
+        }
+        for r in rows
+    ]
@@ -0,0 +1,89 @@
+import hashlib
+from typing import BinaryIO
+
+from utils.content_proceed import AMINO_ACID_ALPHABET
+
+_WHITESPACE = b" \t\r\v\f"
+_AMINO = "".join(sorted(AMINO_ACID_ALPHABET)).encode("ascii")
+_TO_UPPER = bytes.maketrans(b"abcdefghijklmnopqrstuvwxyz", b"ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+_MAX_HEADER_ID = 100
+
+
+class FastaFormatError(ValueError):
+    pass
+
+
+class FastaLimitError(FastaFormatError):
+    """Upload exceeds a configured size limit (-> 413)."""
+
+
+class FastaStreamWriter:
+    """
+    Incremental multi-FASTA validator/normalizer that writes to `out` as chunks arrive.
+    Sequence lines are upper-cased, stripped of whitespace and checked with bytes.translate
+    (no per-character Python loop); headers are reduced to their first token.
+    The sha256 digest covers the normalized output.
+    """
+
+    def __init__(self, out: BinaryIO, max_bytes: int, max_records: int, max_sequence_length: int):
+        self.out = out
+        self.max_bytes = max_bytes
+        self.max_records = max_records
+        self.max_sequence_length = max_sequence_length
+        self.bytes_in = 0
+        self.records = 0
+        self._seq_len = 0
+        self._pending = b""
+        self._digest = hashlib.sha256()
+
+    def feed(self, chunk: bytes) -> None:
+        self.bytes_in += len(chunk)
+        if self.bytes_in > self.max_bytes:
+            raise FastaLimitError(f"Upload exceeds {self.max_bytes} bytes")
+        lines = (self._pending + chunk).split(b"\n")
+        self._pending = lines.pop()
+        # 一行未结束的数据也受长度限制，防止无换行的超长输入占满内存
+        if len(self._pending) > self.max_sequence_length + _MAX_HEADER_ID + 2:
+            raise FastaLimitError(f"Line exceeds {self.max_sequence_length} characters")
+        self._write(b"".join(self._line(ln) for ln in lines))
+
+    def close(self) -> str:
+        """Flush the last line, check the final record; returns the hex digest."""
+        if self._pending:
+            self._write(self._line(self._pending))
+            self._pending = b""
+        self._end_record()
+        if self.records == 0:
+            raise FastaFormatError("No FASTA records")
+        return self._digest.hexdigest()
+
+    def _write(self, data: bytes) -> None:
+        if data:
+            self._digest.update(data)
+            self.out.write(data)
+
+    def _end_record(self) -> None:
+        if self.records and self._seq_len == 0:
+            raise FastaFormatError(f"Record {self.records} has no sequence")
+
+    def _line(self, ln: bytes) -> bytes:
+        if ln.startswith(b">"):
+            self._end_record()
+            self.records += 1
+            if self.records > self.max_records:
+                raise FastaLimitError(f"More than {self.max_records} records")
+            self._seq_len = 0
+            token = ln[1:].split(None, 1)
+            header = token[0][:_MAX_HEADER_ID] if token else f"query_{self.records}".encode("ascii")
+            return b">" + header + b"\n"
+        seq = ln.translate(_TO_UPPER, _WHITESPACE)
+        if not seq:
+            return b""
+        if self.records == 0:
+            raise FastaFormatError("Sequence data before the first FASTA header")
+        if seq.translate(None, _AMINO):
+            raise FastaFormatError(f"Invalid residue in record {self.records}")
+        self._seq_len += len(seq)
+        if self._seq_len > self.max_sequence_length:
+            raise FastaLimitError(f"Record {self.records} exceeds {self.max_sequence_length} residues")
+        return seq + b"\n"
@@ -0,0 +1,403 @@
+import asyncio
+import heapq
+import json
+import os
+import sys
+import time
+import uuid
+from itertools import count
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from config import (INGEST_INBOX, INGEST_POLL_INTERVAL, INGEST_BATCH_SIZE, INGEST_MISSING_GRACE, INGEST_LOCK_KEY,
+                    RESULT_MAX_HITS, TASK_WORKDIR_BASE)
+from utils.catalog import get_catalog
+from utils.database import execute, fetch, transaction
+from utils.redis_client import hold_leader_lock
+from utils.result_store import write_results_batch
+
+# Result ingestion: a finished job only leaves its combined TSV and an empty completion marker in INGEST_INBOX
+# (`<task_id>.done`, or `<group_id>.<chunk>.done` for an array element of a batch or coalesced run,
+# see utils/task_workdir.py).
+# The leader replica picks markers up in batches and loads them over the shared pool, so compute nodes
+# never connect to Postgres.
+
+_ACTIVE_STATUSES = ["CREATING", "PENDING", "RUNNING"]
+MARKER_SUFFIX = ".done"
+
+_poll_task: Optional[asyncio.Task] = None
+_wake = asyncio.Event()
+_instance_id = uuid.uuid4().hex
+_leading = False
+# task, group or coalesced run id -> first time its job was seen COMPLETED without a marker
+_missing_since: Dict[str, float] = {}
+
+
+def iter_combined_tsv(path, with_query=False):
+    """
+    流式读取 combined tsv，逐行产出 (query, source_db, sacc, stitle, bitscore, pident, evalue)
+    期望文件以 tab 分隔，第一行为 header；with_query=True 时第二列为 qseqid（batch 作业），否则 query 为 None
+    """
+    if not os.path.exists(path):
+        return
+    offset = 1 if with_query else 0
+    with open(path, "r", encoding="utf-8", errors="replace") as fh:
+        first = True
+        for ln in fh:
+            ln = ln.rstrip("\n")
+            if not ln:
+                continue
+            if first:
+                # skip header line if it matches header
+                first = False
+                if ln.lower().startswith("source_db"):
+                    continue
+            parts = ln.split("\t")
+            # we expect at least 6 cols: source_db, [qseqid,] sacc, stitle, bitscore, pident, evalue
+            if len(parts) < 6 + offset:
+                # skip malformed line
+                continue
+            yield (
+                parts[1] if with_query else None,
+                parts[0],
+                parts[1 + offset],
+                parts[2 + offset],
+                _to_float(parts[3 + offset], 0.0),
+                _to_float(parts[4 + offset], None),
+                _to_float(parts[5 + offset], None),
+            )
+
+
+def _to_float(s, default):
+    try:
+        return float(s) if s != "" else default
+    except ValueError:
+        return default
+
+
+class TopK:
+    """
+    按 bitscore 保留前 k 个命中，同一 key 只保留最高分；内存 O(k)。
+    使用最小堆 + 惰性删除：key 的分数被刷新时旧堆项作废，堆过大时压缩。
+    A key evicted as the minimum can only come back with a higher score than the
+    current minimum, so dropping it never loses a top-k hit.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self._heap = []      # (score, -seq, key)
+        self._best = {}      # key -> (score, -seq, hit)
+        self._seq = count()
+
+    def offer(self, key, score, hit):
+        cur = self._best.get(key)
+        if cur is not None:
+            if score <= cur[0]:
+                return
+        elif len(self._best) >= self.k:
+            if score <= self._min_score():
+                return
+            self._evict_min()
+        entry = (score, -next(self._seq), key)
+        self._best[key] = (entry[0], entry[1], hit)
+        heapq.heappush(self._heap, entry)
+        if len(self._heap) > 2 * self.k + 16:
+            self._compact()
+
+    def _is_live(self, entry):
+        cur = self._best.get(entry[2])
+        return cur is not None and cur[0] == entry[0] and cur[1] == entry[1]
+
+    def _min_score(self):
+        while not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0]
+
+    def _evict_min(self):
+        while True:
+            entry = heapq.heappop(self._heap)
+            if self._is_live(entry):
+                del self._best[entry[2]]
+                return
+
+    def _compact(self):
+        self._heap = [(s, q, key) for key, (s, q, _) in self._best.items()]
+        heapq.heapify(self._heap)
+
+    def sorted_hits(self):
+        """score 降序；同分按出现顺序"""
+        return [hit for _, _, hit in sorted(self._best.values(), key=lambda e: (-e[0], -e[1]))]
+
+
+def _has_query_column(path) -> bool:
+    """combined tsv 的 header 第二列是否为 qseqid"""
+    with open(path, "r", encoding="utf-8", errors="replace") as fh:
+        return fh.readline().lower().startswith("source_db\tqseqid")
+
+
+def read_query_ids(path):
+    """batch 作业：query fasta 的 header 即 task_id"""
+    ids = []
+    with open(path, "r", encoding="utf-8", errors="replace") as fh:
+        for ln in fh:
+            if ln.startswith(">"):
+                ids.append(ln[1:].split()[0])
+    return ids
+
+
+class Loaded(NamedTuple):
+    marker: str
+    task_ids: List[str]
+    results: Dict[str, List[dict]]           # task id -> hits in result order
+    cache_rows: List[Tuple[str, str, int, str]]  # (seq_hash, db_id, db_version, hits json)
+    error: Optional[str]
+    # failed before the chunk's task ids were known: fail every active task of this group / coalesced run
+    group_key: Optional[str] = None
+
+
+def parse_marker(name: str) -> Tuple[str, Optional[int]]:
+    """`job_x.done` -> ("job_x", None); `grp_x.3.done` -> ("grp_x", 3)"""
+    key, _, chunk = name[:-len(MARKER_SUFFIX)].partition(".")
+    return key, (int(chunk) if chunk else None)
+
+
+def has_marker(key: str) -> bool:
+    """Whether a task, group or coalesced run (any chunk) has results waiting in the inbox."""
+    try:
+        with os.scandir(INGEST_INBOX) as it:
+            return any(e.name.endswith(MARKER_SUFFIX) and parse_marker(e.name)[0] == key for e in it)
+    except FileNotFoundError:
+        return False
+
+
+def _list_markers(limit: int) -> List[str]:
+    names = []
+    try:
+        with os.scandir(INGEST_INBOX) as it:
+            for entry in it:
+                if entry.name.endswith(MARKER_SUFFIX):
+                    names.append(entry.name)
+                    if len(names) >= limit:
+                        break
+    except FileNotFoundError:
+        pass
+    return names
+
+
+def _load_marker(name: str) -> Loaded:
+    """Read the combined TSV behind a marker: per-task top hits plus per-database top hits for blast_cache."""
+    key, chunk = parse_marker(name)
+    work_dir = os.path.join(TASK_WORKDIR_BASE or "/tmp/tasks", key)
+    batch = chunk is not None
+    task_ids: Optional[List[str]] = None if batch else [key]
+    cache_meta: Dict[str, dict] = {}   # task id -> blast_cache keys (utils/blast_cache.cache_keys)
+    try:
+        if batch:
+            task_ids = read_query_ids(os.path.join(work_dir, f"query_{chunk}.fasta"))
+            combined = os.path.join(work_dir, f"combined_{chunk}.tsv")
+        else:
+            combined = os.path.join(work_dir, "combined_out.fasta")
+        cache_path = os.path.join(work_dir, "cache_keys.json")
+        if os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as fk:
+                # single task: its keys; coalesced run: keys per task id (prepare_group_workdir)
+                cache_meta = json.load(fk) if batch else {key: json.load(fk)}
+        if not os.path.exists(combined):
+            raise FileNotFoundError(f"combined output missing: {combined}")
+        # batch / coalesced runs: qseqid is the task id; multi-FASTA uploads: qseqid is the record's query id
+        with_query = batch or _has_query_column(combined)
+
+        # stream the TSV once: per task top-k (dedup by query + source_db + accession), plus per (task, db) top-k
+        # for the cache
+        per_task = {tid: TopK(RESULT_MAX_HITS) for tid in task_ids}
+        per_db = {(tid, db): TopK(RESULT_MAX_HITS)
+                  for tid in task_ids if tid in cache_meta for db in cache_meta[tid]["dbs"]}
+        for query, source_db, sacc, stitle, bitscore, pident, evalue in iter_combined_tsv(combined, with_query):
+            tid = query if batch else key
+            top = per_task.get(tid)
+            if top is None:
+                continue
+            query_id = None if batch else query
+            hit = (source_db, sacc, stitle, bitscore, pident, evalue, query_id)
+            top.offer((query_id, source_db, sacc), bitscore, hit)
+            cache_top = per_db.get((tid, source_db))
+            if cache_top is not None:
+                cache_top.offer(sacc, bitscore, hit)
+    except Exception as e:
+        if task_ids is None:
+            return Loaded(name, [], {}, [], f"Result ingestion failed: {e}", key)
+        return Loaded(name, task_ids, {}, [], f"Result ingestion failed: {e}")
+
+    databases = get_catalog().databases
+    results = {}
+    for tid, top in per_task.items():
+        results[tid] = [
+            {
+                "accession": sacc,
+                "name": stitle,
+                "source_db": source_db,
+                "source_type": databases[source_db].source_type if source_db in databases else None,
+                "score": bitscore,
+                "identity": pident,
+                "e_value": evalue,
+                "query_id": query_id,
+            }
+            for source_db, sacc, stitle, bitscore, pident, evalue, query_id in top.sorted_hits()
+        ]
+    cache_rows = []
+    # 本次实际运行的库按 score 保留前 RESULT_MAX_HITS（空结果同样缓存）
+    for (tid, db), top in per_db.items():
+        meta = cache_meta[tid]
+        payload = [[sacc, stitle, bitscore, pident, evalue]
+                   for _, sacc, stitle, bitscore, pident, evalue, _ in top.sorted_hits()]
+        cache_rows.append((meta["seq_hash"], db, meta["dbs"][db], json.dumps(payload)))
+    return Loaded(name, task_ids, results, cache_rows, None)
+
+
+def _remove_markers(names: List[str]) -> None:
+    for name in names:
+        try:
+            os.remove(os.path.join(INGEST_INBOX, name))
+        except FileNotFoundError:
+            pass
+
+
+async def _store(loaded: List[Loaded]) -> None:
+    results: Dict[str, List[dict]] = {}
+    failed: Dict[str, str] = {}
+    failed_groups: Dict[str, str] = {}
+    for item in loaded:
+        if item.error is not None:
+            failed.update((tid, item.error) for tid in item.task_ids)
+            if item.group_key is not None:
+                failed_groups[item.group_key] = item.error
+        else:
+            results.update(item.results)
+
+    async with transaction() as conn:
+        # 只写入仍处于活动状态的任务：已删除 / 已失败 / 已写入（重复的 marker）的任务跳过
+        rows = await conn.fetch(
+            "SELECT id FROM tasks WHERE id = ANY($1::text[]) AND status = ANY($2::text[]) "
+            "AND NOT EXISTS (SELECT 1 FROM results r WHERE r.task_id = tasks.id) FOR UPDATE",
+            list(results), _ACTIVE_STATUSES,
+        )
+        live = {r["id"] for r in rows}
+        await write_results_batch(conn, {tid: hits for tid, hits in results.items() if tid in live})
+        if failed:
+            await conn.execute(
+                "UPDATE tasks t SET status = 'FAILED', error = f.error "
+                "FROM unnest($1::text[], $2::text[]) AS f(id, error) "
+                "WHERE t.id = f.id AND t.status = ANY($3::text[])",
+                list(failed), list(failed.values()), _ACTIVE_STATUSES,
+            )
+        if failed_groups:
+            # query fasta 不可读：分片的 task id 只能从 DB 按 group_id / coalesce_id 解析
+            await conn.execute(
+                "UPDATE tasks t SET status = 'FAILED', error = f.error "
+                "FROM unnest($1::text[], $2::text[]) AS f(key, error) "
+                "WHERE (t.group_id = f.key OR t.coalesce_id = f.key) AND t.status = ANY($3::text[])",
+                list(failed_groups), list(failed_groups.values()), _ACTIVE_STATUSES,
+            )
+
+    # 同一序列可能在一批中出现多次（合并检索）：每个 (seq_hash, db) 只写一行
+    cache_rows = list({row[:2]: row for item in loaded for row in item.cache_rows}.values())
+    if cache_rows:
+        # 缓存写入失败不影响任务结果
+        try:
+            await execute(
+                "INSERT INTO blast_cache (seq_hash, db_id, db_version, hits) "
+                "SELECT s, d, v, h::jsonb FROM unnest($1::text[], $2::text[], $3::int[], $4::text[]) AS u(s, d, v, h) "
+                "ON CONFLICT DO NOTHING",
+                *map(list, zip(*cache_rows)),
+            )
+        except Exception as e:
+            print(f"Failed to store blast cache entries: {e}", file=sys.stderr)
+
+
+async def ingest_once() -> int:
+    """Load one batch of at most INGEST_BATCH_SIZE markers in a single transaction; returns markers handled."""
+    names = await asyncio.to_thread(_list_markers, INGEST_BATCH_SIZE)
+    if not names:
+        return 0
+    loaded = await asyncio.to_thread(lambda: [_load_marker(n) for n in names])
+    await _store(loaded)
+    # markers go only after the commit; a crash in between re-reads them and skips the stored tasks
+    await asyncio.to_thread(_remove_markers, names)
+    return len(names)
+
+
+async def settle_completed(task_ids: List[str]) -> None:
+    """
+    Called by the Slurm poller for active tasks whose job finished successfully. Results normally follow
+    through the inbox; a job that has left no marker after INGEST_MISSING_GRACE produced no results.
+    """
+    rows = await fetch(
+        "SELECT DISTINCT COALESCE(group_id, coalesce_id, id) AS key, group_id IS NOT NULL AS grouped, "
+        "coalesce_id IS NOT NULL AS coalesced "
+        "FROM tasks WHERE id = ANY($1::text[]) AND status = ANY($2::text[])",
+        task_ids, _ACTIVE_STATUSES,
+    )
+    now = time.monotonic()
+    stale_tasks, stale_groups, stale_runs = [], [], []
+    for r in rows:
+        key = r["key"]
+        if await asyncio.to_thread(has_marker, key):
+            _missing_since.pop(key, None)
+            wake_ingester()
+            continue
+        if now - _missing_since.setdefault(key, now) >= INGEST_MISSING_GRACE:
+            _missing_since.pop(key, None)
+            (stale_groups if r["grouped"] else stale_runs if r["coalesced"] else stale_tasks).append(key)
+    if stale_tasks or stale_groups or stale_runs:
+        await execute(
+            "UPDATE tasks SET status = 'FAILED', error = COALESCE(error, 'Job finished without results') "
+            "WHERE (id = ANY($1::text[]) OR group_id = ANY($2::text[]) OR coalesce_id = ANY($3::text[])) "
+            "AND status = ANY($4::text[])",
+            stale_tasks, stale_groups, stale_runs, _ACTIVE_STATUSES,
+        )
+
+
+def wake_ingester() -> None:
+    _wake.set()
+
+
+async def _is_leader() -> bool:
+    global _leading
+    _leading = await hold_leader_lock(INGEST_LOCK_KEY, _instance_id, int(INGEST_POLL_INTERVAL * 3) + 5)
+    return _leading
+
+
+def is_ingest_leader() -> bool:
+    """Whether this instance held the ingest lock at its last check (no Redis round trip)."""
+    return _leading
+
+
+async def _ingest_loop():
+    while True:
+        try:
+            # 多个 API 实例中只有一个读取 inbox
+            if await _is_leader():
+                while await ingest_once() >= INGEST_BATCH_SIZE:
+                    pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"result ingestion failed: {e}", file=sys.stderr)
+        try:
+            await asyncio.wait_for(_wake.wait(), INGEST_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _wake.clear()
+
+
+def start_ingester():
+    global _poll_task
+    os.makedirs(INGEST_INBOX, exist_ok=True)
+    if _poll_task is None:
+        _poll_task = asyncio.get_running_loop().create_task(_ingest_loop())
+
+
+async def stop_ingester():
+    global _poll_task
+    if _poll_task is not None:
+        _poll_task.cancel()
+        _poll_task = None
@@ -0,0 +1,208 @@
+import bisect
+import math
+import sys
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Minimal in-process Prometheus registry (text exposition format 0.0.4), see GET /metrics.
+# Values are per API process; Prometheus aggregates across replicas.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v))
+
+
+class _Metric(ABC):
+    type = ""
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.label_names = tuple(labels)
+        _registry.append(self)
+
+    def _key(self, labels: Sequence[str]) -> LabelValues:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}")
+        return tuple(str(v) for v in labels)
+
+    @abstractmethod
+    def samples(self) -> Iterable[str]:
+        """exposition lines of every label set"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = ()):
+        super().__init__(name, doc, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        for key, v in sorted(self._values.items()):
+            yield f"{self.name}{_fmt_labels(self.label_names, key)} {_fmt_value(v)}"
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = ()):
+        super().__init__(name, doc, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[self._key(labels)] = float(value)
+
+    def replace(self, values: Dict[LabelValues, float]) -> None:
+        """Swap in a complete label set (e.g. per-status counts), dropping labels that disappeared."""
+        self._values = {self._key(k): float(v) for k, v in values.items()}
+
+    def samples(self):
+        for key, v in sorted(self._values.items()):
+            yield f"{self.name}{_fmt_labels(self.label_names, key)} {_fmt_value(v)}"
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def samples(self):
+        for key in sorted(self._counts):
+            counts = self._counts[key]
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = f'le="{_fmt_value(bound)}"'
+                yield f"{self.name}_bucket{_fmt_labels(self.label_names, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_fmt_labels(self.label_names, key)} {_fmt_value(self._sums[key])}"
+            yield f"{self.name}_count{_fmt_labels(self.label_names, key)} {cumulative}"
+
+
+_registry: List[_Metric] = []
+# refreshed right before rendering: gauges whose source is a DB/Redis query or another module's state
+_scrape_hooks: List[Callable[[], Awaitable[None]]] = []
+
+
+def add_scrape_hook(callback: Callable[[], Awaitable[None]]) -> None:
+    _scrape_hooks.append(callback)
+
+
+async def render_metrics() -> str:
+    for hook in _scrape_hooks:
+        try:
+            await hook()
+        except Exception as e:
+            print(f"metrics scrape hook failed: {e}", file=sys.stderr)
+    return "\n".join(m.render() for m in _registry) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware: request latency per route template (not per raw path, to bound cardinality)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status_code = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], path, str(status_code[0]))
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "venus_http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+DB_QUERY_SECONDS = Histogram(
+    "venus_db_query_duration_seconds", "Query time in utils.database helpers by statement",
+    ["op", "statement"],
+)
+DB_POOL_ACQUIRE_SECONDS = Histogram(
+    "venus_db_pool_acquire_seconds", "Time spent waiting for a pool connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "venus_db_pool_connections", "asyncpg pool connections (state = open / idle / max)", ["state"],
+)
+SLURM_COMMAND_SECONDS = Histogram(
+    "venus_slurm_command_duration_seconds", "Duration of Slurm CLI invocations", ["command"],
+)
+SLURM_COMMAND_FAILURES = Counter(
+    "venus_slurm_command_failures_total", "Slurm CLI invocations that failed or timed out", ["command"],
+)
+TASKS = Gauge("venus_tasks", "Tasks by status", ["status"])
+ADMISSION_QUEUE_DEPTH = Gauge("venus_admission_queue_depth", "Submissions waiting in the Redis admission queue")
+TASK_TURNAROUND_SECONDS = Histogram(
+    "venus_task_turnaround_seconds", "Submit-to-finish time of tasks (observed by the ingest leader only)", ["status"],
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 7200, 21600, 86400),
+)
+CACHE_STATS = Gauge("venus_cache", "In-process cache statistics", ["cache", "stat"])
+
+
+def set_cache_stats(cache: str, stats: Dict[str, int]) -> None:
+    for stat, value in stats.items():
+        CACHE_STATS.set(value, cache, stat)
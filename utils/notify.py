@@ -0,0 +1,87 @@
+import asyncio
+import sys
+from typing import Callable, Dict, List, Optional
+
+import asyncpg
+
+from config import DB_CONFIG, NOTIFY_RECONNECT_DELAY
+
+# channel -> callbacks(payload)
+_handlers: Dict[str, List[Callable[[str], None]]] = {}
+# callbacks run when the listener connection is (re)established; notifications may have been missed
+_reset_handlers: List[Callable[[], None]] = []
+
+_conn: Optional[asyncpg.Connection] = None
+_reconnect_task: Optional[asyncio.Task] = None
+_stopping = False
+
+
+def register_listener(channel: str, callback: Callable[[str], None], on_reset: Optional[Callable[[], None]] = None):
+    """
+    Subscribe `callback(payload)` to a Postgres NOTIFY channel.
+    `on_reset` is called whenever the LISTEN connection is (re)opened, so that callers can drop
+    any state that might be stale because notifications were lost in between.
+    Must be called before start_listener() (i.e. at import time).
+    """
+    _handlers.setdefault(channel, []).append(callback)
+    if on_reset is not None:
+        _reset_handlers.append(on_reset)
+
+
+def _dispatch(_conn, _pid, channel: str, payload: str):
+    for cb in _handlers.get(channel, []):
+        try:
+            cb(payload)
+        except Exception as e:
+            print(f"notify handler for {channel} failed: {e}", file=sys.stderr)
+
+
+def _on_termination(_conn):
+    global _reconnect_task
+    if _stopping:
+        return
+    _reconnect_task = asyncio.get_running_loop().create_task(_reconnect())
+
+
+async def _connect():
+    global _conn
+    conn = await asyncpg.connect(
+        user=DB_CONFIG["user"],
+        password=DB_CONFIG["password"],
+        database=DB_CONFIG["dbname"],
+        host=DB_CONFIG["host"],
+        port=DB_CONFIG["port"],
+    )
+    for channel in _handlers:
+        await conn.add_listener(channel, _dispatch)
+    conn.add_termination_listener(_on_termination)
+    _conn = conn
+    for cb in _reset_handlers:
+        cb()
+
+
+async def _reconnect():
+    while not _stopping:
+        await asyncio.sleep(NOTIFY_RECONNECT_DELAY)
+        try:
+            await _connect()
+            return
+        except Exception as e:
+            print(f"notify listener reconnect failed: {e}", file=sys.stderr)
+
+
+async def start_listener():
+    global _stopping
+    _stopping = False
+    if _conn is None and _handlers:
+        await _connect()
+
+
+async def stop_listener():
+    global _conn, _stopping
+    _stopping = True
+    if _reconnect_task is not None:
+        _reconnect_task.cancel()
+    if _conn is not None:
+        await _conn.close()
+        _conn = None
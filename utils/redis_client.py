@@ -0,0 +1,34 @@
+from typing import Optional
+
+import redis.asyncio as aioredis
+
+from config import REDIS_URL
+
+_redis: Optional[aioredis.Redis] = None
+
+# Take the lock if it is free, or extend it if we already hold it; compare and expire in one step so that
+# a lock that expired and was taken over by another instance is never extended.
+_LEADER_LUA = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then return 1 end
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+def get_redis() -> aioredis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = aioredis.from_url(REDIS_URL, decode_responses=True)
+    return _redis
+
+async def close_redis():
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+async def hold_leader_lock(key: str, instance_id: str, ttl: int) -> bool:
+    """Leader election for background loops: True if this instance holds `key` for the next `ttl` seconds."""
+    return bool(await get_redis().eval(_LEADER_LUA, 1, key, instance_id, str(ttl)))
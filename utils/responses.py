@@ -0,0 +1,95 @@
+import gzip
+from typing import Any, Dict, NamedTuple, Optional
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+from config import RESPONSE_GZIP_LEVEL, RESPONSE_ZSTD_LEVEL
+
+try:
+    import zstandard
+except ImportError:  # zstd variants are optional
+    zstandard = None
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any):
+    # Decimal and other types orjson does not know natively
+    return str(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; the application's default response class (see main.py)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class EncodedBody(NamedTuple):
+    """A serialized JSON body with its precompressed variants and strong ETag."""
+    etag: str
+    identity: bytes
+    gzip: bytes
+    zstd: Optional[bytes]
+
+
+def precompress(body: bytes, etag: str) -> EncodedBody:
+    zst = zstandard.ZstdCompressor(level=RESPONSE_ZSTD_LEVEL).compress(body) if zstandard is not None else None
+    return EncodedBody(etag, body, gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0), zst)
+
+
+def variant_etag(etag: str, encoding: Optional[str]) -> str:
+    """Strong ETags must differ per content-coding: '"abc"' -> '"abc-gzip"'."""
+    return etag if not encoding else f'{etag[:-1]}-{encoding}"'
+
+
+def variant_etags(encoded: EncodedBody):
+    return [variant_etag(encoded.etag, enc) for enc in (None, "gzip", "zstd")]
+
+
+def _accepted_encodings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def encoded_response(encoded: EncodedBody, accept_encoding: Optional[str], headers: Dict[str, str]) -> Response:
+    """Serve the best precompressed variant allowed by Accept-Encoding (zstd > gzip > identity)."""
+    accepted = _accepted_encodings(accept_encoding)
+    vary = headers.get("Vary")
+    if not vary:
+        headers = {**headers, "Vary": "Accept-Encoding"}
+    elif "accept-encoding" not in vary.lower():
+        headers = {**headers, "Vary": f"{vary}, Accept-Encoding"}
+    else:
+        headers = dict(headers)
+
+    def allowed(name: str) -> bool:
+        return accepted.get(name, accepted.get("*", 0.0)) > 0
+
+    if encoded.zstd is not None and allowed("zstd"):
+        encoding, body = "zstd", encoded.zstd
+    elif allowed("gzip"):
+        encoding, body = "gzip", encoded.gzip
+    else:
+        encoding, body = None, encoded.identity
+    headers["ETag"] = variant_etag(encoded.etag, encoding)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
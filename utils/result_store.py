@@ -0,0 +1,50 @@
+from typing import Dict, List
+
+import asyncpg
+
+RESULT_HIT_COLUMNS = ["task_id", "hit_no", "accession", "name", "source_db", "source_type",
+                      "score", "identity", "e_value", "query_id"]
+
+
+async def write_task_results(conn: asyncpg.Connection, task_id: str, hits: List[dict]):
+    """
+    Store final hits of a task (result_hits + results summary) and mark it DONE.
+    Call inside a transaction; `hits` must already be in result order.
+    """
+    if hits:
+        await conn.copy_records_to_table(
+            "result_hits",
+            columns=RESULT_HIT_COLUMNS,
+            records=[
+                (task_id, i, h["accession"], h["name"], h["source_db"], h["source_type"],
+                 h["score"], h["identity"], h["e_value"], h.get("query_id"))
+                for i, h in enumerate(hits)
+            ],
+        )
+    await conn.execute("INSERT INTO results (task_id, total, results) VALUES ($1, $2, $3)",
+                       task_id, len(hits), "[]")
+    await conn.execute("UPDATE tasks SET status=$1 WHERE id=$2", "DONE", task_id)
+
+
+async def write_results_batch(conn: asyncpg.Connection, results: Dict[str, List[dict]]):
+    """
+    write_task_results for many tasks at once (result ingestion, see utils/ingest.py):
+    one COPY for all hits, one INSERT into results and one UPDATE of tasks. Call inside a transaction.
+    """
+    if not results:
+        return
+    records = [
+        (task_id, i, h["accession"], h["name"], h["source_db"], h["source_type"],
+         h["score"], h["identity"], h["e_value"], h.get("query_id"))
+        for task_id, hits in results.items()
+        for i, h in enumerate(hits)
+    ]
+    if records:
+        await conn.copy_records_to_table("result_hits", columns=RESULT_HIT_COLUMNS, records=records)
+    task_ids = list(results)
+    await conn.execute(
+        "INSERT INTO results (task_id, total, results) "
+        "SELECT t, n, '[]' FROM unnest($1::text[], $2::int[]) AS u(t, n)",
+        task_ids, [len(results[t]) for t in task_ids],
+    )
+    await conn.execute("UPDATE tasks SET status='DONE' WHERE id = ANY($1::text[])", task_ids)
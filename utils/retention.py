@@ -0,0 +1,166 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from typing import List, Optional
+
+from config import (TASK_WORKDIR_BASE, RETENTION_ENABLED, RETENTION_DAYS, RETENTION_OWNER_DAYS,
+                    RETENTION_INTERVAL, RETENTION_BATCH_SIZE, RETENTION_BATCH_PAUSE, RETENTION_MAX_BATCHES,
+                    RETENTION_ORPHAN_MIN_AGE, RETENTION_ORPHAN_BATCH, RETENTION_LOCK_KEY)
+from utils.database import fetch, get_db_pool, transaction
+from utils.redis_client import hold_leader_lock
+from utils.task_workdir import remove_task_workdir
+
+# rows of other tables that belong to the task ids in the `victims` CTE
+_DELETE_CHILD_ROWS = """
+     h AS (DELETE FROM result_hits WHERE task_id IN (SELECT id FROM victims)),
+     e AS (DELETE FROM exact_hits WHERE task_id IN (SELECT id FROM victims)),
+     w AS (DELETE FROM webhook_deliveries WHERE task_id IN (SELECT id FROM victims)),
+     r AS (DELETE FROM results WHERE task_id IN (SELECT id FROM victims))"""
+
+# every row belonging to the task ids in $1 (text[]), in one statement
+DELETE_TASK_ROWS_SQL = f"""
+WITH victims AS (SELECT unnest($1::text[]) AS id),{_DELETE_CHILD_ROWS}
+DELETE FROM tasks WHERE id IN (SELECT id FROM victims)
+RETURNING id, group_id
+"""
+
+# permission check and delete of one task in one round trip ($1 task id, $2 caller token key, $3 caller owner):
+# returns the task as it was with `allowed`; nothing is deleted unless allowed
+DELETE_OWNED_TASK_SQL = f"""
+WITH t AS (
+         SELECT id, status, slurm_job_id, group_id, coalesce_id,
+                COALESCE(COALESCE(token_key, '') = $2 OR owner = $3, FALSE) AS allowed
+         FROM tasks WHERE id = $1
+     ),
+     victims AS (SELECT id FROM t WHERE allowed),{_DELETE_CHILD_ROWS},
+     d AS (DELETE FROM tasks WHERE id IN (SELECT id FROM victims))
+SELECT id, status, slurm_job_id, group_id, coalesce_id, allowed FROM t
+"""
+
+# oldest finished tasks past their owner's retention ($1 default days, $2 {owner: days}; days <= 0 keeps forever)
+_EXPIRED_SQL = """
+SELECT id FROM tasks
+WHERE status IN ('DONE', 'FAILED')
+  AND COALESCE(($2::jsonb ->> owner)::int, $1) > 0
+  AND created_at < now() - make_interval(days => COALESCE(($2::jsonb ->> owner)::int, $1))
+ORDER BY created_at
+LIMIT $3
+FOR UPDATE SKIP LOCKED
+"""
+
+_poll_task: Optional[asyncio.Task] = None
+_instance_id = uuid.uuid4().hex
+
+
+def _remove_dirs(names: List[str]) -> None:
+    for name in names:
+        remove_task_workdir(name)
+
+
+def _pool_busy() -> bool:
+    # 连接池没有空闲连接时让路给在线请求
+    pool = get_db_pool()
+    return pool.get_size() >= pool.get_max_size() and pool.get_idle_size() == 0
+
+
+async def expire_batch() -> int:
+    """Delete one batch of expired tasks (and emptied job groups) plus their work directories."""
+    async with transaction() as conn:
+        rows = await conn.fetch(_EXPIRED_SQL, RETENTION_DAYS, json.dumps(RETENTION_OWNER_DAYS), RETENTION_BATCH_SIZE)
+        if not rows:
+            return 0
+        deleted = await conn.fetch(DELETE_TASK_ROWS_SQL, [r["id"] for r in rows])
+        group_ids = sorted({r["group_id"] for r in deleted if r["group_id"]})
+        groups = []
+        if group_ids:
+            groups = await conn.fetch(
+                "DELETE FROM job_groups g WHERE g.id = ANY($1::text[]) "
+                "AND NOT EXISTS (SELECT 1 FROM tasks t WHERE t.group_id = g.id) RETURNING id",
+                group_ids,
+            )
+    await asyncio.to_thread(_remove_dirs, [r["id"] for r in deleted] + [g["id"] for g in groups])
+    return len(deleted)
+
+
+def _old_workdirs(limit: int) -> List[str]:
+    base = TASK_WORKDIR_BASE or "/tmp/tasks"
+    cutoff = time.time() - RETENTION_ORPHAN_MIN_AGE
+    names = []
+    try:
+        with os.scandir(base) as it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue  # .ingest 等非任务目录
+                if entry.is_dir(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                    names.append(entry.name)
+                    if len(names) >= limit:
+                        break
+    except FileNotFoundError:
+        pass
+    return names
+
+
+async def remove_orphan_workdirs() -> int:
+    """Work directories (older than RETENTION_ORPHAN_MIN_AGE) whose task, group or coalesced run no longer exists."""
+    names = await asyncio.to_thread(_old_workdirs, RETENTION_ORPHAN_BATCH)
+    if not names:
+        return 0
+    rows = await fetch(
+        "SELECT id FROM tasks WHERE id = ANY($1::text[]) UNION SELECT id FROM job_groups WHERE id = ANY($1::text[]) "
+        "UNION SELECT coalesce_id FROM tasks WHERE coalesce_id = ANY($1::text[])",
+        names,
+    )
+    known = {r["id"] for r in rows}
+    orphans = [n for n in names if n not in known]
+    if orphans:
+        await asyncio.to_thread(_remove_dirs, orphans)
+    return len(orphans)
+
+
+async def run_once() -> int:
+    """One retention pass: at most RETENTION_MAX_BATCHES batches, pausing between them."""
+    removed = 0
+    for _ in range(max(RETENTION_MAX_BATCHES, 1)):
+        if _pool_busy():
+            break
+        n = await expire_batch()
+        removed += n
+        if n < RETENTION_BATCH_SIZE:
+            break
+        await asyncio.sleep(RETENTION_BATCH_PAUSE)
+    if not _pool_busy():
+        removed += await remove_orphan_workdirs()
+    return removed
+
+
+async def _is_leader() -> bool:
+    return await hold_leader_lock(RETENTION_LOCK_KEY, _instance_id, int(RETENTION_INTERVAL * 2) + 1)
+
+
+async def _retention_loop():
+    while True:
+        await asyncio.sleep(RETENTION_INTERVAL)
+        try:
+            # 多个 API 实例中只有一个执行清理
+            if await _is_leader():
+                await run_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"retention pass failed: {e}", file=sys.stderr)
+
+
+def start_retention():
+    global _poll_task
+    if RETENTION_ENABLED and _poll_task is None:
+        _poll_task = asyncio.get_running_loop().create_task(_retention_loop())
+
+
+async def stop_retention():
+    global _poll_task
+    if _poll_task is not None:
+        _poll_task.cancel()
+        _poll_task = None
@@ -1,16 +1,17 @@
 from typing import List
 
-from utils.database import fetch
+from utils.catalog import get_catalog
 
 
-async def normalize_scopes(items: List[str]) -> List[str]:
+def normalize_scopes(items: List[str]) -> List[str]:
     """
     解析输入的资源项和 group:xxx，返回所有资源库 id 的去重列表（数据库存在的）
-    使用你已有的 asyncpg fetch() 工具函数。
+    基于内存中的 catalog 快照（utils.catalog），不访问数据库。
     """
     if not items:
         return []
 
+    catalog = get_catalog()
     groups = []
     explicit_names = []
     seen = set()
@@ -30,32 +31,19 @@ async def normalize_scopes(items: List[str]) -> List[str]:
     results_set = set()
     ordered_result = []
 
-    # --- 1) 查询显式资源名 ---
-    if explicit_names:
-        # 使用 ANY($1::text[]) 查询
-        rows = await fetch(
-            "SELECT id FROM databases WHERE id = ANY($1::text[])",
-            explicit_names,
-        )
-        valid_ids = {r["id"] for r in rows}
-
-        # 按输入顺序加入
-        for name in explicit_names:
-            if name in valid_ids and name not in results_set:
-                ordered_result.append(name)
-                results_set.add(name)
-
-    # --- 2) 查询组内资源 ---
-    if groups:
-        rows = await  fetch(
-            "SELECT id FROM databases WHERE group_id = ANY($1::text[]) AND disabled IS NOT TRUE",
-            groups
-        )
-        group_ids = sorted({r["id"] for r in rows})  # 给组内容一个稳定顺序
-
-        for rid in group_ids:
-            if rid not in results_set:
-                ordered_result.append(rid)
-                results_set.add(rid)
-
-    return ordered_result
\ No newline at end of file
+    # --- 1) 显式资源名：按输入顺序加入 ---
+    for name in explicit_names:
+        if name in catalog.database_ids and name not in results_set:
+            ordered_result.append(name)
+            results_set.add(name)
+
+    # --- 2) 组内资源（不含 disabled），组内容按 id 排序 ---
+    group_ids = set()
+    for g in groups:
+        group_ids.update(catalog.group_members.get(g, ()))
+    for rid in sorted(group_ids):
+        if rid not in results_set:
+            ordered_result.append(rid)
+            results_set.add(rid)
+
+    return ordered_result
@@ -1,70 +1,128 @@
-import subprocess
-from typing import Optional
+import asyncio
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from utils.metrics import SLURM_COMMAND_FAILURES, SLURM_COMMAND_SECONDS
 
-def submit_slurm_job(script_path: str) -> Optional[str]:
+
+def map_sacct_state(state_raw: str) -> str:
+    """sacct State -> 'PENDING' / 'RUNNING' / 'COMPLETED' / 'FAILED'（其他状态原样返回）"""
+    state = state_raw.upper().split()[0]
+    if state.startswith("COMPLETED"):
+        return "COMPLETED"
+    if state.startswith("FAILED") or state.startswith("NODE_FAIL") or state.startswith("CANCELLED") or state.startswith("TIMEOUT") \
+            or state.startswith("OUT_OF_MEMORY") or state.startswith("PREEMPTED") or state.startswith("BOOT_FAIL"):
+        return "FAILED"
+    if state.startswith("RUNNING") or state.startswith("COMPLETING"):
+        return "RUNNING"
+    if state.startswith("PENDING") or state.startswith("CONFIGURING"):
+        return "PENDING"
+    return state
+
+# ---- async variants: never block the event loop ----
+
+# aggregation of job array elements onto the array job id: active > failed > completed
+_STATE_PRIORITY = {"COMPLETED": 1, "FAILED": 2, "PENDING": 3, "RUNNING": 4}
+
+async def run_slurm_command(args: List[str], timeout: float = 30.0) -> Tuple[int, str]:
+    """Run a Slurm CLI command without blocking the event loop. Returns (returncode, stdout)."""
+    command = os.path.basename(args[0])
+    start = time.perf_counter()
     try:
-        r = subprocess.run(["sbatch", script_path], capture_output=True, text=True, check=True)
-        out = r.stdout.strip()
-        # Expect "Submitted batch job 12345"
-        job_id = out.split()[-1]
-        return job_id
-    except subprocess.CalledProcessError as e:
-        # 失败则返回 None（调用方应标记任务 failed）
+        proc = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            out, _ = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
+    except Exception:
+        SLURM_COMMAND_FAILURES.inc(command)
+        raise
+    finally:
+        SLURM_COMMAND_SECONDS.observe(time.perf_counter() - start, command)
+    if proc.returncode != 0:
+        SLURM_COMMAND_FAILURES.inc(command)
+    return proc.returncode, out.decode("utf-8", errors="replace")
+
+async def sbatch_submit(script_path: str) -> Optional[str]:
+    """Async sbatch; returns the Slurm job id or None on failure."""
+    try:
+        rc, out = await run_slurm_command(["sbatch", script_path])
+    except Exception:
         return None
+    if rc != 0 or not out.strip():
+        return None
+    # Expect "Submitted batch job 12345"
+    return out.strip().split()[-1]
 
-def get_slurm_queue_position(slurm_job_id: str, username: str) -> int:
-    """
-    返回 0-based 的前方任务数（PENDING）或 -1（未知）。
-    """
+async def scancel(job_id: str) -> bool:
+    """Cancel a Slurm job (all elements of an array job); True if scancel succeeded."""
     try:
-        r = subprocess.run(["squeue", "-u", username, "-h", "-o", "%i %T"], capture_output=True, text=True, check=True)
-        lines = [ln.strip() for ln in r.stdout.splitlines() if ln.strip()]
-        jobids = []
-        for ln in lines:
-            parts = ln.split()
-            if len(parts) >= 2:
-                jid, state = parts[0], parts[1]
-                # 只计算 PENDING 排队的作业（包含 CONFIGURING）
-                if state.upper() in ("PENDING", "CONFIGURING"):
-                    jobids.append(jid)
-        if slurm_job_id in jobids:
-            return jobids.index(slurm_job_id)
-        return -1
+        rc, _ = await run_slurm_command(["scancel", str(job_id)])
     except Exception:
-        return -1
+        return False
+    return rc == 0
 
-def query_slurm_job_state(slurm_job_id: str) -> Optional[str]:
+async def squeue_user_jobs(username: str) -> Optional[Dict[str, Tuple[str, int]]]:
     """
-    返回 'PENDING' / 'RUNNING' / 'COMPLETED' / 'FAILED' / None(未知)
+    One `squeue -u` call for all jobs of the user.
+    Returns job id -> (state, queue_position); queue_position is the 0-based index among
+    PENDING/CONFIGURING jobs (-1 for jobs that are not pending). None if squeue failed.
     """
     try:
-        r = subprocess.run(["squeue", "-j", slurm_job_id, "-h", "-o", "%T"], capture_output=True, text=True, check=True)
-        s = r.stdout.strip()
-        if s:
-            st = s.split()[0].upper()
-            if st == "RUNNING":
-                return "RUNNING"
-            return "PENDING"
-    except subprocess.CalledProcessError:
-        pass
-
-    # sacct fallback
-    try:
-        r = subprocess.run(["sacct", "-j", f"{slurm_job_id}", "-n", "-o", "State", "--parsable2"], capture_output=True, text=True, check=True)
-        lines = [l for l in r.stdout.splitlines() if l.strip()]
-        if not lines:
-            return None
-        state_raw = lines[0].split("|")[0] if '|' in lines[0] else lines[0].strip()
-        state = state_raw.upper().split()[0]
-        if state.startswith("COMPLETED"):
-            return "COMPLETED"
-        if state.startswith("FAILED") or state.startswith("NODE_FAIL") or state.startswith("CANCELLED") or state.startswith("TIMEOUT"):
-            return "FAILED"
-        if state.startswith("RUNNING"):
-            return "RUNNING"
-        if state.startswith("PENDING") or state.startswith("CONFIGURING"):
-            return "PENDING"
-        return state
+        rc, out = await run_slurm_command(["squeue", "-u", username, "-h", "-o", "%i %T"])
     except Exception:
-        return None
\ No newline at end of file
+        return None
+    if rc != 0:
+        return None
+    jobs: Dict[str, Tuple[str, int]] = {}
+    position = 0
+    for ln in out.splitlines():
+        parts = ln.split()
+        if len(parts) < 2:
+            continue
+        jid, state = parts[0], parts[1].upper()
+        if state in ("PENDING", "CONFIGURING"):
+            entry = ("PENDING", position)
+            position += 1
+        else:
+            entry = (map_sacct_state(state), -1)
+        jobs[jid] = entry
+        # job array 元素（12345_0 / 12345_[1-9%4]）同时汇总到主作业 id 上
+        base = jid.split("_", 1)[0]
+        if base != jid:
+            prev = jobs.get(base)
+            if prev is None or _STATE_PRIORITY.get(entry[0], 0) > _STATE_PRIORITY.get(prev[0], 0):
+                jobs[base] = entry
+    return jobs
+
+async def sacct_job_states(job_ids: Iterable[str], chunk_size: int = 200) -> Dict[str, str]:
+    """Batched sacct lookup for jobs that already left the queue. Returns job id -> mapped state."""
+    ids = list(job_ids)
+    states: Dict[str, str] = {}
+    for i in range(0, len(ids), chunk_size):
+        chunk = ids[i:i + chunk_size]
+        try:
+            rc, out = await run_slurm_command(
+                ["sacct", "-j", ",".join(chunk), "-X", "-n", "-o", "JobID,State", "--parsable2"]
+            )
+        except Exception:
+            continue
+        if rc != 0:
+            continue
+        for ln in out.splitlines():
+            parts = ln.strip().split("|")
+            if len(parts) >= 2 and parts[1]:
+                jid, state = parts[0], map_sacct_state(parts[1])
+                # job array: 任一元素仍在运行/排队则视为活动，否则任一失败即 FAILED
+                base = jid.split("_", 1)[0]
+                prev = states.get(base)
+                if prev is None or _STATE_PRIORITY.get(state, 0) > _STATE_PRIORITY.get(prev, 0):
+                    states[base] = state
+                if base != jid:
+                    states[jid] = state
+    return states
\ No newline at end of file
@@ -0,0 +1,149 @@
+import asyncio
+import sys
+import time
+import uuid
+from typing import Dict, List, NamedTuple, Optional
+
+from config import (SLURM_USER, SLURM_POLL_INTERVAL, SLURM_SNAPSHOT_SHARED, SLURM_SNAPSHOT_KEY,
+                    SLURM_POLLER_LOCK_KEY, EXECUTION_BACKEND)
+from utils.database import fetch, execute
+from utils.ingest import settle_completed
+from utils.redis_client import get_redis, hold_leader_lock
+from utils.slurm import squeue_user_jobs, sacct_job_states
+
+
+class JobState(NamedTuple):
+    state: str            # PENDING / RUNNING / COMPLETED / FAILED / raw Slurm state
+    queue_position: int   # 0-based among pending jobs, -1 otherwise
+
+
+# slurm job id -> JobState, replaced wholesale on every poll
+_snapshot: Dict[str, JobState] = {}
+_snapshot_at: float = 0.0
+_poll_task: Optional[asyncio.Task] = None
+_instance_id = uuid.uuid4().hex
+
+_ACTIVE_STATUSES = ["CREATING", "PENDING", "RUNNING"]
+
+
+def get_job_state(slurm_job_id: str) -> Optional[JobState]:
+    """Latest known state of a Slurm job, or None if the poller has not seen it (yet)."""
+    return _snapshot.get(str(slurm_job_id))
+
+
+def snapshot_age() -> float:
+    return time.monotonic() - _snapshot_at if _snapshot_at else float("inf")
+
+
+async def _write_terminal_states(tracked: Dict[str, List[str]], snapshot: Dict[str, JobState]):
+    done, failed = [], []
+    for jid, task_ids in tracked.items():
+        st = snapshot.get(jid)
+        if st is None:
+            continue
+        if st.state == "COMPLETED":
+            done.extend(task_ids)
+        elif st.state == "FAILED":
+            failed.extend(task_ids)
+    # 结果与 DONE 由 ingester 写入；这里只唤醒它，或标记没有留下结果的作业
+    if done:
+        await settle_completed(done)
+    if failed:
+        await execute(
+            "UPDATE tasks SET status = 'FAILED', error = COALESCE(error, 'Slurm job failed') "
+            "WHERE id = ANY($1::text[]) AND status = ANY($2::text[])",
+            failed, _ACTIVE_STATUSES,
+        )
+
+
+async def poll_once() -> Optional[Dict[str, JobState]]:
+    """One squeue for all user jobs plus one batched sacct for tracked jobs that left the queue."""
+    queue = await squeue_user_jobs(SLURM_USER)
+    if queue is None:
+        return None
+    snapshot = {jid: JobState(state, pos) for jid, (state, pos) in queue.items()}
+
+    rows = await fetch(
+        # 本地后端的作业（local:...）由 utils/backends.py 自行跟踪
+        "SELECT id, slurm_job_id FROM tasks WHERE status = ANY($1::text[]) AND slurm_job_id IS NOT NULL "
+        "AND slurm_job_id NOT LIKE 'local:%'",
+        _ACTIVE_STATUSES,
+    )
+    # batch 与合并检索的任务共享同一个作业
+    tracked: Dict[str, List[str]] = {}
+    for r in rows:
+        tracked.setdefault(str(r["slurm_job_id"]), []).append(r["id"])
+    gone = [jid for jid in tracked if jid not in snapshot]
+    if gone:
+        for jid, state in (await sacct_job_states(gone)).items():
+            snapshot[jid] = JobState(state, -1)
+
+    await _write_terminal_states(tracked, snapshot)
+    return snapshot
+
+
+async def _publish(snapshot: Dict[str, JobState]):
+    r = get_redis()
+    tmp_key = f"{SLURM_SNAPSHOT_KEY}:{_instance_id}"
+    async with r.pipeline(transaction=True) as pipe:
+        pipe.delete(tmp_key)
+        if snapshot:
+            pipe.hset(tmp_key, mapping={jid: f"{st.state}|{st.queue_position}" for jid, st in snapshot.items()})
+            # RENAME 原子替换，读者不会看到半写入的快照
+            pipe.rename(tmp_key, SLURM_SNAPSHOT_KEY)
+        else:
+            pipe.delete(SLURM_SNAPSHOT_KEY)
+        pipe.expire(SLURM_SNAPSHOT_KEY, int(SLURM_POLL_INTERVAL * 6) + 1)
+        await pipe.execute()
+
+
+async def _load_shared() -> Dict[str, JobState]:
+    raw = await get_redis().hgetall(SLURM_SNAPSHOT_KEY)
+    snapshot = {}
+    for jid, val in raw.items():
+        state, _, pos = val.partition("|")
+        snapshot[jid] = JobState(state, int(pos or -1))
+    return snapshot
+
+
+async def _is_leader() -> bool:
+    return await hold_leader_lock(SLURM_POLLER_LOCK_KEY, _instance_id, int(SLURM_POLL_INTERVAL * 3) + 1)
+
+
+async def _poll_loop():
+    global _snapshot, _snapshot_at
+    while True:
+        try:
+            snapshot = None
+            if not SLURM_SNAPSHOT_SHARED:
+                snapshot = await poll_once()
+            elif await _is_leader():
+                snapshot = await poll_once()
+                if snapshot is not None:
+                    await _publish(snapshot)
+            else:
+                snapshot = await _load_shared()
+            if snapshot is not None:
+                _snapshot = snapshot
+                _snapshot_at = time.monotonic()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"slurm poller failed: {e}", file=sys.stderr)
+        await asyncio.sleep(SLURM_POLL_INTERVAL)
+
+
+def start_slurm_poller():
+    global _poll_task
+    if EXECUTION_BACKEND == "local":
+        # 所有作业都在本地后端运行，无需 squeue/sacct
+        return
+    if _poll_task is None:
+        _poll_task = asyncio.get_running_loop().create_task(_poll_loop())
+
+
+async def stop_slurm_poller():
+    global _poll_task
+    if _poll_task is not None:
+        _poll_task.cancel()
+        _poll_task = None
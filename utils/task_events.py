@@ -0,0 +1,73 @@
+import asyncio
+import hashlib
+import json
+import sys
+from typing import Callable, Dict, List, Optional, Set
+
+from config import TASK_EVENTS_CHANNEL, SSE_QUEUE_SIZE
+from utils.notify import register_listener
+
+
+def token_hash(token_key: Optional[str]) -> str:
+    """Same digest as notify_task_finished() in sql/007_task_events.sql."""
+    return hashlib.sha256((token_key or "").encode("utf-8")).hexdigest()
+
+
+class Subscription:
+    """A subscriber's event queue; task_ids=None means every task of the token."""
+
+    def __init__(self, token: str, task_ids: Optional[Set[str]]):
+        self.token = token
+        self.task_ids = task_ids
+        self.queue: "asyncio.Queue[dict]" = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+
+
+# token hash -> live subscriptions
+_subscriptions: Dict[str, Set[Subscription]] = {}
+# in-process consumers of every finished-task event (e.g. webhook delivery)
+_handlers: List[Callable[[dict], None]] = []
+
+
+def subscribe(token: str, task_ids: Optional[Set[str]] = None) -> Subscription:
+    sub = Subscription(token, task_ids)
+    _subscriptions.setdefault(token, set()).add(sub)
+    return sub
+
+
+def unsubscribe(sub: Subscription) -> None:
+    subs = _subscriptions.get(sub.token)
+    if subs is not None:
+        subs.discard(sub)
+        if not subs:
+            del _subscriptions[sub.token]
+
+
+def add_event_handler(callback: Callable[[dict], None]) -> None:
+    _handlers.append(callback)
+
+
+def publish(event: dict) -> None:
+    for sub in list(_subscriptions.get(event.get("token"), ())):
+        if sub.task_ids is not None and event.get("task_id") not in sub.task_ids:
+            continue
+        try:
+            sub.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # 慢消费者：丢弃事件，客户端可通过 status 接口兜底
+            pass
+    for cb in _handlers:
+        try:
+            cb(event)
+        except Exception as e:
+            print(f"task event handler failed: {e}", file=sys.stderr)
+
+
+def _on_task_finished(payload: str) -> None:
+    try:
+        event = json.loads(payload)
+    except ValueError:
+        return
+    publish(event)
+
+
+register_listener(TASK_EVENTS_CHANNEL, _on_task_finished)
@@ -0,0 +1,255 @@
+import json
+import math
+import os
+import shlex
+import shutil
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from config import (SLURM_PARTITION, TASK_WORKDIR_BASE, BATCH_CHUNK_SIZE, BATCH_ARRAY_PARALLELISM,
+                    BLAST_PARALLEL, BLAST_MAX_CPUS, BLAST_BYTES_PER_THREAD, BLAST_MAX_THREADS_PER_DB,
+                    BLAST_MEM_BASE_MB, BLAST_MEM_DB_FACTOR, BLAST_MEM_MAX_MB, INGEST_INBOX, INGEST_NOTIFY_URL,
+                    INGEST_NOTIFY_TOKEN)
+from utils.catalog import get_catalog
+from utils.ingest import MARKER_SUFFIX
+
+
+def _safe_path_for_task(task_id: str) -> str:
+    base = TASK_WORKDIR_BASE or "/tmp/tasks"
+    task_dir = os.path.join(base, task_id)
+    os.makedirs(task_dir, exist_ok=True)
+    return task_dir
+
+def upload_query_path(task_id: str) -> str:
+    """query.fasta of a streamed upload (resolved_mode FASTA); written before the task is dispatched."""
+    return os.path.join(_safe_path_for_task(task_id), "query.fasta")
+
+def remove_task_workdir(task_id: str) -> None:
+    shutil.rmtree(os.path.join(TASK_WORKDIR_BASE or "/tmp/tasks", task_id), ignore_errors=True)
+
+class BlastPlan(NamedTuple):
+    threads: Dict[str, int]   # db -> blastp -num_threads
+    waves: List[List[str]]    # databases in a wave run concurrently; waves run one after another
+    cpus: int                 # --cpus-per-task
+    mem_mb: int               # --mem
+
+
+def plan_blast_resources(db_scope: List[str]) -> BlastPlan:
+    """
+    根据各库大小（databases.blast_db_bytes）确定每个 blastp 的线程数，并在 BLAST_MAX_CPUS 内
+    按顺序 first-fit 分组为若干 wave；大小未知的库按 1 线程处理。
+    --mem 取各 wave 的库大小之和的最大值，并以 BLAST_MEM_MAX_MB 为上限。
+    """
+    catalog = get_catalog()
+    cap = max(BLAST_MAX_CPUS, 1)
+    threads: Dict[str, int] = {}
+    mem: Dict[str, int] = {}
+    for db in db_scope:
+        info = catalog.databases.get(db)
+        size = (info.size_bytes if info else None) or 0
+        threads[db] = max(1, min(math.ceil(size / BLAST_BYTES_PER_THREAD), BLAST_MAX_THREADS_PER_DB, cap))
+        mem[db] = math.ceil(size / 1024 ** 2 * BLAST_MEM_DB_FACTOR)
+
+    waves: List[List[str]] = []
+    if BLAST_PARALLEL:
+        used = 0
+        for db in db_scope:
+            if not waves or used + threads[db] > cap:
+                waves.append([])
+                used = 0
+            waves[-1].append(db)
+            used += threads[db]
+    else:
+        waves = [[db] for db in db_scope]
+
+    cpus = max((sum(threads[db] for db in w) for w in waves), default=1)
+    mem_mb = BLAST_MEM_BASE_MB + max((sum(mem[db] for db in w) for w in waves), default=0)
+    if BLAST_MEM_MAX_MB > 0:
+        # 数据库按需 mmap，峰值常驻内存远小于各库大小之和；避免申请超过节点容量的 --mem
+        mem_mb = min(mem_mb, BLAST_MEM_MAX_MB)
+    return BlastPlan(threads, waves, cpus, mem_mb)
+
+
+def _build_blastp_command(
+    db_scope: List[str],
+    plan: BlastPlan,
+    query_ref: str,
+    combined_ref: str,
+    outfmt: str,
+    out_pattern: str,
+) -> List[str]:
+    """
+    生成脚本行：同一 wave 内的 blastp 后台并行运行，各自写入独立输出文件（out_pattern.format(i=...)）；
+    全部完成后按 db_scope 顺序用 awk 为每行加上 source_db 前缀并追加到 combined，保证合并结果确定。
+    query_ref / combined_ref / out_pattern 为已加引号的 shell 表达式。
+    """
+    index = {db: i for i, db in enumerate(db_scope)}
+    lines = []
+    for wave in plan.waves:
+        for db in wave:
+            out = out_pattern.format(i=index[db])
+            cmd = (
+                f"blastp -query {query_ref} "
+                f"-db {shlex.quote(db)} "
+                f"-outfmt \"{outfmt}\" "
+                f"-num_threads {plan.threads[db]} "
+                f"-out {out}"
+            )
+            lines.append(f"echo {shlex.quote('RUN: ' + cmd)}")
+            lines.append(f"{cmd} &")
+            lines.append(f"PIDS+=($!)")
+        # wait 每个 pid，任何一个 blastp 失败都会因 set -e 使作业失败
+        lines.append('for pid in "${PIDS[@]}"; do wait "$pid"; done')
+        lines.append("PIDS=()")
+    for db in db_scope:
+        out = out_pattern.format(i=index[db])
+        lines.append(f"awk -v DB={shlex.quote(db)} '{{print DB\"\\t\"$0}}' {out} >> {combined_ref}")
+    return lines
+
+
+def _write_resources(fh, plan: BlastPlan):
+    fh.write(f"#SBATCH --cpus-per-task={plan.cpus}\n")
+    fh.write(f"#SBATCH --mem={plan.mem_mb}M\n")
+
+def _write_completion(fh, marker: str, local: bool):
+    """
+    作业成功后在 inbox 中留下 completion marker（marker 为已加引号的 shell 表达式），
+    结果由 API 的 ingester 读取 combined 输出后批量写入（utils/ingest.py），计算节点不连接数据库。
+    local 作业由 LocalBackend 直接唤醒 ingester。
+    """
+    inbox = shlex.quote(INGEST_INBOX)
+    fh.write(f"mkdir -p {inbox}\n")
+    fh.write(f": > {inbox}/{marker}\n")
+    if INGEST_NOTIFY_URL and INGEST_NOTIFY_TOKEN and not local:
+        header = shlex.quote(f"X-Ingest-Token: {INGEST_NOTIFY_TOKEN}")
+        fh.write(f"curl -fsS -m 5 -X POST -H {header} {shlex.quote(INGEST_NOTIFY_URL)} >/dev/null 2>&1 || true\n")
+
+def prepare_task_workdir(
+    task_id: str,
+    content: str,
+    resolved_mode: str,
+    db_scope: List[str],
+    cached_tsv: Optional[str] = None,
+    cache_meta: Optional[Dict] = None,
+    local: bool = False,
+) -> str:
+    """
+    准备工作目录：query.fasta 与 run_blastp.sh，返回 slurm 脚本路径。
+    db_scope 只包含需要实际运行 blastp 的库；cached_tsv 为缓存命中库的结果（合并进 combined 输出），
+    cache_meta 供 ingester 将新计算的结果写回 blast_cache。
+    local=True 时脚本在 API 主机上运行（见 utils/backends.py）。
+    Blocking file I/O; callers on the event loop should run it in a thread.
+    """
+    task_dir = _safe_path_for_task(task_id)
+    query_path = os.path.join(task_dir, "query.fasta")
+    if resolved_mode == "FASTA":
+        # 流式上传：query.fasta 已由 upload 接口写入并校验
+        if not os.path.exists(query_path):
+            raise FileNotFoundError(f"uploaded query missing: {query_path}")
+    elif resolved_mode == "SEQUENCE":
+        header = f">{task_id}"
+        with open(query_path, "w", encoding="utf-8") as fq:
+            fq.write(f"{header}\n")
+            fq.write(content.strip() + "\n")
+    else:
+        with open(query_path, "w", encoding="utf-8") as fq:
+            fq.write(content)
+
+    cached_path = os.path.join(task_dir, "cached_hits.tsv")
+    if cached_tsv:
+        with open(cached_path, "w", encoding="utf-8") as fc:
+            fc.write(cached_tsv)
+    cache_meta_path = os.path.join(task_dir, "cache_keys.json")
+    if cache_meta:
+        with open(cache_meta_path, "w", encoding="utf-8") as fk:
+            json.dump(cache_meta, fk)
+
+    plan = plan_blast_resources(db_scope)
+    combined_out = os.path.join(task_dir, "combined_out.fasta")
+    # 上传的 multi-FASTA：输出 qseqid，ingester 按记录区分命中（result_hits.query_id）
+    with_query = resolved_mode == "FASTA"
+    blastp_lines = _build_blastp_command(
+        db_scope, plan, shlex.quote(query_path), shlex.quote(combined_out),
+        "6 qseqid sacc stitle bitscore pident evalue" if with_query else "6 sacc stitle bitscore pident evalue",
+        "blast_{i}.tsv",
+    )
+    # 写 slurm 脚本
+    script_path = os.path.join(task_dir, "run_blastp.sh")
+    with open(script_path, "w", encoding="utf-8") as fh:
+        fh.write("#!/bin/bash\n")
+        fh.write(f"#SBATCH --job-name=job_{task_id}\n")
+        if SLURM_PARTITION:
+            fh.write(f"#SBATCH --partition={SLURM_PARTITION}\n")
+        _write_resources(fh, plan)
+        fh.write(f"#SBATCH --output={os.path.join(task_dir, 'slurm-%j.out')}\n")
+        fh.write(f"#SBATCH --error={os.path.join(task_dir, 'slurm-%j.err')}\n")
+        fh.write("set -euo pipefail\n")
+        fh.write("export BLASTDB=/mnt/vdb/blast-workspace\n")
+        fh.write(f"cd {shlex.quote(task_dir)}\n")
+        fh.write("echo \"[task] start at $(date)\"\n")
+        header = "source_db\\tqseqid\\tsacc" if with_query else "source_db\\tsacc"
+        fh.write(
+            f"printf \"{header}\\tstitle\\tbitscore\\tpident\\tevalue\\n\" > {shlex.quote(combined_out)}\n")
+        if cached_tsv:
+            fh.write(f"cat {shlex.quote(cached_path)} >> {shlex.quote(combined_out)}\n")
+        fh.write("PIDS=()\n")
+        for ln in blastp_lines:
+            fh.write(ln + "\n")
+        _write_completion(fh, shlex.quote(task_id + MARKER_SUFFIX), local)
+    os.chmod(script_path, 0o750)
+    return script_path
+
+def prepare_group_workdir(
+    group_id: str,
+    queries: List[Tuple[str, str]],
+    db_scope: List[str],
+    local: bool = False,
+    chunk_size: Optional[int] = None,
+    cache_meta: Optional[Dict[str, Dict]] = None,
+) -> str:
+    """
+    Batch 提交：queries 为 [(task_id, sequence), ...]，按 chunk_size（默认 BATCH_CHUNK_SIZE）切分为 query_<i>.fasta，
+    以 Slurm job array 运行，每个 array 元素对其分片执行一次 multi-query blastp。
+    FASTA header 为 task_id，ingester 根据 qseqid 将命中拆分回各任务。
+    cache_meta 为 {task_id: cache_keys}，供 ingester 按任务写回 blast_cache（合并检索）。返回 slurm 脚本路径。
+    """
+    task_dir = _safe_path_for_task(group_id)
+    chunk_size = max(chunk_size or BATCH_CHUNK_SIZE, 1)
+    if cache_meta:
+        with open(os.path.join(task_dir, "cache_keys.json"), "w", encoding="utf-8") as fk:
+            json.dump(cache_meta, fk)
+    n_chunks = 0
+    for start in range(0, len(queries), chunk_size):
+        with open(os.path.join(task_dir, f"query_{n_chunks}.fasta"), "w", encoding="utf-8") as fq:
+            for task_id, seq in queries[start:start + chunk_size]:
+                fq.write(f">{task_id}\n{seq.strip()}\n")
+        n_chunks += 1
+
+    plan = plan_blast_resources(db_scope)
+    blastp_lines = _build_blastp_command(
+        db_scope, plan, '"$QUERY"', '"$COMBINED"',
+        "6 qseqid sacc stitle bitscore pident evalue", '"blast_${{CHUNK}}_{i}.tsv"',
+    )
+    script_path = os.path.join(task_dir, "run_blastp.sh")
+    with open(script_path, "w", encoding="utf-8") as fh:
+        fh.write("#!/bin/bash\n")
+        fh.write(f"#SBATCH --job-name=grp_{group_id}\n")
+        if SLURM_PARTITION:
+            fh.write(f"#SBATCH --partition={SLURM_PARTITION}\n")
+        fh.write(f"#SBATCH --array=0-{n_chunks - 1}%{max(BATCH_ARRAY_PARALLELISM, 1)}\n")
+        _write_resources(fh, plan)
+        fh.write(f"#SBATCH --output={os.path.join(task_dir, 'slurm-%A_%a.out')}\n")
+        fh.write(f"#SBATCH --error={os.path.join(task_dir, 'slurm-%A_%a.err')}\n")
+        fh.write("set -euo pipefail\n")
+        fh.write("export BLASTDB=/mnt/vdb/blast-workspace\n")
+        fh.write(f"cd {shlex.quote(task_dir)}\n")
+        fh.write("CHUNK=${SLURM_ARRAY_TASK_ID}\n")
+        fh.write("QUERY=query_${CHUNK}.fasta\n")
+        fh.write("COMBINED=combined_${CHUNK}.tsv\n")
+        fh.write("echo \"[group] chunk ${CHUNK} start at $(date)\"\n")
+        fh.write("printf \"source_db\\tqseqid\\tsacc\\tstitle\\tbitscore\\tpident\\tevalue\\n\" > \"$COMBINED\"\n")
+        fh.write("PIDS=()\n")
+        for ln in blastp_lines:
+            fh.write(ln + "\n")
+        _write_completion(fh, f"{shlex.quote(group_id)}.\"${{CHUNK}}\"{MARKER_SUFFIX}", local)
+    os.chmod(script_path, 0o750)
+    return script_path
@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import socket
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Optional, Set
+
+from config import (WEBHOOK_TIMEOUT, WEBHOOK_MAX_RETRIES, WEBHOOK_RETRY_BASE_DELAY,
+                    WEBHOOK_CONCURRENCY, WEBHOOK_ALLOW_PRIVATE, WEBHOOK_STALE_AFTER)
+from utils.database import execute, fetch
+from utils.task_events import add_event_handler
+
+_semaphore = asyncio.Semaphore(WEBHOOK_CONCURRENCY)
+_tasks: Set[asyncio.Task] = set()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # 3xx 作为失败返回，不跟随跳转（跳转目标可能是内网地址）
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def check_webhook_url(url: str) -> None:
+    """
+    Raise ValueError unless url is http(s) and its host resolves only to public addresses.
+    Blocking DNS lookup; called at registration and again before every delivery attempt.
+    """
+    parsed = urllib.parse.urlsplit(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError("webhook url must be http(s) with a host")
+    if WEBHOOK_ALLOW_PRIVATE:
+        return
+    try:
+        infos = socket.getaddrinfo(parsed.hostname, parsed.port or (443 if parsed.scheme == "https" else 80),
+                                   proto=socket.IPPROTO_TCP)
+    except socket.gaierror as e:
+        raise ValueError(f"cannot resolve webhook host: {e}")
+    for info in infos:
+        addr = ipaddress.ip_address(info[4][0].split("%", 1)[0])
+        if not addr.is_global or addr.is_multicast:
+            raise ValueError(f"webhook host resolves to a non-public address: {addr}")
+
+
+def _post(url: str, body: bytes, secret: Optional[str]) -> int:
+    check_webhook_url(url)
+    headers = {"Content-Type": "application/json", "User-Agent": "venus-db-api-webhook"}
+    if secret:
+        sig = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+        headers["X-Venus-Signature"] = f"sha256={sig}"
+    req = urllib.request.Request(url, data=body, headers=headers, method="POST")
+    with _opener.open(req, timeout=WEBHOOK_TIMEOUT) as resp:
+        return resp.status
+
+
+async def _deliver(webhook_id: int, url: str, secret: Optional[str], task_id: str, body: bytes):
+    error = None
+    for attempt in range(max(WEBHOOK_MAX_RETRIES, 1)):
+        try:
+            # 只在请求期间占用并发名额，退避等待不阻塞其他投递
+            async with _semaphore:
+                code = await asyncio.to_thread(_post, url, body, secret)
+            if 200 <= code < 300:
+                await execute(
+                    "UPDATE webhook_deliveries SET status='DELIVERED', attempts=$3, delivered_at=now(), "
+                    "last_error=NULL WHERE webhook_id=$1 AND task_id=$2",
+                    webhook_id, task_id, attempt + 1,
+                )
+                return
+            error = f"HTTP {code}"
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            error = str(e)
+        if attempt + 1 < WEBHOOK_MAX_RETRIES:
+            await asyncio.sleep(WEBHOOK_RETRY_BASE_DELAY * (2 ** attempt))
+    await execute(
+        "UPDATE webhook_deliveries SET status='FAILED', attempts=$3, last_error=$4 WHERE webhook_id=$1 AND task_id=$2",
+        webhook_id, task_id, max(WEBHOOK_MAX_RETRIES, 1), error,
+    )
+
+
+async def _dispatch_event(event: dict):
+    task_id = event.get("task_id")
+    # 每个 API 副本都会收到 NOTIFY；通过插入 webhook_deliveries 认领，只有一个副本实际投递
+    rows = await fetch(
+        """
+        WITH hooks AS (
+            SELECT w.id, w.url, w.secret FROM webhooks w
+            JOIN api_keys k ON k.id = w.api_key_id
+            JOIN tasks t ON t.token_key = k.key
+            WHERE t.id = $1
+        ), claimed AS (
+            INSERT INTO webhook_deliveries (webhook_id, task_id, status)
+            SELECT id, $1, 'SENDING' FROM hooks
+            ON CONFLICT DO NOTHING
+            RETURNING webhook_id
+        )
+        SELECT h.id, h.url, h.secret FROM hooks h JOIN claimed c ON c.webhook_id = h.id
+        """,
+        task_id,
+    )
+    if not rows:
+        return
+    body = _event_body(task_id, event.get("status"))
+    await asyncio.gather(*(_deliver(r["id"], r["url"], r["secret"], task_id, body) for r in rows))
+
+
+def _event_body(task_id: str, task_status: Optional[str]) -> bytes:
+    return json.dumps({
+        "event": "task.finished",
+        "task_id": task_id,
+        "status": task_status,
+        "timestamp": int(time.time()),
+    }).encode("utf-8")
+
+
+async def _redeliver_stale():
+    # 投递中途进程退出的 SENDING 记录：超过 WEBHOOK_STALE_AFTER 未完成即由本副本重新认领
+    rows = await fetch(
+        """
+        UPDATE webhook_deliveries d SET claimed_at = now()
+        FROM webhooks w, tasks t
+        WHERE d.status = 'SENDING' AND d.claimed_at < now() - make_interval(secs => $1)
+          AND w.id = d.webhook_id AND t.id = d.task_id
+        RETURNING d.webhook_id, d.task_id, w.url, w.secret, t.status
+        """,
+        WEBHOOK_STALE_AFTER,
+    )
+    await asyncio.gather(*(_deliver(r["webhook_id"], r["url"], r["secret"], r["task_id"],
+                                    _event_body(r["task_id"], r["status"])) for r in rows))
+
+
+def _spawn(coro) -> None:
+    task = asyncio.get_running_loop().create_task(coro)
+    _tasks.add(task)
+
+    def done(t: asyncio.Task):
+        _tasks.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            print(f"webhook dispatch failed: {t.exception()}", file=sys.stderr)
+    task.add_done_callback(done)
+
+
+def _on_event(event: dict) -> None:
+    _spawn(_dispatch_event(event))
+
+
+def start_webhooks():
+    _spawn(_redeliver_stale())
+
+
+add_event_handler(_on_event)